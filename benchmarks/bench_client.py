@@ -0,0 +1,99 @@
+"""
+接口客户端基准
+- 签名开销: 每次重新计算混淆密钥并编码参数 与 WbiSigner（缓存密钥和参数编码）的每秒签名次数
+- 在本地模拟服务上用 BiliClient 发送 WBI 签名请求的吞吐量（关闭/开启响应缓存）
+用法: python benchmarks/bench_client.py [-w 16] [-d 3] [-n 100000]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from hashlib import md5
+from urllib.parse import urlencode
+
+from mock_servers import MockConfig, start_mock_server
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PARAMS = {'mid': 2, 'token': '', 'platform': 'web', 'web_location': 1550101}
+IMG_KEY, SUB_KEY = '7cd084941338484aae1ad9425b84077c', '4932caff0ff746eab6f01bf08b70ac45'
+
+
+def naive_sign(params):
+    """常见的写法：每次签名都重新计算混淆密钥、过滤并编码所有参数"""
+    from signing import MIXIN_KEY_ENC_TAB
+
+    key = ''.join((IMG_KEY + SUB_KEY)[i] for i in MIXIN_KEY_ENC_TAB)[:32]
+    params = dict(params, wts=int(time.time()))
+    params = {k: ''.join(c for c in str(v) if c not in "!'()*") for k, v in sorted(params.items())}
+    query = urlencode(params)
+    params['w_rid'] = md5((query + key).encode('utf-8')).hexdigest()
+    return urlencode(params)
+
+
+def ops_per_second(func, number):
+    started = time.perf_counter()
+    for _ in range(number):
+        func()
+    return number / (time.perf_counter() - started)
+
+
+def throughput(call, workers, duration):
+    count = [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def worker():
+        done = 0
+        while time.monotonic() < deadline:
+            call()
+            done += 1
+        with lock:
+            count[0] += done
+
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return count[0] / duration
+
+
+def main():
+    parser = argparse.ArgumentParser(description="B站接口客户端基准（本地模拟服务）")
+    parser.add_argument('-n', '--number', type=int, default=100000, help="签名次数")
+    parser.add_argument('-w', '--workers', type=int, default=16, help="并发请求线程数")
+    parser.add_argument('-d', '--duration', type=float, default=3.0, help="每项运行时间（秒）")
+    parser.add_argument('--latency', type=float, default=0.005, help="模拟服务每个请求的延迟（秒）")
+    args = parser.parse_args()
+
+    server, base_url = start_mock_server(MockConfig(latency=args.latency))
+    sys.path.insert(0, ROOT)
+
+    from bili_client import BiliClient
+    from signing import WbiSigner
+
+    signer = WbiSigner(lambda: (IMG_KEY, SUB_KEY))
+    print("=" * 64)
+    print(f"WBI 签名（{args.number} 次）")
+    print("=" * 64)
+    naive = ops_per_second(lambda: naive_sign(PARAMS), args.number)
+    cached = ops_per_second(lambda: signer.sign(PARAMS), args.number)
+    print(f"每次重新计算:   {naive:>10.0f} 次/s   {1e6 / naive:6.1f}us/次")
+    print(f"WbiSigner:      {cached:>10.0f} 次/s   {1e6 / cached:6.1f}us/次")
+
+    print("=" * 64)
+    print(f"模拟服务 {base_url}  延迟 {args.latency * 1000:.0f}ms  {args.workers} 线程")
+    print("=" * 64)
+    for label, ttl in (('无缓存', 0), ('缓存 30s', 30)):
+        client = BiliClient('mock-sessdata', 'mock-jct', base_url=base_url, cache_ttl=ttl,
+                            max_connections=args.workers)
+        rps = throughput(lambda: client.get('/x/space/wbi/acc/info', PARAMS, sign='wbi'),
+                         args.workers, args.duration)
+        print(f"{label:<10} {rps:>10.0f} 次/s")
+    print("=" * 64)
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+加密微基准：对比每次重新解析公钥与缓存 cipher/box 后的单次耗时
+用法: python benchmarks/bench_crypto.py [-n 次数]
+"""
+import argparse
+import binascii
+import os
+import sys
+import timeit
+from base64 import b64encode
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Crypto.Cipher import PKCS1_OAEP
+from Crypto.Hash import SHA256
+from Crypto.PublicKey import RSA
+from nacl import encoding, public
+
+import crypto_utils
+
+SECRET_VALUE = "702f761a%2C1782104814%2C58236241"
+
+
+def correspond_path_uncached(timestamp):
+    """原实现：每次调用都重新解析PEM并创建cipher"""
+    key = RSA.importKey(crypto_utils.BILIBILI_PUBLIC_KEY)
+    cipher = PKCS1_OAEP.new(key, SHA256)
+    return binascii.b2a_hex(cipher.encrypt(f'refresh_{timestamp}'.encode())).decode()
+
+
+def encrypt_uncached(public_key, secret_value):
+    """原实现：每个Secret都重新创建PublicKey和SealedBox"""
+    key = public.PublicKey(public_key.encode("utf-8"), encoding.Base64Encoder())
+    encrypted = public.SealedBox(key).encrypt(secret_value.encode("utf-8"))
+    return b64encode(encrypted).decode("utf-8")
+
+
+def report(name, seconds, number):
+    print(f"{name:<40} {seconds / number * 1e6:10.1f} µs/次")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="加密微基准")
+    parser.add_argument('-n', '--number', type=int, default=2000, help="每项执行次数")
+    parser.add_argument('--accounts', type=int, default=100, help="批量加密的账号数")
+    args = parser.parse_args()
+    n = args.number
+
+    github_key = public.PrivateKey.generate().public_key.encode(encoding.Base64Encoder()).decode()
+    # 预热缓存，只测量稳态的单次耗时
+    crypto_utils.get_correspond_path(0)
+    crypto_utils.encrypt(github_key, SECRET_VALUE)
+
+    print("=" * 60)
+    print("CorrespondPath (RSA-OAEP)")
+    report("每次解析公钥", timeit.timeit(lambda: correspond_path_uncached(1700000000000), number=n), n)
+    report("缓存cipher", timeit.timeit(lambda: crypto_utils.get_correspond_path(1700000000000), number=n), n)
+
+    print("\nGitHub Secret (sealed box)")
+    report("每次创建SealedBox", timeit.timeit(lambda: encrypt_uncached(github_key, SECRET_VALUE), number=n), n)
+    report("缓存SealedBox", timeit.timeit(lambda: crypto_utils.encrypt(github_key, SECRET_VALUE), number=n), n)
+
+    secrets = {
+        (mid, name): SECRET_VALUE
+        for mid in range(args.accounts)
+        for name in ('REFRESH_TOKEN', 'SESSDATA', 'BILI_JCT')
+    }
+    batches = max(1, n // len(secrets))
+    print(f"\n批量加密 ({args.accounts} 个账号 x 3 个Secret)")
+    report("逐个加密（每次创建SealedBox）",
+           timeit.timeit(lambda: [encrypt_uncached(github_key, v) for v in secrets.values()], number=batches),
+           batches * len(secrets))
+    report("encrypt_batch",
+           timeit.timeit(lambda: crypto_utils.encrypt_batch(github_key, secrets), number=batches),
+           batches * len(secrets))
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+健康检查基准：在本地模拟服务上检查大量账号，报告首次检查（请求B站）与缓存命中时的耗时
+用法: python benchmarks/bench_health.py [--sizes 100,1000,10000] [-c 64] [--dead-ratio 0.05]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from bench_refresh import make_accounts
+from mock_servers import MockConfig, start_mock_server
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="健康检查基准（本地模拟服务）")
+    parser.add_argument('--sizes', default='100,1000,10000', help="账号数量，逗号分隔")
+    parser.add_argument('-c', '--concurrency', type=int, default=64, help="并发数")
+    parser.add_argument('--latency', type=float, default=0.02, help="模拟服务每个请求的延迟（秒）")
+    parser.add_argument('--refresh-ratio', type=float, default=0.1, help="需要刷新的账号比例")
+    parser.add_argument('--dead-ratio', type=float, default=0.05, help="已失效的账号比例")
+    args = parser.parse_args()
+
+    config = MockConfig(latency=args.latency, refresh_ratio=args.refresh_ratio, dead_ratio=args.dead_ratio)
+    server, base_url = start_mock_server(config)
+    # 必须在导入 health 之前设置，http_client 在导入时读取服务地址
+    os.environ['BILIBILI_PASSPORT_URL'] = base_url
+    os.environ['BILIBILI_API_URL'] = base_url
+    # 模拟服务默认不拦截请求，关闭接口限速以测量流程本身（限速见 bench_rate_limit.py）
+    os.environ.setdefault('REFRESH_RATE_LIMIT', 'off')
+    sys.path.insert(0, ROOT)
+
+    from health import DEAD, ERROR, NEEDS_REFRESH, VALID, HealthCache, check_accounts, summarize
+
+    print("=" * 72)
+    print(f"模拟服务 {base_url}  延迟 {args.latency * 1000:.0f}ms  并发 {args.concurrency}")
+    print("=" * 72)
+    print(f"{'账号数':>8} {'检查(s)':>9} {'账号/s':>9} {'缓存(ms)':>9} "
+          f"{'有效':>6} {'需刷新':>6} {'失效':>6} {'失败':>6}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in [int(s) for s in args.sizes.split(',') if s]:
+            cache = HealthCache(os.path.join(workdir, f'health-{size}.db'))
+            accounts = make_accounts(size)
+            started = time.perf_counter()
+            counts = summarize(check_accounts(accounts, args.concurrency, cache))
+            probed = time.perf_counter() - started
+            started = time.perf_counter()
+            check_accounts(accounts, args.concurrency, cache)
+            cached = time.perf_counter() - started
+            print(f"{size:>8} {probed:>9.2f} {size / probed:>9.0f} {cached * 1000:>9.1f} "
+                  f"{counts[VALID]:>6} {counts[NEEDS_REFRESH]:>6} {counts[DEAD]:>6} {counts[ERROR]:>6}")
+    print("=" * 72)
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+接口限速基准：模拟服务对每个 passport 接口限制每秒请求数（超过返回 -412，模拟风控），
+比较关闭与开启自适应限速时刷新同一批账号的耗时、失败数和被拦截次数
+用法: python benchmarks/bench_rate_limit.py [-n 400] [-c 64] [--endpoint-rate 50]
+"""
+import argparse
+import os
+import sys
+import time
+
+from bench_refresh import make_accounts
+from mock_servers import MockConfig, start_mock_server
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="自适应接口限速基准（本地模拟服务）")
+    parser.add_argument('-n', '--accounts', type=int, default=400, help="账号数量")
+    parser.add_argument('-c', '--concurrency', type=int, default=64, help="并发数")
+    parser.add_argument('--endpoint-rate', type=int, default=50, help="模拟服务每个接口的限速（次/秒）")
+    parser.add_argument('--latency', type=float, default=0.02, help="模拟服务每个请求的延迟（秒）")
+    args = parser.parse_args()
+
+    config = MockConfig(latency=args.latency, endpoint_rate=args.endpoint_rate)
+    server, base_url = start_mock_server(config)
+    state = server.RequestHandlerClass.state
+    # 必须在导入刷新模块之前设置，http_client 在导入时读取服务地址
+    os.environ['BILIBILI_PASSPORT_URL'] = base_url
+    os.environ['BILIBILI_WWW_URL'] = base_url
+    sys.path.insert(0, ROOT)
+
+    import rate_limit
+    import resilience
+    from bili_refresh import refresh_accounts
+
+    print("=" * 72)
+    print(f"模拟服务 {base_url}  每个接口限速 {args.endpoint_rate}/s  {args.accounts} 个账号  "
+          f"并发 {args.concurrency}")
+    print("=" * 72)
+    print(f"{'接口限速':<10} {'总耗时(s)':>10} {'刷新':>6} {'失败':>6} {'被拦截':>8}")
+    for label, setting in (('关闭', 'off'), ('自适应', 'on')):
+        os.environ[rate_limit.RATE_LIMIT_ENV] = setting
+        rate_limit.reset()
+        resilience.reset_breakers()
+        with state['lock']:
+            state['rejected'] = 0
+        started = time.perf_counter()
+        results = refresh_accounts(make_accounts(args.accounts), args.concurrency)
+        wall = time.perf_counter() - started
+        refreshed = sum(1 for r in results if r['status'] == 'refreshed')
+        failed = sum(1 for r in results if r['status'] == 'failed')
+        print(f"{label:<10} {wall:>10.2f} {refreshed:>6} {failed:>6} {state['rejected']:>8}")
+    print("=" * 72)
+    print("自适应限速结束时各接口速率:")
+    for name, info in rate_limit.snapshot().items():
+        print(f"  {name:<16} {info['rate']:>7.1f}/s   被拦截 {info['throttled']} 次")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+刷新流程基准：在本地模拟服务上运行多账号刷新引擎，报告端到端延迟和吞吐量
+用法: python benchmarks/bench_refresh.py [--sizes 1,100,10000] [-c 64] [--latency 0.02]
+"""
+import argparse
+import os
+import secrets
+import sys
+import tempfile
+import time
+
+from mock_servers import MockConfig, start_mock_server
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+def make_accounts(count):
+    expires = int(time.time()) + 15552000
+    return [
+        {
+            'mid': mid,
+            'refresh_token': secrets.token_hex(16),
+            'sessdata': f'{secrets.token_hex(8)}%2C{expires}%2Cmock',
+            'bili_jct': secrets.token_hex(16),
+        }
+        for mid in range(1, count + 1)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="刷新流程基准（本地模拟服务）")
+    parser.add_argument('--sizes', default='1,100,10000', help="账号数量，逗号分隔")
+    parser.add_argument('-c', '--concurrency', type=int, default=64, help="并发数")
+    parser.add_argument('--latency', type=float, default=0.02, help="模拟服务每个请求的延迟（秒）")
+    parser.add_argument('--jitter', type=float, default=0.01, help="额外随机延迟上限（秒）")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="HTTP 500 的概率")
+    parser.add_argument('--api-error-rate', type=float, default=0.0, help="code -412 的概率")
+    parser.add_argument('--refresh-ratio', type=float, default=1.0, help="需要刷新的账号比例")
+    parser.add_argument('--correspond-size', type=int, default=20000, help="correspond 页面大小（字节）")
+    args = parser.parse_args()
+
+    config = MockConfig(args.latency, args.jitter, args.error_rate, args.api_error_rate,
+                        args.refresh_ratio, args.correspond_size)
+    server, base_url = start_mock_server(config)
+    # 必须在导入刷新模块之前设置，http_client 在导入时读取服务地址
+    os.environ['BILIBILI_PASSPORT_URL'] = base_url
+    os.environ['BILIBILI_WWW_URL'] = base_url
+    os.environ['GITHUB_API_URL'] = base_url
+    # 模拟服务默认不拦截请求，关闭接口限速以测量流程本身（限速见 bench_rate_limit.py）
+    os.environ.setdefault('REFRESH_RATE_LIMIT', 'off')
+    sys.path.insert(0, ROOT)
+
+    import metrics
+    from github_secrets import SecretPublisher
+    from bili_refresh import refresh_accounts
+
+    print("=" * 72)
+    print(f"模拟服务 {base_url}  延迟 {args.latency * 1000:.0f}ms(+{args.jitter * 1000:.0f}ms)  "
+          f"并发 {args.concurrency}")
+    print("=" * 72)
+    print(f"{'账号数':>8} {'总耗时(s)':>10} {'吞吐(个/s)':>11} {'p50(ms)':>9} {'p99(ms)':>9} "
+          f"{'刷新':>6} {'有效':>6} {'失败':>6}")
+
+    for size in [int(s) for s in args.sizes.split(',') if s]:
+        metrics.reset()
+        accounts = make_accounts(size)
+        started = time.perf_counter()
+        results = refresh_accounts(accounts, args.concurrency)
+        wall = time.perf_counter() - started
+        latencies = [r['elapsed'] for r in results]
+        counts = {}
+        for r in results:
+            counts[r['status']] = counts.get(r['status'], 0) + 1
+        print(f"{size:>8} {wall:>10.2f} {size / wall:>11.1f} "
+              f"{percentile(latencies, 0.5) * 1000:>9.1f} {percentile(latencies, 0.99) * 1000:>9.1f} "
+              f"{counts.get('refreshed', 0):>6} {counts.get('valid', 0):>6} {counts.get('failed', 0):>6}")
+
+    print("\n各步骤耗时（最后一轮）")
+    for name, stats in sorted(metrics.trace()['summary'].items()):
+        print(f"  {name:<22} p50 {stats['p50'] * 1000:8.1f}ms   p99 {stats['p99'] * 1000:8.1f}ms")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        publisher = SecretPublisher('mock-token', 'owner', 'repo',
+                                    state_file=os.path.join(tmp, 'state.json'))
+        values = {'REFRESH_TOKEN': secrets.token_hex(16), 'SESSDATA': secrets.token_hex(16),
+                  'BILI_JCT': secrets.token_hex(16)}
+        started = time.perf_counter()
+        publisher.publish(values)
+        first = time.perf_counter() - started
+        started = time.perf_counter()
+        publisher.publish(values)
+        unchanged = time.perf_counter() - started
+    print(f"\nGitHub Secrets 发布（3个）: 首次 {first * 1000:.1f}ms, 未变化 {unchanged * 1000:.2f}ms")
+    print("=" * 72)
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Secret 多目标发布基准：把同一组 Secret 写入多个仓库和一个组织（selected 可见性），
+比较逐个目标发布（每个目标一个 SecretPublisher，目标内的Secret并发写入）与 SecretFanout 有界并发发布的耗时
+用法: python benchmarks/bench_secrets.py [--repos 12] [--workers 1,4,8,16] [--latency 0.05]
+"""
+import argparse
+import contextlib
+import io
+import os
+import secrets
+import sys
+import tempfile
+import time
+
+from mock_servers import MockConfig, start_mock_server
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SECRET_NAMES = ('REFRESH_TOKEN', 'SESSDATA', 'BILI_JCT')
+
+
+def github_hits(state):
+    with state['lock']:
+        return sum(state['hits'].get(name, 0) for name in
+                   ('public_key', 'put_secret', 'org_public_key', 'put_org_secret', 'get_repository'))
+
+
+def rounds(values):
+    """首次、更新、未变化三轮要写入的值"""
+    first, updated = values(), values()
+    return first, updated, updated
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Secret 多目标发布基准（本地模拟服务）")
+    parser.add_argument('--repos', type=int, default=12, help="仓库数量（另加一个组织目标）")
+    parser.add_argument('--workers', default='1,4,8,16', help="SecretFanout 线程数，逗号分隔")
+    parser.add_argument('--latency', type=float, default=0.05, help="模拟服务每个请求的延迟（秒）")
+    args = parser.parse_args()
+
+    server, base_url = start_mock_server(MockConfig(latency=args.latency))
+    state = server.RequestHandlerClass.state
+    # 必须在导入 github_secrets 之前设置，http_client 在导入时读取服务地址
+    os.environ['GITHUB_API_URL'] = base_url
+    sys.path.insert(0, ROOT)
+
+    import http_client
+    from github_secrets import SecretFanout, SecretPublisher, parse_target
+
+    repos = [f"owner/repo{i}" for i in range(args.repos)]
+    targets = repos + [f"org:owner:{'+'.join(r.split('/')[1] for r in repos[:3])}"]
+    http_client.ensure_pool_size(max(int(w) for w in args.workers.split(',')))
+
+    def values():
+        return {name: secrets.token_hex(16) for name in SECRET_NAMES}
+
+    print("=" * 72)
+    print(f"模拟服务 {base_url}  延迟 {args.latency * 1000:.0f}ms  "
+          f"{len(targets)} 个目标 x {len(SECRET_NAMES)} 个Secret")
+    print("=" * 72)
+    print(f"{'方式':<20} {'首次(ms)':>10} {'更新(ms)':>10} {'未变化(ms)':>11} {'请求/次':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        state_file = os.path.join(tmp, 'serial.json')
+        publishers = []
+        for owner, repo, visibility, selected in map(parse_target, targets):
+            publishers.append(SecretPublisher('mock-token', owner, repo, state_file=state_file,
+                                              visibility=visibility, selected_repos=selected))
+        timings = []
+        before = github_hits(state)
+        for batch in rounds(values):
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                for publisher in publishers:
+                    publisher.publish(batch)
+            timings.append(time.perf_counter() - started)
+        requests_per_run = (github_hits(state) - before) / 2
+        print(f"{'逐个目标（目标内x4）':<20} {timings[0] * 1000:>10.1f} {timings[1] * 1000:>10.1f} "
+              f"{timings[2] * 1000:>11.2f} {requests_per_run:>8.0f}")
+
+        for workers in [int(w) for w in args.workers.split(',') if w]:
+            fanout = SecretFanout('mock-token', targets, state_file=os.path.join(tmp, f'fanout-{workers}.json'),
+                                  max_workers=workers)
+            timings = []
+            before = github_hits(state)
+            for batch in rounds(values):
+                started = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    fanout.publish(batch)
+                timings.append(time.perf_counter() - started)
+            requests_per_run = (github_hits(state) - before) / 2
+            print(f"{f'SecretFanout x{workers}':<20} {timings[0] * 1000:>10.1f} {timings[1] * 1000:>10.1f} "
+                  f"{timings[2] * 1000:>11.2f} {requests_per_run:>8.0f}")
+    print("=" * 72)
+    print("首次: 获取公钥与仓库ID并写入全部Secret；更新: 公钥已在本进程验证过，只写入Secret；"
+          "请求/次: 首次与更新的平均请求数")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
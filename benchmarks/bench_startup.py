@@ -0,0 +1,110 @@
+"""
+冷启动基准：在新进程中测量刷新脚本的导入耗时和首个请求完成的时间
+- 导入 bili_refresh 的耗时，以及导入后已加载的重量级模块
+- 从启动解释器到第一个请求（cookie/info）返回的时间
+- refresh.py 在无需刷新 / 需要刷新两种情况下的完整运行时间与 GitHub 接口（Secrets / Git Data）请求次数
+  （每次运行使用新的临时目录，没有上次的 SESSDATA 文件和状态文件，相当于缓存未命中）
+用法: python benchmarks/bench_startup.py [-n 次数]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from mock_servers import MockConfig, start_mock_server
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ('requests', 'Crypto', 'nacl', 'pytz')
+
+CHILD = '''
+import json, sys, time
+started = time.perf_counter()
+import bili_refresh
+imported = time.perf_counter()
+loaded = [m for m in %r if m in sys.modules]
+bili_refresh.check_need_refresh({'SESSDATA': 'mock', 'bili_jct': 'mock'})
+print(json.dumps({'import': imported - started, 'first_response': time.time(), 'loaded': loaded}))
+''' % (HEAVY_MODULES,)
+
+
+def mock_env(base_url):
+    env = dict(os.environ)
+    env.update({
+        'BILIBILI_PASSPORT_URL': base_url,
+        'BILIBILI_WWW_URL': base_url,
+        'GITHUB_API_URL': base_url,
+        'PYTHONPATH': ROOT,
+    })
+    env.pop('REFRESH_METRICS_DIR', None)
+    return env
+
+
+def first_request(env):
+    started = time.time()
+    output = subprocess.run([sys.executable, '-c', CHILD], env=env, capture_output=True,
+                            text=True, check=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result['ttfr'] = result['first_response'] - started
+    return result
+
+
+def run_refresh(env, workdir):
+    env = dict(env, REPO_ACCESS_TOKEN='mock-token', GITHUB_OWNER='owner', GITHUB_REPO='repo',
+               REFRESH_TOKEN='mock', SESSDATA='mock%2C1999999999%2Cmock', BILI_JCT='mock', MID='1',
+               SECRETS_STATE_FILE=os.path.join(workdir, 'state.json'))
+    started = time.perf_counter()
+    subprocess.run([sys.executable, os.path.join(ROOT, 'refresh.py')], env=env, cwd=workdir,
+                   capture_output=True, check=True)
+    return time.perf_counter() - started
+
+
+GIT_ROUTES = ('git_ref', 'git_commit', 'git_tree', 'create_blob', 'create_tree', 'create_commit', 'update_ref')
+
+
+def github_hits(state, routes=('public_key', 'put_secret')):
+    with state['lock']:
+        return sum(state['hits'].get(name, 0) for name in routes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="刷新脚本冷启动基准")
+    parser.add_argument('-n', '--number', type=int, default=10, help="每项运行次数")
+    args = parser.parse_args()
+
+    config = MockConfig(refresh_ratio=0.0)
+    server, base_url = start_mock_server(config)
+    state = server.RequestHandlerClass.state
+    env = mock_env(base_url)
+
+    runs = [first_request(env) for _ in range(args.number)]
+    imports = [r['import'] * 1000 for r in runs]
+    ttfrs = [r['ttfr'] * 1000 for r in runs]
+
+    print("=" * 64)
+    print(f"冷启动基准（{args.number} 次，模拟服务 {base_url}）")
+    print("=" * 64)
+    print(f"导入 bili_refresh:       中位数 {statistics.median(imports):7.1f}ms   最小 {min(imports):7.1f}ms")
+    print(f"启动到首个请求返回:      中位数 {statistics.median(ttfrs):7.1f}ms   最小 {min(ttfrs):7.1f}ms")
+    print(f"导入后已加载的重量级模块: {', '.join(runs[0]['loaded']) or '无'}")
+
+    for label, ratio in (('无需刷新', 0.0), ('需要刷新', 1.0)):
+        config.refresh_ratio = ratio
+        durations = []
+        before, git_before = github_hits(state), github_hits(state, GIT_ROUTES)
+        for _ in range(args.number):
+            with tempfile.TemporaryDirectory() as workdir:
+                durations.append(run_refresh(env, workdir) * 1000)
+        per_run = (github_hits(state) - before) / args.number
+        git_per_run = (github_hits(state, GIT_ROUTES) - git_before) / args.number
+        print(f"refresh.py（{label}）:   中位数 {statistics.median(durations):7.1f}ms   "
+              f"Secrets请求 {per_run:.1f} 次/运行   Git请求 {git_per_run:.1f} 次/运行")
+    print("=" * 64)
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
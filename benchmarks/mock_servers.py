@@ -0,0 +1,497 @@
+"""
+本地模拟服务：B站 passport/www/api 接口与 GitHub Actions Secrets（仓库/组织）与 Git Data 接口
+用于在不访问真实服务的情况下测量刷新流程的性能，支持配置延迟、错误率和响应大小。
+
+单独运行:
+    python benchmarks/mock_servers.py --port 8900 --latency 0.02
+然后让脚本指向它:
+    BILIBILI_PASSPORT_URL=http://127.0.0.1:8900 BILIBILI_WWW_URL=http://127.0.0.1:8900 \\
+    BILIBILI_API_URL=http://127.0.0.1:8900 \\
+    GITHUB_API_URL=http://127.0.0.1:8900 python refresh_engine.py accounts.json
+"""
+import argparse
+import base64
+import collections
+import gzip
+import hashlib
+import json
+import random
+import re
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, urlsplit
+
+
+class MockConfig:
+    """模拟服务的行为参数
+
+    latency: 每个请求的基础延迟（秒）；jitter: 在此基础上增加的随机延迟上限（秒）
+    error_rate: 返回 HTTP 500 的概率；api_error_rate: 返回 code -412 的概率
+    refresh_ratio: cookie/info 返回 refresh=true 的概率
+    correspond_size: correspond 页面中 refresh_csrf 之前的填充字节数
+    polls_before_scan / polls_before_confirm: TV 扫码登录在第几次轮询时变为已扫码/已确认
+    per_cookie_rate: 每个 SESSDATA 每秒允许的 nav 请求数，超过时返回 -412（0 表示不限制）
+    dead_ratio: 已失效（返回 -101）的 SESSDATA 比例，按 SESSDATA 的哈希固定
+    endpoint_rate: 每个 passport 接口每秒允许的请求数，超过时返回 -412（0 表示不限制），模拟风控
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, api_error_rate=0.0,
+                 refresh_ratio=1.0, correspond_size=20000, polls_before_scan=2,
+                 polls_before_confirm=4, per_cookie_rate=0, dead_ratio=0.0, endpoint_rate=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.api_error_rate = api_error_rate
+        self.refresh_ratio = refresh_ratio
+        self.correspond_size = correspond_size
+        self.polls_before_scan = polls_before_scan
+        self.polls_before_confirm = polls_before_confirm
+        self.per_cookie_rate = per_cookie_rate
+        self.dead_ratio = dead_ratio
+        self.endpoint_rate = endpoint_rate
+
+
+WBI_IMG = {
+    'img_url': 'https://i0.hdslb.com/bfs/wbi/7cd084941338484aae1ad9425b84077c.png',
+    'sub_url': 'https://i0.hdslb.com/bfs/wbi/4932caff0ff746eab6f01bf08b70ac45.png',
+}
+# 由上面的 img_key/sub_key 混淆得到的 WBI 密钥
+WBI_MIXIN_KEY = 'ea1db124af3c7062474693fa704f4ff8'
+
+
+def _github_public_key():
+    """生成一个真实可用的 sealed box 公钥，返回 (key_id, base64公钥)"""
+    from nacl import encoding, public
+    key = public.PrivateKey.generate().public_key.encode(encoding.Base64Encoder()).decode()
+    return '3380204578043523366', key
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # 响应头和正文一次写出，避免 Nagle + 延迟确认给每个请求增加约40ms
+    disable_nagle_algorithm = True
+    wbufsize = 64 * 1024
+    config = MockConfig()
+    state = None
+
+    def log_message(self, format, *args):
+        pass
+
+    # ---- 通用 ----
+
+    def _send(self, status, body=b'', content_type='application/json; charset=utf-8',
+              headers=None):
+        self.send_response(status)
+        for name, value in (headers or []):
+            self.send_header(name, value)
+        if status != 304:
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if body and status != 304:
+            self.wfile.write(body)
+
+    def _json(self, data, status=200, headers=None):
+        self._send(status, json.dumps(data).encode('utf-8'), headers=headers)
+
+    def _form(self):
+        """表单正文与查询参数合并后的字典"""
+        form = {k: v[0] for k, v in parse_qs(self._body.decode('utf-8')).items()}
+        form.update({k: v[0] for k, v in parse_qs(urlsplit(self.path).query).items()})
+        return form
+
+    def _cookies(self):
+        cookies = {}
+        for item in (self.headers.get('Cookie') or '').split(';'):
+            if '=' in item:
+                name, value = item.strip().split('=', 1)
+                cookies[name] = value
+        return cookies
+
+    def _simulate(self):
+        """模拟延迟和错误，返回 True 表示已经发送了错误响应"""
+        config = self.config
+        delay = config.latency + random.uniform(0, config.jitter)
+        if delay:
+            time.sleep(delay)
+        if random.random() < config.error_rate:
+            self._json({'message': 'mock server error'}, status=500)
+            return True
+        return False
+
+    def _dead(self, sessdata):
+        """SESSDATA 是否已失效：不存在，或哈希落在 dead_ratio 内（同一个值每次结果相同）"""
+        if not sessdata:
+            return True
+        digest = int(hashlib.md5(sessdata.encode('utf-8')).hexdigest()[:8], 16)
+        return digest / 0xFFFFFFFF < self.config.dead_ratio
+
+    def _api_error(self):
+        """按 api_error_rate 随机拦截，或当前接口超过 endpoint_rate 时拦截"""
+        if (random.random() < self.config.api_error_rate
+                or self._over_rate(('route', self._route), self.config.endpoint_rate)):
+            with self.state['lock']:
+                self.state['rejected'] += 1
+            self._json({'code': -412, 'message': '请求被拦截'})
+            return True
+        return False
+
+    def _dispatch(self, method):
+        path = urlsplit(self.path).path
+        length = int(self.headers.get('Content-Length') or 0)
+        self._body = self.rfile.read(length) if length else b''
+        if self._simulate():
+            return
+        for route_method, pattern, handler in ROUTES:
+            if route_method != method:
+                continue
+            match = re.fullmatch(pattern, path)
+            if match:
+                self._route = handler.__name__
+                with self.state['lock']:
+                    hits = self.state['hits']
+                    hits[self._route] = hits.get(self._route, 0) + 1
+                handler(self, *match.groups())
+                return
+        self._json({'message': 'Not Found'}, status=404)
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_PUT(self):
+        self._dispatch('PUT')
+
+    def do_PATCH(self):
+        self._dispatch('PATCH')
+
+    # ---- B站 passport / www ----
+
+    def cookie_info(self):
+        if self._api_error():
+            return
+        if self._dead(self._cookies().get('SESSDATA')):
+            self._json({'code': -101, 'message': '账号未登录'})
+            return
+        self._json({'code': 0, 'data': {
+            'refresh': random.random() < self.config.refresh_ratio,
+            'timestamp': int(time.time() * 1000),
+        }})
+
+    def correspond(self, correspond_path):
+        padding = '<!-- ' + 'x' * max(self.config.correspond_size - 9, 0) + ' -->'
+        html = (f'<html><head><title>correspond</title></head><body>{padding}'
+                f'<div id="1-name">{secrets.token_hex(16)}</div></body></html>')
+        body = html.encode('utf-8')
+        headers = []
+        if 'gzip' in (self.headers.get('Accept-Encoding') or ''):
+            body = gzip.compress(body)
+            headers.append(('Content-Encoding', 'gzip'))
+        self._send(200, body, content_type='text/html; charset=utf-8', headers=headers)
+
+    def cookie_refresh(self):
+        if self._api_error():
+            return
+        form = self._form()
+        if not form.get('refresh_token') or not form.get('refresh_csrf'):
+            self._json({'code': -111, 'message': 'csrf 校验错误'})
+            return
+        self._json({'code': 0, 'data': {'status': 0, 'refresh_token': secrets.token_hex(16)}},
+                   headers=[
+                       ('Set-Cookie', f'SESSDATA={secrets.token_hex(8)}%2C{int(time.time()) + 15552000}%2Cmock; Path=/'),
+                       ('Set-Cookie', f'bili_jct={secrets.token_hex(16)}; Path=/'),
+                   ])
+
+    def confirm_refresh(self):
+        if self._api_error():
+            return
+        self._json({'code': 0, 'message': '0'})
+
+    def auth_code(self):
+        code = secrets.token_hex(16)
+        with self.state['lock']:
+            self.state['polls'][code] = 0
+        self._json({'code': 0, 'data': {
+            'url': f'https://passport.bilibili.com/x/passport-tv-login/h5/qrcode/auth?auth_code={code}',
+            'auth_code': code,
+        }})
+
+    def poll(self):
+        code = self._form().get('auth_code')
+        with self.state['lock']:
+            if code not in self.state['polls']:
+                self._json({'code': 86038, 'message': '二维码已失效'})
+                return
+            self.state['polls'][code] += 1
+            count = self.state['polls'][code]
+        if count <= self.config.polls_before_scan:
+            self._json({'code': 86101, 'message': '未扫码'})
+        elif count <= self.config.polls_before_confirm:
+            self._json({'code': 86090, 'message': '二维码已扫码未确认'})
+        else:
+            mid = random.randint(1, 10 ** 9)
+            self._json({'code': 0, 'data': {
+                'mid': mid,
+                'token_info': {
+                    'access_token': secrets.token_hex(16),
+                    'refresh_token': secrets.token_hex(16),
+                    'expires_in': 15552000,
+                },
+                'cookie_info': {'cookies': [
+                    {'name': 'SESSDATA', 'value': f'{secrets.token_hex(8)}%2C{int(time.time()) + 15552000}%2Cmock'},
+                    {'name': 'bili_jct', 'value': secrets.token_hex(16)},
+                    {'name': 'DedeUserID', 'value': str(mid)},
+                ]},
+            }})
+
+    def _over_rate(self, key, rate):
+        """统计 key 最近1秒内的请求数，超过 rate 时返回True（rate 为0时不限制）"""
+        if not rate:
+            return False
+        now = time.monotonic()
+        with self.state['lock']:
+            window = self.state['windows'].setdefault(key, collections.deque())
+            while window and window[0] <= now - 1:
+                window.popleft()
+            if len(window) >= rate:
+                return True
+            window.append(now)
+        return False
+
+    def nav(self):
+        cookies = self._cookies()
+        sessdata = cookies.get('SESSDATA')
+        if self._dead(sessdata):
+            # 未登录时仍然返回 WBI 密钥
+            self._json({'code': -101, 'message': '账号未登录',
+                        'data': {'isLogin': False, 'wbi_img': WBI_IMG}})
+            return
+        if self._api_error():
+            return
+        if self._over_rate(sessdata, self.config.per_cookie_rate):
+            with self.state['lock']:
+                self.state['rejected'] += 1
+            self._json({'code': -412, 'message': '请求被拦截'})
+            return
+        self._json({'code': 0, 'message': '0', 'data': {
+            'isLogin': True,
+            'mid': int(cookies.get('DedeUserID') or 0),
+            'wbi_img': WBI_IMG,
+        }})
+
+    def wbi_acc_info(self):
+        """校验 WBI 签名的接口，签名错误返回 -352"""
+        params = {k: v[0] for k, v in parse_qs(urlsplit(self.path).query, keep_blank_values=True).items()}
+        w_rid = params.pop('w_rid', None)
+        query = '&'.join(f"{quote(k, safe='')}={quote(v, safe='')}" for k, v in sorted(params.items()))
+        expected = hashlib.md5(f"{query}{WBI_MIXIN_KEY}".encode('utf-8')).hexdigest()
+        if 'wts' not in params or w_rid != expected:
+            self._json({'code': -352, 'message': '风控校验失败'})
+            return
+        self._json({'code': 0, 'message': '0', 'data': {'mid': int(params.get('mid', 0)), 'name': 'mock'}})
+
+    # ---- GitHub Actions Secrets ----
+
+    def public_key(self, owner, repo):
+        key_id, key = self.state['github_key']
+        etag = f'"{key_id}"'
+        if self.headers.get('If-None-Match') == etag:
+            self._send(304, headers=[('ETag', etag)])
+            return
+        self._json({'key_id': key_id, 'key': key}, headers=[('ETag', etag)])
+
+    def put_secret(self, owner, repo, name):
+        try:
+            data = json.loads(self._body)
+        except ValueError:
+            data = {}
+        if data.get('key_id') != self.state['github_key'][0] or not data.get('encrypted_value'):
+            self._json({'message': 'Bad request'}, status=422)
+            return
+        with self.state['lock']:
+            created = (owner, repo, name) not in self.state['secrets']
+            self.state['secrets'][(owner, repo, name)] = data['encrypted_value']
+        self._send(201 if created else 204)
+
+    def org_public_key(self, org):
+        self.public_key(org, None)
+
+    def put_org_secret(self, org, name):
+        try:
+            data = json.loads(self._body)
+        except ValueError:
+            data = {}
+        visibility = data.get('visibility')
+        if visibility not in ('all', 'private', 'selected') or (
+                visibility == 'selected' and not isinstance(data.get('selected_repository_ids'), list)):
+            self._json({'message': 'Bad request'}, status=422)
+            return
+        self.put_secret(org, None, name)
+        with self.state['lock']:
+            self.state['org_secret_scopes'][(org, name)] = (visibility, data.get('selected_repository_ids'))
+
+    def get_repository(self, owner, repo):
+        repo_id = int(hashlib.md5(f"{owner}/{repo}".encode('utf-8')).hexdigest()[:8], 16)
+        self._json({'id': repo_id, 'full_name': f"{owner}/{repo}"})
+
+    # ---- GitHub Git Data（树用 {路径: blob SHA} 的扁平字典表示）----
+
+    def _git_put(self, kind, obj):
+        sha = hashlib.sha1(f"{kind} {json.dumps(obj, sort_keys=True)}".encode('utf-8')).hexdigest()
+        self.state['git_objects'][sha] = obj
+        return sha
+
+    def _git_body(self):
+        try:
+            return json.loads(self._body)
+        except ValueError:
+            return {}
+
+    def git_ref(self, owner, repo, branch):
+        with self.state['lock']:
+            refs = self.state['git_refs']
+            if (owner, repo, branch) not in refs:
+                tree = self._git_put('tree', {})
+                refs[(owner, repo, branch)] = self._git_put('commit', {'tree': tree, 'parents': [], 'message': 'init'})
+            sha = refs[(owner, repo, branch)]
+        self._json({'ref': f'refs/heads/{branch}', 'object': {'sha': sha, 'type': 'commit'}})
+
+    def git_commit(self, owner, repo, sha):
+        commit = self.state['git_objects'].get(sha)
+        if commit is None:
+            self._json({'message': 'Not Found'}, status=404)
+            return
+        self._json({'sha': sha, 'tree': {'sha': commit['tree']}, 'parents': [{'sha': p} for p in commit['parents']]})
+
+    def git_tree(self, owner, repo, sha):
+        tree = self.state['git_objects'].get(sha)
+        if tree is None:
+            self._json({'message': 'Not Found'}, status=404)
+            return
+        self._json({'sha': sha, 'truncated': False, 'tree': [
+            {'path': path, 'mode': '100644', 'type': 'blob', 'sha': blob} for path, blob in sorted(tree.items())]})
+
+    def create_blob(self, owner, repo):
+        data = self._git_body()
+        content = base64.b64decode(data['content']) if data.get('encoding') == 'base64' \
+            else data.get('content', '').encode('utf-8')
+        sha = hashlib.sha1(b'blob %d\0' % len(content) + content).hexdigest()
+        self._json({'sha': sha}, status=201)
+
+    def create_tree(self, owner, repo):
+        data = self._git_body()
+        with self.state['lock']:
+            tree = dict(self.state['git_objects'].get(data.get('base_tree'), {}))
+            for entry in data.get('tree', []):
+                if 'content' in entry:
+                    content = entry['content'].encode('utf-8')
+                    tree[entry['path']] = hashlib.sha1(b'blob %d\0' % len(content) + content).hexdigest()
+                elif entry.get('sha') is None:
+                    tree.pop(entry['path'], None)
+                else:
+                    tree[entry['path']] = entry['sha']
+            sha = self._git_put('tree', tree)
+        self._json({'sha': sha}, status=201)
+
+    def create_commit(self, owner, repo):
+        data = self._git_body()
+        with self.state['lock']:
+            sha = self._git_put('commit', {'tree': data['tree'], 'parents': data['parents'],
+                                           'message': data.get('message', '')})
+        self._json({'sha': sha, 'tree': {'sha': data['tree']}}, status=201)
+
+    def update_ref(self, owner, repo, branch):
+        data = self._git_body()
+        with self.state['lock']:
+            refs = self.state['git_refs']
+            commit = self.state['git_objects'].get(data.get('sha'))
+            current = refs.get((owner, repo, branch))
+            if commit is None or (not data.get('force') and current not in commit['parents']):
+                self._json({'message': 'Update is not a fast forward'}, status=422)
+                return
+            refs[(owner, repo, branch)] = data['sha']
+        self._json({'ref': f'refs/heads/{branch}', 'object': {'sha': data['sha'], 'type': 'commit'}})
+
+
+ROUTES = [
+    ('GET', r'/x/passport-login/web/cookie/info', MockHandler.cookie_info),
+    ('GET', r'/correspond/1/([0-9a-f]+)', MockHandler.correspond),
+    ('GET', r'/x/web-interface/nav', MockHandler.nav),
+    ('GET', r'/x/space/wbi/acc/info', MockHandler.wbi_acc_info),
+    ('POST', r'/x/passport-login/web/cookie/refresh', MockHandler.cookie_refresh),
+    ('POST', r'/x/passport-login/web/confirm/refresh', MockHandler.confirm_refresh),
+    ('POST', r'/x/passport-tv-login/qrcode/auth_code', MockHandler.auth_code),
+    ('POST', r'/x/passport-tv-login/qrcode/poll', MockHandler.poll),
+    ('GET', r'/repos/([^/]+)/([^/]+)/actions/secrets/public-key', MockHandler.public_key),
+    ('PUT', r'/repos/([^/]+)/([^/]+)/actions/secrets/([A-Za-z0-9_]+)', MockHandler.put_secret),
+    ('GET', r'/orgs/([^/]+)/actions/secrets/public-key', MockHandler.org_public_key),
+    ('PUT', r'/orgs/([^/]+)/actions/secrets/([A-Za-z0-9_]+)', MockHandler.put_org_secret),
+    ('GET', r'/repos/([^/]+)/([^/]+)', MockHandler.get_repository),
+    ('GET', r'/repos/([^/]+)/([^/]+)/git/ref/heads/(.+)', MockHandler.git_ref),
+    ('GET', r'/repos/([^/]+)/([^/]+)/git/commits/([0-9a-f]+)', MockHandler.git_commit),
+    ('GET', r'/repos/([^/]+)/([^/]+)/git/trees/([0-9a-f]+)', MockHandler.git_tree),
+    ('POST', r'/repos/([^/]+)/([^/]+)/git/blobs', MockHandler.create_blob),
+    ('POST', r'/repos/([^/]+)/([^/]+)/git/trees', MockHandler.create_tree),
+    ('POST', r'/repos/([^/]+)/([^/]+)/git/commits', MockHandler.create_commit),
+    ('PATCH', r'/repos/([^/]+)/([^/]+)/git/refs/heads/(.+)', MockHandler.update_ref),
+]
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+def start_mock_server(config=None, host='127.0.0.1', port=0):
+    """在后台线程启动模拟服务，返回 (server, base_url)"""
+    state = {
+        'lock': threading.Lock(),
+        'polls': {},
+        # 每个 SESSDATA / 接口最近1秒内的请求时间
+        'windows': {},
+        # 返回 -412 的次数
+        'rejected': 0,
+        'secrets': {},
+        # 组织Secret的可见范围: (组织, 名称) -> (visibility, 仓库ID列表)
+        'org_secret_scopes': {},
+        # 每个接口被请求的次数
+        'hits': {},
+        'github_key': _github_public_key(),
+        # Git Data: SHA -> 树/提交，(owner, repo, 分支) -> 提交SHA
+        'git_objects': {},
+        'git_refs': {},
+    }
+    handler = type('Handler', (MockHandler,), {'config': config or MockConfig(), 'state': state})
+    server = MockServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://{host}:{server.server_port}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description="B站/GitHub 本地模拟服务")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--latency', type=float, default=0.0, help="每个请求的延迟（秒）")
+    parser.add_argument('--jitter', type=float, default=0.0, help="额外随机延迟上限（秒）")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="HTTP 500 的概率")
+    parser.add_argument('--api-error-rate', type=float, default=0.0, help="code -412 的概率")
+    parser.add_argument('--refresh-ratio', type=float, default=1.0, help="需要刷新的概率")
+    parser.add_argument('--correspond-size', type=int, default=20000, help="correspond 页面大小（字节）")
+    args = parser.parse_args()
+
+    config = MockConfig(args.latency, args.jitter, args.error_rate, args.api_error_rate,
+                        args.refresh_ratio, args.correspond_size)
+    server, base_url = start_mock_server(config, args.host, args.port)
+    print(f"✅ 模拟服务已启动: {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
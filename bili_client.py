@@ -0,0 +1,209 @@
+"""
+B站接口客户端
+使用刷新得到的 SESSDATA/bili_jct 调用需要登录的B站接口，服务不需要再自己实现签名和 Cookie 注入:
+- WBI 签名（sign='wbi'）: 混淆密钥从 nav 接口获取后缓存，见 signing.WbiSigner
+- APP 签名（sign='app'）: 需要传入 appkey/appsec，GET 对查询参数签名，POST 对表单参数签名
+- POST 请求自动带上 csrf（bili_jct）
+- 通过 http_client 的共享连接池发送，经过 resilience 的重试与熔断
+- 可选的响应缓存: 幂等的 GET 请求在 cache_ttl 秒内直接返回缓存的结果
+- 传入 credential_pool.CredentialPool 时每个请求轮换使用池中的账号
+
+用法:
+    from bili_client import BiliClient
+    client = BiliClient.from_tokens('tokens.json', cache_ttl=30)
+    nav = client.get('/x/web-interface/nav')
+    info = client.get('/x/space/wbi/acc/info', {'mid': 2}, sign='wbi')
+"""
+import threading
+import time
+from collections import OrderedDict
+
+import http_client
+import resilience
+from http_client import BILIBILI_HEADERS
+from signing import WBI_KEY_TTL, AppSigner, WbiSigner, keys_from_nav
+
+NAV_PATH = '/x/web-interface/nav'
+# 响应缓存最多保存的条目数
+MAX_CACHE_ENTRIES = 1024
+# WBI 签名被拒绝（密钥已更换）时返回的错误码
+WBI_REJECTED = -352
+
+
+class BiliApiError(Exception):
+    """B站接口返回了非0的错误码"""
+
+    def __init__(self, code, message=None):
+        super().__init__(f"code {code}: {message}")
+        self.code = code
+        self.message = message
+
+
+class ResponseCache:
+    """按 TTL 过期的 LRU 缓存（线程安全）"""
+
+    def __init__(self, ttl, max_entries=MAX_CACHE_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class BiliClient:
+    """B站接口客户端（线程安全）
+
+    sessdata/bili_jct: 单个账号的凭据；pool: 凭据池，给出时忽略 sessdata/bili_jct
+    cache_ttl: GET 响应的缓存时间（秒），0 表示不缓存；使用凭据池时不缓存，
+               否则一个账号的响应（如 nav）会返回给使用其他账号的请求
+    max_connections: 并发请求数较多时扩大每个主机的连接池
+    """
+
+    def __init__(self, sessdata=None, bili_jct=None, pool=None, cache_ttl=0,
+                 appkey=None, appsec=None, base_url=None, wbi_ttl=WBI_KEY_TTL, max_connections=None):
+        self.sessdata = sessdata
+        self.bili_jct = bili_jct
+        self.pool = pool
+        self.base_url = (base_url or http_client.API_URL).rstrip('/')
+        self.cache = ResponseCache(cache_ttl) if cache_ttl and pool is None else None
+        self.wbi = WbiSigner(self._fetch_wbi_keys, wbi_ttl)
+        self.app = AppSigner(appkey, appsec) if appkey and appsec else None
+        if max_connections:
+            http_client.ensure_pool_size(max_connections)
+
+    @classmethod
+    def from_account(cls, account, **kwargs):
+        """由 tokens.json 格式的账号字典创建"""
+        return cls(account.get('sessdata'), account.get('bili_jct'), **kwargs)
+
+    @classmethod
+    def from_tokens(cls, path='tokens.json', **kwargs):
+        """由 tokens.json（或多账号文件中的第一个账号）创建"""
+        from bili_refresh import load_accounts
+        return cls.from_account(load_accounts(path)[0], **kwargs)
+
+    def _url(self, path):
+        return path if path.startswith(('http://', 'https://')) else f"{self.base_url}{path}"
+
+    def _fetch_wbi_keys(self):
+        # 未登录时 nav 返回 -101，但 wbi_img 仍然有效
+        response = resilience.get(self._url(NAV_PATH), headers=BILIBILI_HEADERS,
+                                  cookies=self._cookies(None))
+        response.raise_for_status()
+        return keys_from_nav(response.json()['data'])
+
+    def _cookies(self, credential):
+        if credential is not None:
+            return credential.cookies
+        cookies = {}
+        if self.sessdata:
+            cookies['SESSDATA'] = self.sessdata
+        if self.bili_jct:
+            cookies['bili_jct'] = self.bili_jct
+        return cookies
+
+    def _query(self, params, sign):
+        if sign == 'wbi':
+            return self.wbi.sign(params)
+        if sign == 'app':
+            if self.app is None:
+                raise ValueError("APP 签名需要 appkey 和 appsec")
+            return self.app.sign(params)
+        if sign is not None:
+            raise ValueError(f"未知的签名方式: {sign}")
+        return None
+
+    def _send(self, method, path, params, data, sign):
+        credential = None
+        if self.pool is not None:
+            from credential_pool import NoCredentialError
+
+            credential = self.pool.acquire()
+            if credential is None:
+                raise NoCredentialError("没有可用的凭据")
+        if method == 'POST':
+            csrf = credential.bili_jct if credential is not None else self.bili_jct
+            data = dict(data or {})
+            if csrf:
+                data.setdefault('csrf', csrf)
+
+        url = self._url(path)
+        headers = BILIBILI_HEADERS
+        if method == 'POST' and sign == 'app':
+            # APP 接口的 POST 对表单参数（连同查询参数）一起签名，签名后的表单已经编码好
+            data = self._query({**(params or {}), **(data or {})}, sign)
+            params = None
+            headers = {**BILIBILI_HEADERS, 'Content-Type': 'application/x-www-form-urlencoded'}
+        else:
+            query = self._query(params or {}, sign)
+            if query is not None:
+                # 签名后的查询字符串已经编码好，不再交给 requests 编码
+                url, params = f"{url}?{query}", None
+        # 请求失败、HTTP 错误或响应不是JSON时也要报告，HTTP 412 拦截页面按 -412 报告使凭据进入隔离
+        code = None
+        try:
+            response = resilience.request(method, url, params=params, data=data,
+                                          headers=headers, cookies=self._cookies(credential))
+            if credential is not None:
+                from credential_pool import response_code
+
+                code = response_code(response)
+            response.raise_for_status()
+            body = response.json()
+            code = body.get('code')
+            return body
+        finally:
+            if credential is not None:
+                self.pool.report(credential, code)
+
+    def request(self, method, path, params=None, data=None, sign=None):
+        """发送请求，返回响应的 data 字段，错误码非0时抛出 BiliApiError"""
+        body = self._send(method, path, params, data, sign)
+        if body.get('code') == WBI_REJECTED and sign == 'wbi':
+            # 密钥可能已经更换，重新获取后再试一次
+            self.wbi.invalidate()
+            body = self._send(method, path, params, data, sign)
+        if body.get('code') != 0:
+            raise BiliApiError(body.get('code'), body.get('message'))
+        return body.get('data')
+
+    def get(self, path, params=None, sign=None, cache=True):
+        """GET 请求；启用缓存时相同的 path/params 在 cache_ttl 内只请求一次"""
+        if self.cache is None or not cache:
+            return self.request('GET', path, params, sign=sign)
+        # 签名参数（wts、w_rid）每次都不同，用签名前的参数作为缓存键
+        key = (path, tuple(sorted((params or {}).items())), sign, self.sessdata)
+        data = self.cache.get(key)
+        if data is None:
+            data = self.request('GET', path, params, sign=sign)
+            self.cache.set(key, data)
+        return data
+
+    def post(self, path, data=None, params=None, sign=None):
+        """POST 表单请求，自动带上 csrf"""
+        return self.request('POST', path, params, data, sign)
+
+    def nav(self):
+        """当前账号的登录状态与基本信息"""
+        return self.get(NAV_PATH, cache=False)
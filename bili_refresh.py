@@ -0,0 +1,787 @@
+"""
+B站Cookie刷新库
+官方Cookie刷新流程与凭据来源、结果去向解耦，可以在常驻服务中直接调用，
+复用已建立的连接和缓存的公钥，不需要每次刷新都启动新的 Python 进程。
+
+流程: check_need_refresh -> get_correspond_path -> get_refresh_csrf -> refresh_cookie -> confirm_refresh
+来源（Source）: EnvSource（环境变量）、TokensFileSource（tokens.json / 账号数组）、StoreSource（Token数据库）
+去向（Sink）: SessdataFileSink（SESSDATA文件）、GitHubSecretsSink、ServerSink（进程内 SESSDATA 服务）、
+             PublicationSink（多账号分片发布）、CredentialPoolSink（进程内凭据池）
+
+用法:
+    from bili_refresh import Refresher, TokensFileSource, SessdataFileSink
+    refresher = Refresher(TokensFileSource('tokens.json'), [SessdataFileSink()])
+    results = refresher.run()
+"""
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+import http_client
+import metrics
+import resilience
+from crypto_utils import get_correspond_path
+from http_client import BILIBILI_HEADERS
+from sessdata_file import SESSDATA_FILE, atomic_write, build_document, write_sessdata
+
+DEFAULT_CONCURRENCY = 8
+
+# 写入日志的刷新状态（见 journal.py）：
+# refreshed 已拿到新凭据、待确认更新；confirmed 已确认（或已放弃确认）、待写回来源和发布
+STATE_REFRESHED = 'refreshed'
+STATE_CONFIRMED = 'confirmed'
+# 从日志恢复时确认更新最多尝试的次数，之后不再确认
+MAX_CONFIRM_ATTEMPTS = 3
+
+# correspond 页面按块读取的大小（字节）
+CORRESPOND_CHUNK_SIZE = 4096
+# 找到口令后最多再读取的页面内容（字节），读完的连接放回连接池复用，超过时关闭连接
+CORRESPOND_DRAIN_LIMIT = 256 * 1024
+# 口令标签（开始标签到结束标签）的最大长度，超过时不再等待结束标签
+REFRESH_CSRF_MAX_TAG = 1024
+# requests 默认已经带上 Accept-Encoding: gzip, deflate
+CORRESPOND_HEADERS = {
+    **BILIBILI_HEADERS,
+    'Accept': 'text/html,application/xhtml+xml,*/*;q=0.8',
+}
+_REFRESH_CSRF_MARKER = b'<div id="1-name">'
+_REFRESH_CSRF_RE = re.compile(re.escape(_REFRESH_CSRF_MARKER) + rb'([^<]+)</div>')
+
+
+@metrics.timed('check_need_refresh')
+def check_need_refresh(cookies):
+    """检查是否需要刷新Cookie
+
+    返回 (是否需要刷新, 服务器时间戳)；检查失败时返回 (None, None)，调用方不能把失败当作无需刷新
+    """
+    url = f"{http_client.PASSPORT_URL}/x/passport-login/web/cookie/info"
+    try:
+        response = resilience.get(url, resilience.HEDGED, cookies=cookies, headers=BILIBILI_HEADERS)
+        response.raise_for_status()
+        result = response.json()
+        
+        if result.get('code') == 0:
+            data = result.get('data', {})
+            return data.get('refresh', False), data.get('timestamp')
+        print(f"检查刷新状态失败: {result.get('message')} (code: {result.get('code')})")
+        return None, None
+    except Exception as e:
+        print(f"检查刷新状态失败: {e}")
+        return None, None
+
+
+def _find_refresh_csrf(chunks):
+    """在逐块到达的HTML中查找refresh_csrf，跨块边界匹配，找到后立即返回
+
+    缓冲区不超过 REFRESH_CSRF_MAX_TAG 加一个块：标签开头之后迟迟没有结束标签时丢弃
+    """
+    buffer = b''
+    for chunk in chunks:
+        buffer += chunk
+        match = _REFRESH_CSRF_RE.search(buffer)
+        if match:
+            return match.group(1).decode('utf-8')
+        start = buffer.rfind(_REFRESH_CSRF_MARKER)
+        if 0 <= start and len(buffer) - start <= REFRESH_CSRF_MAX_TAG:
+            buffer = buffer[start:]
+        else:
+            # 只保留可能是标签开头的尾部，避免缓冲整个页面
+            buffer = buffer[-(len(_REFRESH_CSRF_MARKER) - 1):]
+    return None
+
+
+def _drain(chunks, limit):
+    """读完剩余的响应内容（最多 limit 字节），读完时返回True"""
+    for chunk in chunks:
+        limit -= len(chunk)
+        if limit < 0:
+            return False
+    return True
+
+
+@metrics.timed('get_refresh_csrf')
+def get_refresh_csrf(correspond_path, cookies):
+    """获取refresh_csrf实时刷新口令（流式读取，找到口令后不再解析剩余内容）"""
+    url = f"{http_client.WWW_URL}/correspond/1/{correspond_path}"
+    try:
+        response = resilience.get(url, resilience.HEDGED, cookies=cookies,
+                                  headers=CORRESPOND_HEADERS, stream=True)
+        try:
+            response.raise_for_status()
+            # iter_content 已经解压，页面只在标签中使用ASCII，可以直接按字节匹配
+            chunks = response.iter_content(chunk_size=CORRESPOND_CHUNK_SIZE)
+            refresh_csrf = _find_refresh_csrf(chunks)
+            # 读完剩余内容后 close() 把连接放回连接池，下一个账号不需要重新握手；
+            # 未读完（超过上限或出错）时 close() 关闭连接
+            _drain(chunks, CORRESPOND_DRAIN_LIMIT)
+            return refresh_csrf
+        finally:
+            response.close()
+    except Exception as e:
+        print(f"获取refresh_csrf失败: {e}")
+        return None
+
+
+@metrics.timed('refresh_cookie')
+def refresh_cookie(refresh_token, refresh_csrf, cookies):
+    """刷新Cookie获取新会话"""
+    url = f"{http_client.PASSPORT_URL}/x/passport-login/web/cookie/refresh"
+    data = {
+        'csrf': cookies.get('bili_jct', ''),
+        'refresh_csrf': refresh_csrf,
+        'source': 'main_web',
+        'refresh_token': refresh_token
+    }
+    
+    try:
+        response = resilience.post(url, resilience.NON_IDEMPOTENT, data=data, cookies=cookies,
+                                   headers=BILIBILI_HEADERS)
+        response.raise_for_status()
+        result = response.json()
+        
+        if result.get('code') == 0:
+            # 获取新的Cookie（从响应头）
+            new_cookies = {}
+            for cookie in response.cookies:
+                new_cookies[cookie.name] = cookie.value
+            
+            # 合并新旧Cookie
+            updated_cookies = {**cookies, **new_cookies}
+            
+            # 获取新的refresh_token
+            new_refresh_token = result.get('data', {}).get('refresh_token')
+            
+            return updated_cookies, new_refresh_token
+        else:
+            print(f"刷新失败: {result.get('message')}")
+            return None, None
+    except Exception as e:
+        print(f"刷新Cookie失败: {e}")
+        return None, None
+
+
+@metrics.timed('confirm_refresh')
+def confirm_refresh(old_refresh_token, cookies):
+    """确认更新使旧会话失效"""
+    url = f"{http_client.PASSPORT_URL}/x/passport-login/web/confirm/refresh"
+    data = {
+        'csrf': cookies.get('bili_jct', ''),
+        'refresh_token': old_refresh_token
+    }
+    
+    try:
+        # 重复确认不会产生副作用，可以按幂等请求重试
+        response = resilience.post(url, resilience.IDEMPOTENT, data=data, cookies=cookies,
+                                   headers=BILIBILI_HEADERS)
+        response.raise_for_status()
+        result = response.json()
+        return result.get('code') == 0
+    except Exception as e:
+        print(f"确认更新失败: {e}")
+        return False
+
+
+def _log(log, message):
+    if log:
+        log(message)
+
+
+def refresh_account(account, log=None, leases=None, reload=None, journal=None):
+    """对单个账号执行完整刷新流程，返回结果字典（不抛异常）
+
+    结果: {"mid", "status": valid/refreshed/failed/skipped, "error", "account": 刷新后的账号,
+           "confirmed", "server_time", "fence", "elapsed"}
+    log: 可选，接收每个步骤的进度信息（如 print）
+    leases: 可选的租约后端（见 lease.py）。账号的租约被他人持有时不刷新，返回 skipped；
+            刷新成功后不释放租约，由 TTL 到期释放，保证写回凭据之前没有其他刷新者读到旧的 refresh_token
+    reload: 可选，获得租约后调用 reload(account) 读取最新凭据（多个节点共享数据库时使用）
+    journal: 可选的刷新日志（见 journal.py）。拿到新凭据后先写入日志，上次中断时从中断的步骤继续；
+             写回和发布成功后由调用方调用 finish_journal() 删除
+    """
+    with metrics.account_context(account.get('mid')), metrics.span('refresh') as record:
+        if leases is None:
+            result = _refresh_account(account, log, journal=journal)
+        else:
+            result = _refresh_leased(account, log, leases, reload, journal)
+        record['result'] = result['status']
+        return result
+
+
+def _refresh_leased(account, log, leases, reload, journal):
+    from lease import account_key
+
+    lease = leases.acquire(account_key(account))
+    if lease is None:
+        _log(log, "⚠️  其他刷新者正在处理该账号，跳过")
+        return {
+            'mid': account.get('mid'),
+            'status': 'skipped',
+            'error': "其他刷新者持有该账号的租约",
+            'account': account,
+            'elapsed': 0.0,
+        }
+    try:
+        if reload:
+            account = reload(account) or account
+        result = _refresh_account(account, log, lease, journal)
+    except BaseException:
+        lease.release()
+        raise
+    if result['status'] != 'refreshed':
+        lease.release()
+    return result
+
+
+def _resumable(entry, account):
+    """日志是否属于账号当前的凭据：来源中还是旧的 refresh_token，或者已经写回了新的"""
+    return entry is not None and account.get('refresh_token') in (
+        entry.get('old_refresh_token'), entry.get('refresh_token'))
+
+
+def _confirm(entry, lease, journal, key, log):
+    """执行确认更新并把结果写入日志"""
+    _log(log, "\n步骤5: 确认更新（使旧会话失效）...")
+    entry['confirm_attempts'] = entry.get('confirm_attempts', 0) + 1
+    if lease is not None and not lease.renew():
+        # 租约已被他人接手，不再使旧会话失效，新凭据按 fencing token 写回
+        entry['confirmed'] = False
+        entry['state'] = STATE_CONFIRMED
+        _log(log, "⚠️  账号租约已失效，跳过确认更新")
+    else:
+        entry['confirmed'] = confirm_refresh(entry['old_refresh_token'], entry['cookies'])
+        if entry['confirmed'] or entry['confirm_attempts'] >= MAX_CONFIRM_ATTEMPTS:
+            entry['state'] = STATE_CONFIRMED
+        _log(log, "✅ 确认更新成功" if entry['confirmed'] else "⚠️  确认更新失败，但Cookie已刷新")
+    if journal is not None:
+        journal.save(key, entry)
+
+
+def finish_journal(journal, result):
+    """写回和发布成功后删除账号的日志；确认更新仍未完成时保留，下次运行时重试确认"""
+    if journal is None or result['status'] != 'refreshed':
+        return
+    from lease import account_key
+
+    key = account_key(result['account'])
+    entry = journal.load(key)
+    if entry is not None and entry.get('state') == STATE_CONFIRMED:
+        journal.clear(key)
+
+
+def _refresh_account(account, log, lease=None, journal=None):
+    started = time.monotonic()
+    result = {
+        'mid': account.get('mid'),
+        'status': 'failed',
+        'error': None,
+        'account': account,
+    }
+
+    sessdata = account.get('sessdata')
+    bili_jct = account.get('bili_jct')
+    refresh_token = account.get('refresh_token')
+
+    try:
+        if not sessdata or not bili_jct or not refresh_token:
+            raise ValueError("缺少必要信息（sessdata、bili_jct、refresh_token）")
+
+        key = entry = None
+        if journal is not None:
+            from lease import account_key
+
+            key = account_key(account)
+            entry = journal.load(key)
+            if entry is not None and not _resumable(entry, account):
+                journal.clear(key)
+                entry = None
+        if entry is not None:
+            _log(log, f"⚠️  从上次中断处继续（{entry['state']}）")
+            result['resumed'] = True
+        else:
+            entry = _refresh_steps(account, log, lease, result)
+            if entry is None:
+                return result
+            if journal is not None:
+                journal.save(key, entry)
+
+        # 步骤5: 确认更新（使旧会话失效）
+        if entry['state'] == STATE_REFRESHED:
+            _confirm(entry, lease, journal, key, log)
+        result['confirmed'] = entry.get('confirmed', False)
+        if lease is not None:
+            result['fence'] = lease.token
+
+        new_cookies = entry['cookies']
+        result['account'] = {
+            **account,
+            'refresh_token': entry['refresh_token'],
+            'sessdata': new_cookies.get('SESSDATA', sessdata),
+            'bili_jct': new_cookies.get('bili_jct', bili_jct),
+            'last_refreshed': entry['refreshed_at'],
+        }
+        result['status'] = 'refreshed'
+        return result
+    except Exception as e:
+        result['error'] = str(e)
+        return result
+    finally:
+        result['elapsed'] = time.monotonic() - started
+
+
+def _refresh_steps(account, log, lease, result):
+    """步骤1-4，需要刷新且刷新成功时返回待写入日志的状态，无需刷新时返回None"""
+    mid = account.get('mid')
+    refresh_token = account['refresh_token']
+    cookies = {
+        'SESSDATA': account['sessdata'],
+        'bili_jct': account['bili_jct'],
+    }
+    if mid:
+        cookies['DedeUserID'] = str(mid)
+
+    # 步骤1: 检查是否需要刷新
+    _log(log, "\n步骤1: 检查是否需要刷新...")
+    need_refresh, timestamp = check_need_refresh(cookies)
+    # 服务器时间（毫秒），调度器用来校正本地时钟偏差
+    result['server_time'] = timestamp
+    if need_refresh is None:
+        raise Exception("检查刷新状态失败")
+    if not need_refresh:
+        _log(log, "✅ Cookie仍然有效，无需刷新")
+        result['status'] = 'valid'
+        return None
+    _log(log, f"⚠️  需要刷新Cookie (timestamp: {timestamp})")
+
+    # 步骤2: 生成CorrespondPath
+    _log(log, "\n步骤2: 生成CorrespondPath...")
+    ts = timestamp or round(time.time() * 1000)
+    correspond_path = get_correspond_path(ts)
+
+    # 步骤3: 获取refresh_csrf
+    _log(log, "\n步骤3: 获取refresh_csrf...")
+    refresh_csrf = get_refresh_csrf(correspond_path, cookies)
+    if not refresh_csrf:
+        raise Exception("获取refresh_csrf失败")
+
+    # 步骤4: 刷新Cookie（之后旧的refresh_token即将失效，必须确认仍然持有租约）
+    _log(log, "\n步骤4: 刷新Cookie...")
+    if lease is not None and not lease.renew():
+        raise Exception("账号租约已失效，放弃刷新")
+    new_cookies, new_refresh_token = refresh_cookie(refresh_token, refresh_csrf, cookies)
+    if not new_cookies or not new_refresh_token:
+        raise Exception("Cookie刷新失败")
+    _log(log, "✅ Cookie刷新成功!")
+    return {
+        'state': STATE_REFRESHED,
+        'mid': mid,
+        'old_refresh_token': refresh_token,
+        'refresh_token': new_refresh_token,
+        'cookies': new_cookies,
+        'refreshed_at': datetime.now().isoformat(),
+    }
+
+
+def refresh_accounts(accounts, concurrency=DEFAULT_CONCURRENCY, on_result=None, log=None,
+                     leases=None, reload=None, journal=None):
+    """并发刷新多个账号，按输入顺序返回每个账号的结果
+
+    concurrency: 同时进行的刷新数量上限
+    on_result: 可选回调，每个账号完成时立即调用
+    leases / reload / journal: 见 refresh_account
+    """
+    results = [None] * len(accounts)
+    http_client.ensure_pool_size(concurrency)
+    http_client.prewarm([http_client.PASSPORT_URL, http_client.WWW_URL])
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        futures = {
+            executor.submit(refresh_account, account, log, leases, reload, journal): index
+            for index, account in enumerate(accounts)
+        }
+        for future in as_completed(futures):
+            result = future.result()
+            results[futures[future]] = result
+            if on_result:
+                on_result(result)
+    return results
+
+
+def read_accounts(path):
+    """读取账号文件，返回 (账号列表, 是否为tokens.json的单对象格式)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        return [data], True
+    return data, False
+
+
+def load_accounts(path):
+    """读取账号列表，兼容单个tokens.json（对象）和多账号文件（数组）"""
+    return read_accounts(path)[0]
+
+
+def save_accounts(path, accounts, single=False):
+    """原子写回账号列表，single为True时按tokens.json的单对象格式写回"""
+    data = accounts[0] if single and len(accounts) == 1 else accounts
+    atomic_write(path, json.dumps(data, indent=2, ensure_ascii=False))
+
+
+# ---- 凭据来源 ----
+
+class Source:
+    """凭据来源：load() 读取账号列表；save() 在每个账号刷新成功后立即调用；flush() 在全部完成后调用
+
+    reload() 在获得账号租约后调用，返回该账号的最新凭据；
+    save() 返回 False 表示未能写回（如租约已被他人接手），此时保留该账号的刷新日志
+    """
+
+    def load(self):
+        raise NotImplementedError
+
+    def reload(self, account):
+        return account
+
+    def save(self, result):
+        return True
+
+    def flush(self, results=None):
+        return False
+
+
+class EnvSource(Source):
+    """从环境变量 REFRESH_TOKEN、SESSDATA、BILI_JCT、MID 读取单个账号（调用 load() 时才读取）"""
+
+    def __init__(self, environ=None):
+        self.environ = os.environ if environ is None else environ
+
+    def load(self):
+        account = {
+            'refresh_token': self.environ.get('REFRESH_TOKEN'),
+            'sessdata': self.environ.get('SESSDATA'),
+            'bili_jct': self.environ.get('BILI_JCT'),
+            'mid': self.environ.get('MID'),
+        }
+        if not account['sessdata'] or not account['bili_jct'] or not account['refresh_token']:
+            raise ValueError("缺少必要的环境变量: SESSDATA, BILI_JCT, REFRESH_TOKEN")
+        return [account]
+
+
+def _replace_account(accounts, account):
+    """按 mid 替换账号；没有 mid 的账号只在文件中只有一个账号时替换"""
+    mid = account.get('mid')
+    if not mid:
+        return [account] if len(accounts) == 1 else accounts
+    return [account if a.get('mid') == mid else a for a in accounts]
+
+
+class TokensFileSource(Source):
+    """tokens.json（单个对象）或账号数组文件
+
+    默认在全部完成后、有账号刷新成功时整体原子写回。
+    shared 为 True 时（多个进程用租约刷新同一个文件）: reload() 在租约内从文件重新读取账号，
+    save() 在文件锁内只替换刷新成功的账号（读-改-写），不会用本进程的旧副本覆盖
+    其他进程刚写回的 refresh_token；此时多账号文件中的每个账号都需要有 mid。
+    """
+
+    def __init__(self, path='tokens.json', shared=False):
+        self.path = path
+        self.shared = shared
+        self.single = False
+        self._accounts = []
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def load(self):
+        self._accounts, self.single = read_accounts(self.path)
+        if self.shared and len(self._accounts) > 1 and any(not a.get('mid') for a in self._accounts):
+            raise ValueError(f"{self.path}: 多个刷新者共享多账号文件时，每个账号都需要 mid")
+        return list(self._accounts)
+
+    def reload(self, account):
+        if not self.shared:
+            return account
+        accounts = read_accounts(self.path)[0]
+        if not account.get('mid'):
+            return accounts[0] if len(accounts) == 1 else account
+        for latest in accounts:
+            if latest.get('mid') == account.get('mid'):
+                return latest
+        return account
+
+    def save(self, result):
+        account = result['account']
+        if not self.shared:
+            with self._lock:
+                self._accounts = _replace_account(self._accounts, account)
+                self._dirty = True
+            return True
+        from lease import file_lock
+        with file_lock(self.path + '.lock'):
+            accounts, single = read_accounts(self.path)
+            save_accounts(self.path, _replace_account(accounts, account), single)
+        return True
+
+    def flush(self, results=None):
+        """整体写回，返回是否写入了文件（shared 模式下 save() 已经逐个写回）
+
+        results: 本次刷新的全部结果（按 load() 的顺序），为 None 时写回 save() 收到的账号
+        """
+        if self.shared:
+            return False
+        with self._lock:
+            if results is not None:
+                if not any(r['status'] == 'refreshed' for r in results):
+                    return False
+                self._accounts = [r['account'] for r in results]
+            elif not self._dirty:
+                return False
+            self._dirty = False
+            accounts = list(self._accounts)
+        save_accounts(self.path, accounts, self.single)
+        return True
+
+
+class StoreSource(Source):
+    """Token数据库（token_store.TokenStore 或数据库路径），每个账号刷新成功后立即写回对应的一行"""
+
+    def __init__(self, store):
+        if isinstance(store, str):
+            from token_store import TokenStore
+            store = TokenStore(store)
+        self.store = store
+
+    def load(self):
+        return list(self.store.all())
+
+    def reload(self, account):
+        return self.store.get(account['mid'])
+
+    def save(self, result):
+        account = result['account']
+        if self.store.update_tokens(account['mid'], account['refresh_token'], account['sessdata'],
+                                    account['bili_jct'], account.get('last_refreshed'),
+                                    fence=result.get('fence')):
+            return True
+        print(f"⚠️  [{account['mid']}] 租约已被他人接手，未写回凭据")
+        return False
+
+
+# ---- 结果去向 ----
+
+class Sink:
+    """结果去向：publish() 在全部账号处理完成后调用"""
+
+    def publish(self, results, log=None):
+        raise NotImplementedError
+
+
+class SessdataFileSink(Sink):
+    """把单个账号的SESSDATA写入文件（值未变化时不重写）"""
+
+    def __init__(self, path=SESSDATA_FILE):
+        self.path = path
+
+    def publish(self, results, log=None):
+        result = results[0]
+        if result['status'] not in ('valid', 'refreshed'):
+            return
+        written, document = write_sessdata(result['account']['sessdata'], self.path)
+        if not written:
+            _log(log, "✅ SESSDATA未变化，无需更新文件")
+        else:
+            _log(log, f"✅ SESSDATA文件已更新: {document['value'][:30]}...")
+            _log(log, f"   更新时间: {document['updated']}")
+
+
+class GitHubSecretsSink(Sink):
+    """把刷新后的 REFRESH_TOKEN、SESSDATA、BILI_JCT 写入一个或多个仓库/组织的 Actions Secrets
+
+    发布器在第一次需要写入时才创建，同一个 Sink 多次刷新之间复用公钥缓存和连接
+    targets: 额外的目标列表（格式见 github_secrets.py）。owner/repo 总是第一个目标，
+             否则工作流自己的 REFRESH_TOKEN 不会更新，下次运行会读到已经失效的 refresh_token。
+             目标在创建时解析，配置错误时在刷新（使旧 refresh_token 失效）之前就报错
+    """
+
+    def __init__(self, token, owner, repo, proxies=None, targets=None):
+        from github_secrets import parse_targets
+
+        self.token = token
+        self.owner = owner
+        self.repo = repo
+        self.proxies = proxies
+        self.targets = list(dict.fromkeys([f"{owner}/{repo}", *(t.strip() for t in targets or ())]))
+        parse_targets(','.join(self.targets))
+        self._publisher = None
+
+    @classmethod
+    def from_env(cls, environ=None, proxies=None):
+        """从 REPO_ACCESS_TOKEN、GITHUB_OWNER、GITHUB_REPO 环境变量创建，
+        设置了 GITHUB_SECRET_TARGETS（逗号分隔）时同时写入其中的所有目标"""
+        environ = os.environ if environ is None else environ
+        token = environ.get('REPO_ACCESS_TOKEN')
+        if not token:
+            raise ValueError("缺少必要的环境变量: REPO_ACCESS_TOKEN")
+        owner = environ.get('GITHUB_OWNER', 'defy997')
+        repo = environ.get('GITHUB_REPO', 'bilibili-api')
+        targets = environ.get('GITHUB_SECRET_TARGETS', '').replace(',', ' ').split()
+        return cls(token, owner, repo, proxies=proxies, targets=targets)
+
+    @property
+    def publisher(self):
+        if self._publisher is None:
+            # 只在需要写入Secret时才导入加密库
+            from github_secrets import SecretFanout
+            self._publisher = SecretFanout(self.token, self.targets, proxies=self.proxies)
+        return self._publisher
+
+    def publish(self, results, log=None):
+        result = results[0]
+        if result['status'] != 'refreshed':
+            return
+        account = result['account']
+        _log(log, f"\n更新GitHub Secrets（{len(self.targets)} 个目标）...")
+        statuses = self.publisher.publish({
+            'REFRESH_TOKEN': account['refresh_token'],
+            'SESSDATA': account['sessdata'],
+            'BILI_JCT': account['bili_jct'],
+        })
+        written = 0
+        for target, target_statuses in statuses.items():
+            for name, status in target_statuses.items():
+                written += 1
+                if status not in [201, 204]:
+                    _log(log, f"⚠️  更新 {target} 的Secret {name} 返回状态码: {status}")
+        _log(log, f"✅ GitHub Secrets更新成功（写入 {written} 个，其余未变化）")
+
+
+class GitHubContentsSink(Sink):
+    """把本地文件（如 SESSDATA）通过 Git Data API 提交到仓库分支，不需要 git commit + push
+
+    应放在写文件的 Sink 之后；内容与上次发布相同时不请求GitHub接口（见 github_contents.py）
+    """
+
+    def __init__(self, token, owner, repo, paths, branch='main', proxies=None):
+        self.token = token
+        self.owner = owner
+        self.repo = repo
+        self.paths = list(paths)
+        self.branch = branch
+        self.proxies = proxies
+        self._publisher = None
+
+    @classmethod
+    def from_env(cls, environ=None, proxies=None):
+        """从 REPO_ACCESS_TOKEN、GITHUB_OWNER、GITHUB_REPO、PUBLISH_FILES（逗号分隔，默认 SESSDATA，
+        设为空时不提交）、GITHUB_BRANCH（默认为 GITHUB_REF_NAME 或 main）环境变量创建"""
+        environ = os.environ if environ is None else environ
+        token = environ.get('REPO_ACCESS_TOKEN')
+        if not token:
+            raise ValueError("缺少必要的环境变量: REPO_ACCESS_TOKEN")
+        paths = [p.strip() for p in environ.get('PUBLISH_FILES', SESSDATA_FILE).split(',') if p.strip()]
+        branch = environ.get('GITHUB_BRANCH') or environ.get('GITHUB_REF_NAME') or 'main'
+        return cls(token, environ.get('GITHUB_OWNER', 'defy997'), environ.get('GITHUB_REPO', 'bilibili-api'),
+                   paths, branch, proxies=proxies)
+
+    @property
+    def publisher(self):
+        if self._publisher is None:
+            from github_contents import ContentsPublisher
+            self._publisher = ContentsPublisher(self.token, self.owner, self.repo, self.branch,
+                                                proxies=self.proxies)
+        return self._publisher
+
+    def publish(self, results, log=None):
+        if not self.paths or not any(r['status'] in ('valid', 'refreshed') for r in results):
+            return
+        commit = self.publisher.publish(self.paths)
+        if commit is None:
+            _log(log, f"✅ {', '.join(self.paths)} 与仓库中相同，无需提交")
+
+
+class ServerSink(Sink):
+    """直接更新同一进程中的 sessdata_server.SessdataCache，不经过文件"""
+
+    def __init__(self, cache):
+        self.cache = cache
+        self._value = None
+
+    def publish(self, results, log=None):
+        result = results[0]
+        if result['status'] not in ('valid', 'refreshed'):
+            return
+        value = result['account']['sessdata']
+        if value != self._value:
+            self.cache.set_document(build_document(value))
+            self._value = value
+
+
+class CredentialPoolSink(Sink):
+    """把刷新后的凭据更新到同一进程中的 credential_pool.CredentialPool"""
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def publish(self, results, log=None):
+        accounts = [r['account'] for r in results if r['status'] in ('valid', 'refreshed')]
+        updated = self.pool.update(accounts)
+        if updated:
+            _log(log, f"✅ 凭据池已更新 {updated} 个账号")
+
+
+class PublicationSink(Sink):
+    """把所有账号的SESSDATA发布为分片目录（见 publication.py）"""
+
+    def __init__(self, publish_dir):
+        self.publish_dir = publish_dir
+        # 最近一次发布中SESSDATA有变化的账号
+        self.changed = []
+
+    def publish(self, results, log=None):
+        from publication import publish_accounts
+        self.changed = publish_accounts([r['account'] for r in results], self.publish_dir)
+        _log(log, f"✅ 已发布到 {self.publish_dir}，{len(self.changed)} 个账号的SESSDATA有变化")
+
+
+class Refresher:
+    """从来源读取账号、刷新、写回来源并发布到各个去向
+
+    同一个 Refresher 可以反复调用 run()，连接池、DNS缓存和公钥缓存在多次刷新之间复用
+    leases: 可选的租约后端（见 lease.py），多个刷新者之间不会同时刷新同一个账号
+    journal: 可选的刷新日志（见 journal.py），写回来源和发布全部成功后才删除，中断后下次运行从中断处继续
+    """
+
+    def __init__(self, source, sinks=(), concurrency=DEFAULT_CONCURRENCY, log=None, leases=None,
+                 journal=None):
+        self.source = source
+        self.sinks = list(sinks)
+        self.concurrency = concurrency
+        self.log = log
+        self.leases = leases
+        self.journal = journal
+
+    def run(self, on_result=None):
+        """执行一次刷新，按来源中的顺序返回每个账号的结果"""
+        accounts = self.source.load()
+        # 未能写回来源的结果保留刷新日志
+        rejected = set()
+
+        def handle(result):
+            if result['status'] == 'refreshed' and not self.source.save(result):
+                rejected.add(id(result))
+            if on_result:
+                on_result(result)
+
+        results = refresh_accounts(accounts, min(self.concurrency, max(len(accounts), 1)),
+                                   on_result=handle, log=self.log, leases=self.leases,
+                                   reload=self.source.reload, journal=self.journal)
+        self.source.flush(results)
+        if results:
+            for sink in self.sinks:
+                sink.publish(results, self.log)
+        for result in results:
+            if id(result) not in rejected:
+                finish_journal(self.journal, result)
+        return results
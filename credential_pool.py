@@ -0,0 +1,319 @@
+"""
+凭据池
+把刷新得到的多个账号的 SESSDATA/bili_jct 轮换分配给调用B站接口的服务，
+总吞吐量随账号数量增长，而不是所有请求都压在同一个 SESSDATA 上触发限流。
+- 分配策略: round_robin（轮询）、lru（最久未使用）、weighted（按账号 weight 步进调度，按比例交错分配）
+- 每个凭据一个令牌桶，限制单个账号的请求速率，所有凭据都没有余量时等待
+- 可用的凭据与等待令牌/隔离结束的凭据分别放在两个堆中，分配为 O(log n)，不随账号数量线性增长
+- 返回 -412/-352 或 HTTP 412（请求被拦截）的凭据隔离一段时间，连续被拦截时隔离时间加倍；
+  返回 -101（账号未登录）的凭据隔离到 update() 提供新的 SESSDATA 为止
+
+凭据来源: 账号列表（tokens.json 格式）、Token数据库、发布目录（PublicationClient），
+或在刷新服务进程内通过 bili_refresh.CredentialPoolSink 在每次刷新后更新。
+
+用法:
+    from credential_pool import CredentialPool
+    pool = CredentialPool.from_store('tokens.db', strategy='lru', rate=2)
+    response = pool.request('GET', 'https://api.bilibili.com/x/web-interface/nav')
+"""
+import heapq
+import threading
+import time
+
+import http_client
+from rate_limit import TokenBucket
+
+ROUND_ROBIN = 'round_robin'
+LRU = 'lru'
+WEIGHTED = 'weighted'
+STRATEGIES = (ROUND_ROBIN, LRU, WEIGHTED)
+
+# 每个凭据每秒的请求数与允许的突发请求数
+DEFAULT_RATE = 2.0
+DEFAULT_BURST = 5
+# 被拦截后的首次隔离时间（秒），连续被拦截时加倍直到 MAX_QUARANTINE
+QUARANTINE = 60
+MAX_QUARANTINE = 3600
+
+NOT_LOGGED_IN = -101
+# 请求被拦截 / 风控校验失败
+RATE_LIMITED_CODES = frozenset({-412, -352})
+# 风控拦截时B站返回 HTTP 412 和一个HTML页面，没有JSON错误码
+BLOCKED_STATUS = 412
+
+
+class NoCredentialError(Exception):
+    """等待超时仍没有可用的凭据，或池中没有可能恢复的凭据"""
+
+
+class Credential:
+    """池中的一个账号凭据及其使用状态"""
+
+    def __init__(self, mid, sessdata, bili_jct=None, weight=1, rate=DEFAULT_RATE, burst=DEFAULT_BURST):
+        self.mid = mid
+        # 在池中的键（mid，没有 mid 时为最初的 SESSDATA）
+        self.key = mid
+        self.sessdata = sessdata
+        self.bili_jct = bili_jct
+        self.weight = max(1, int(weight))
+        self.bucket = TokenBucket(rate, burst)
+        self.uses = 0
+        self.last_used = 0.0
+        self.strikes = 0
+        self.quarantined_until = 0.0
+        self.quarantine_reason = None
+        # weighted 策略的虚拟时间，每次被选中增加 1/weight
+        self._pass = 0.0
+        # 状态变化时递增，堆中版本不同的旧条目直接丢弃
+        self._version = 0
+
+    @property
+    def cookies(self):
+        cookies = {'SESSDATA': self.sessdata}
+        if self.bili_jct:
+            cookies['bili_jct'] = self.bili_jct
+        return cookies
+
+    def quarantined(self, now):
+        return self.quarantined_until > now
+
+    def available_at(self, now):
+        """下次可以使用的时间（monotonic），等待新 SESSDATA 时为 inf"""
+        if self.quarantined(now):
+            return self.quarantined_until
+        return now + self.bucket.wait_time()
+
+
+def response_code(response):
+    """响应对应的B站错误码，HTTP 412 拦截页面按 -412 处理，其他非JSON响应返回None"""
+    if response.status_code == BLOCKED_STATUS:
+        return -412
+    return http_client.api_code(response)
+
+
+def _account_id(account):
+    return account.get('mid') or account.get('sessdata')
+
+
+class CredentialPool:
+    """线程安全的凭据池"""
+
+    def __init__(self, accounts=(), strategy=ROUND_ROBIN, rate=DEFAULT_RATE, burst=DEFAULT_BURST):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"未知的分配策略: {strategy}")
+        self.strategy = strategy
+        self.rate = rate
+        self.burst = burst
+        self._credentials = {}
+        self._order = []
+        # 可用的凭据: (策略排序键, 序号, 版本, 凭据)
+        self._ready = []
+        # 等待令牌或隔离结束的凭据: (可用时间, 序号, 版本, 凭据)；等待新 SESSDATA 的凭据不在任何堆中
+        self._waiting = []
+        self._seq = 0
+        # weighted 策略最近一次选中的虚拟时间，重新可用的凭据从这里开始，不会补偿等待期间少分配的次数
+        self._vtime = 0.0
+        self._cond = threading.Condition()
+        self.update(accounts)
+
+    # ---- 凭据来源 ----
+
+    @classmethod
+    def from_store(cls, path, **kwargs):
+        """从Token数据库读取所有账号"""
+        from token_store import TokenStore
+        return cls(TokenStore(path).all(), **kwargs)
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        """从 tokens.json 或多账号文件读取"""
+        from bili_refresh import load_accounts
+        return cls(load_accounts(path), **kwargs)
+
+    def update_from_publication(self, client):
+        """同步发布目录（sessdata_client.PublicationClient）并更新凭据，发布内容不含 bili_jct"""
+        client.sync()
+        self.update([{'mid': d['mid'], 'sessdata': d['value']} for d in client.documents.values()])
+
+    def update(self, accounts):
+        """加入或更新账号（按 mid 匹配），SESSDATA 变化的凭据解除隔离，返回更新的数量"""
+        updated = 0
+        with self._cond:
+            for account in accounts:
+                key, sessdata = _account_id(account), account.get('sessdata')
+                if key is None or not sessdata:
+                    continue
+                credential = self._credentials.get(key)
+                if credential is None:
+                    credential = Credential(account.get('mid'), sessdata, account.get('bili_jct'),
+                                            account.get('weight', 1), self.rate, self.burst)
+                    credential.key = key
+                    self._credentials[key] = credential
+                    self._order.append(credential)
+                elif credential.sessdata != sessdata:
+                    credential.sessdata = sessdata
+                    credential.strikes = 0
+                    credential.quarantined_until = 0.0
+                    credential.quarantine_reason = None
+                else:
+                    continue
+                credential.bili_jct = account.get('bili_jct') or credential.bili_jct
+                self._schedule(credential, time.monotonic())
+                updated += 1
+            self._cond.notify_all()
+        return updated
+
+    def remove(self, mid):
+        with self._cond:
+            credential = self._credentials.pop(mid, None)
+            if credential is not None:
+                self._order.remove(credential)
+                credential._version += 1
+
+    # ---- 分配 ----
+
+    def _schedule(self, credential, now):
+        """按凭据当前状态放入可用堆或等待堆，堆中该凭据的旧条目随之失效"""
+        credential._version += 1
+        self._seq += 1
+        self._compact()
+        at = credential.available_at(now)
+        if at == float('inf'):
+            return
+        if at > now:
+            heapq.heappush(self._waiting, (at, self._seq, credential._version, credential))
+            return
+        if self.strategy == ROUND_ROBIN:
+            # 按进入可用堆的先后顺序轮流分配
+            key = self._seq
+        elif self.strategy == LRU:
+            key = credential.last_used
+        else:
+            credential._pass = max(credential._pass, self._vtime)
+            key = credential._pass
+        heapq.heappush(self._ready, (key, self._seq, credential._version, credential))
+
+    def _compact(self):
+        """失效条目过多时重建堆，避免频繁 report()/update() 让堆无限增长"""
+        limit = 2 * len(self._order) + 64
+        for heap in (self._ready, self._waiting):
+            if len(heap) > limit:
+                heap[:] = [entry for entry in heap if entry[2] == entry[3]._version]
+                heapq.heapify(heap)
+
+    def _promote(self, now):
+        """把已到可用时间的凭据从等待堆移到可用堆"""
+        while self._waiting and self._waiting[0][0] <= now:
+            _, _, version, credential = heapq.heappop(self._waiting)
+            if version == credential._version:
+                self._schedule(credential, now)
+
+    def _pick(self, now):
+        """按策略从当前有令牌且未被隔离的凭据中选择一个，没有时返回None"""
+        self._promote(now)
+        while self._ready:
+            _, _, version, credential = heapq.heappop(self._ready)
+            if version != credential._version:
+                continue
+            if credential.quarantined(now) or not credential.bucket.try_acquire():
+                self._schedule(credential, now)
+                continue
+            credential.uses += 1
+            credential.last_used = now
+            if self.strategy == WEIGHTED:
+                # 步进调度：权重高的账号虚拟时间增长慢，被选中的次数按权重比例增加，且不会连续集中
+                self._vtime = credential._pass
+                credential._pass += 1.0 / credential.weight
+            self._schedule(credential, now)
+            return credential
+        return None
+
+    def _wait_time(self, now):
+        """距离下一个凭据可用的时间，池为空或全部等待新 SESSDATA 时返回None"""
+        if self._ready:
+            return 0.0
+        while self._waiting:
+            at, _, version, credential = self._waiting[0]
+            if version == credential._version:
+                return max(at - now, 0.0)
+            heapq.heappop(self._waiting)
+        return None
+
+    def try_acquire(self):
+        """立即取得一个凭据，没有可用凭据时返回None"""
+        with self._cond:
+            return self._pick(time.monotonic())
+
+    def acquire(self, timeout=None):
+        """取得一个凭据，所有凭据都在限速或隔离中时等待，超时返回None
+
+        池为空或所有凭据都在等待新 SESSDATA（-101）时没有凭据会自行恢复，立即抛出 NoCredentialError
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                credential = self._pick(now)
+                if credential is not None:
+                    return credential
+                wait = self._wait_time(now)
+                if wait is None:
+                    raise NoCredentialError("凭据池为空或所有凭据都在等待新的 SESSDATA")
+                if deadline is not None:
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        return None
+                    wait = min(wait, remaining)
+                # update() 加入新凭据时会提前唤醒
+                self._cond.wait(wait)
+
+    def report(self, credential, code=None):
+        """报告一次请求的结果（B站错误码），被拦截或未登录的凭据进入隔离"""
+        with self._cond:
+            now = time.monotonic()
+            if code in RATE_LIMITED_CODES:
+                credential.strikes += 1
+                duration = min(QUARANTINE * 2 ** (credential.strikes - 1), MAX_QUARANTINE)
+                credential.quarantined_until = now + duration
+                credential.quarantine_reason = f"code {code}"
+            elif code == NOT_LOGGED_IN:
+                # 等待刷新后的新 SESSDATA
+                credential.quarantined_until = float('inf')
+                credential.quarantine_reason = "账号未登录"
+            elif code == 0:
+                credential.strikes = 0
+                return
+            else:
+                return
+            if self._credentials.get(credential.key) is credential:
+                self._schedule(credential, now)
+
+    def request(self, method, url, timeout=None, **kwargs):
+        """用池中的凭据发送请求并根据响应的错误码报告结果
+
+        timeout: 等待可用凭据的时间（秒），超时抛出 NoCredentialError；请求本身的超时用 http_client 默认值
+        """
+        credential = self.acquire(timeout)
+        if credential is None:
+            raise NoCredentialError("没有可用的凭据")
+        kwargs.setdefault('headers', http_client.BILIBILI_HEADERS)
+        kwargs['cookies'] = {**kwargs.get('cookies', {}), **credential.cookies}
+        response = http_client.request(method, url, **kwargs)
+        self.report(credential, response_code(response))
+        return response
+
+    def stats(self):
+        """凭据数量统计: total / ready / rate_limited / quarantined"""
+        with self._cond:
+            now = time.monotonic()
+            quarantined = sum(1 for c in self._order if c.quarantined(now))
+            limited = sum(1 for c in self._order if not c.quarantined(now) and c.bucket.tokens() < 1)
+            return {
+                'total': len(self._order),
+                'ready': len(self._order) - quarantined - limited,
+                'rate_limited': limited,
+                'quarantined': quarantined,
+            }
+
+    def __len__(self):
+        return len(self._order)
@@ -0,0 +1,63 @@
+"""
+加密工具
+- CorrespondPath 签名（RSA-OAEP，B站公钥）
+- GitHub Secrets 加密（libsodium sealed box）
+公钥只解析一次，cipher/box 对象缓存复用。
+加密库在第一次使用时才导入，不需要刷新时不承担导入开销。
+"""
+import binascii
+from base64 import b64encode
+from functools import lru_cache
+
+import metrics
+
+# B站公钥（用于生成CorrespondPath）
+BILIBILI_PUBLIC_KEY = '''-----BEGIN PUBLIC KEY-----
+MIGfMA0GCSqGSIb3DQEBAQUAA4GNADCBiQKBgQDLgd2OAkcGVtoE3ThUREbio0Eg
+Uc/prcajMKXvkCKFCWhJYJcLkcM2DKKcSeFpD/j6Boy538YXnR6VhcuUJOhH2x71
+nzPjfdTcqMz7djHum0qSZA0AyCBDABUqCrfNgCiJ00Ra7GmRj+YCK1NJEuewlb40
+JNrRuoEUXpabUzGB8QIDAQAB
+-----END PUBLIC KEY-----'''
+
+
+@lru_cache(maxsize=None)
+def _oaep_cipher():
+    from Crypto.Cipher import PKCS1_OAEP
+    from Crypto.Hash import SHA256
+    from Crypto.PublicKey import RSA
+
+    key = RSA.importKey(BILIBILI_PUBLIC_KEY)
+    return PKCS1_OAEP.new(key, SHA256)
+
+
+@lru_cache(maxsize=64)
+def _sealed_box(public_key: str):
+    from nacl import encoding, public
+
+    key = public.PublicKey(public_key.encode("utf-8"), encoding.Base64Encoder())
+    return public.SealedBox(key)
+
+
+@metrics.timed('get_correspond_path')
+def get_correspond_path(timestamp):
+    """生成CorrespondPath签名（RSA-OAEP加密）"""
+    encrypted = _oaep_cipher().encrypt(f'refresh_{timestamp}'.encode())
+    return binascii.b2a_hex(encrypted).decode()
+
+
+def encrypt(public_key: str, secret_value: str) -> str:
+    """使用GitHub公钥加密值"""
+    encrypted = _sealed_box(public_key).encrypt(secret_value.encode("utf-8"))
+    return b64encode(encrypted).decode("utf-8")
+
+
+def encrypt_batch(public_key: str, secrets: dict) -> dict:
+    """一次性加密多个值，返回与输入相同键的密文字典
+
+    键可以是任意可哈希对象，例如 (mid, 'SESSDATA')，便于多个账号的所有Secret一次加密
+    """
+    box = _sealed_box(public_key)
+    return {
+        name: b64encode(box.encrypt(value.encode("utf-8"))).decode("utf-8")
+        for name, value in secrets.items()
+    }
@@ -0,0 +1,166 @@
+"""
+通过 GitHub Git Data API 发布文件
+不需要完整克隆仓库再 commit + push，直接在分支最新提交的基础上创建树和提交:
+- 在本地计算每个文件的 git blob SHA，与上次发布的 SHA（保存在状态文件中）比较，全部未变化时不请求任何接口
+- 有变化时: 读取分支 -> （缓存过期时）读取文件树 -> 创建树 -> 创建提交 -> 更新分支，多个文件合并为一个提交
+- 文本文件直接放在树中，二进制文件（如 .gz）先并发创建 blob
+- 发布目录时，目录中已删除的文件也从仓库中删除
+- 更新分支不是快进（期间有其他提交）时，基于新的提交重新创建
+
+状态与 GitHub Secrets 共用同一个状态文件（见 github_secrets.py）。
+"""
+import base64
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import http_client
+import metrics
+import resilience
+from github_secrets import DEFAULT_MAX_WORKERS, DEFAULT_STATE_FILE, load_state, save_state
+
+DEFAULT_BRANCH = 'main'
+DEFAULT_MESSAGE = 'Auto refresh SESSDATA [skip ci]'
+# 更新分支时遇到并发提交的最多尝试次数
+MAX_ATTEMPTS = 3
+FILE_MODE = '100644'
+
+
+def blob_sha(data: bytes) -> str:
+    """与 git hash-object 相同的 blob SHA"""
+    return hashlib.sha1(b'blob %d\0' % len(data) + data).hexdigest()
+
+
+def collect_files(paths):
+    """读取文件和目录（递归）的内容，返回 ({仓库内路径: 内容}, 目录前缀列表)"""
+    files, prefixes = {}, []
+    for path in paths:
+        if os.path.isdir(path):
+            prefix = path.strip('/').replace(os.sep, '/') + '/'
+            prefixes.append(prefix)
+            for root, _, names in os.walk(path):
+                for name in names:
+                    if name.startswith('.'):
+                        # 跳过 atomic_write 的临时文件等隐藏文件
+                        continue
+                    full = os.path.join(root, name)
+                    with open(full, 'rb') as f:
+                        files[os.path.relpath(full).replace(os.sep, '/')] = f.read()
+        else:
+            with open(path, 'rb') as f:
+                files[path.strip('/').replace(os.sep, '/')] = f.read()
+    return files, prefixes
+
+
+def _in_scope(path, files, prefixes):
+    return path in files or any(path.startswith(p) for p in prefixes)
+
+
+class ContentsPublisher:
+    """向一个仓库的一个分支发布文件"""
+
+    def __init__(self, token, owner, repo, branch=DEFAULT_BRANCH, state_file=DEFAULT_STATE_FILE,
+                 max_workers=DEFAULT_MAX_WORKERS, proxies=None):
+        self.owner = owner
+        self.repo = repo
+        self.branch = branch
+        self.state_file = state_file
+        self.max_workers = max_workers
+        self.proxies = proxies
+        self.base_address = f"{http_client.GITHUB_API_URL}/repos/{owner}/{repo}/git/"
+        self.headers = {
+            'Accept': 'application/vnd.github.v3+json',
+            'Authorization': f'token {token}',
+        }
+        self.state = load_state(state_file)
+
+    @property
+    def _state_key(self):
+        return f"contents:{self.owner}/{self.repo}@{self.branch}"
+
+    @property
+    def _branch_state(self):
+        return self.state.setdefault(self._state_key, {})
+
+    def _api(self, method, path, data=None):
+        # 树、提交和 blob 按内容寻址，重复创建结果相同；更新分支不强制，重复请求同样安全
+        response = resilience.request(method, self.base_address + path, resilience.IDEMPOTENT,
+                                      data=json.dumps(data) if data is not None else None,
+                                      headers=self.headers, proxies=self.proxies)
+        try:
+            response.raise_for_status()
+        except requests.exceptions.HTTPError:
+            if response.status_code != 422:
+                print(f"❌ GitHub接口 {method} {path} 失败: {response.status_code}")
+                print(f"响应内容: {response.text[:500]}")
+            raise
+        return response.json()
+
+    def _remote_files(self, head, base_tree, files, prefixes):
+        """分支 head 提交中与本次发布相关的文件 {路径: blob SHA}，head 未变化时使用缓存"""
+        cached = self._branch_state
+        if cached.get('head') == head:
+            return dict(cached.get('files', {}))
+        tree = self._api('GET', f"trees/{base_tree}?recursive=1")
+        if tree.get('truncated'):
+            # 文件树过大时无法得到完整列表，全部视为有变化，创建树后再比较
+            return {}
+        return {entry['path']: entry['sha'] for entry in tree['tree']
+                if entry['type'] == 'blob' and _in_scope(entry['path'], files, prefixes)}
+
+    def _tree_entry(self, path, data):
+        try:
+            return {'path': path, 'mode': FILE_MODE, 'type': 'blob', 'content': data.decode('utf-8')}
+        except UnicodeDecodeError:
+            blob = self._api('POST', 'blobs', {'content': base64.b64encode(data).decode(), 'encoding': 'base64'})
+            return {'path': path, 'mode': FILE_MODE, 'type': 'blob', 'sha': blob['sha']}
+
+    def _commit(self, head, base_tree, files, shas, remote, prefixes, message):
+        changed = [path for path, sha in shas.items() if remote.get(path) != sha]
+        deleted = [path for path in remote if path not in files and _in_scope(path, files, prefixes)]
+        if not changed and not deleted:
+            return None
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(changed) or 1))) as executor:
+            entries = list(executor.map(lambda p: self._tree_entry(p, files[p]), changed))
+        entries += [{'path': path, 'mode': FILE_MODE, 'type': 'blob', 'sha': None} for path in deleted]
+
+        tree = self._api('POST', 'trees', {'base_tree': base_tree, 'tree': entries})
+        if tree['sha'] == base_tree:
+            return None
+        commit = self._api('POST', 'commits', {'message': message, 'tree': tree['sha'], 'parents': [head]})
+        self._api('PATCH', f"refs/heads/{self.branch}", {'sha': commit['sha'], 'force': False})
+        print(f"✅ 已提交 {len(changed)} 个文件、删除 {len(deleted)} 个文件到 "
+              f"{self.owner}/{self.repo}@{self.branch} ({commit['sha'][:7]})")
+        return commit['sha']
+
+    @metrics.timed('publish_contents')
+    def publish(self, paths, message=DEFAULT_MESSAGE):
+        """发布文件/目录，返回新提交的SHA，内容未变化时返回None"""
+        files, prefixes = collect_files(paths)
+        shas = {path: blob_sha(data) for path, data in files.items()}
+        state = self._branch_state
+        published = state.get('files', {})
+        if state.get('head') and all(published.get(p) == sha for p, sha in shas.items()) and not any(
+                p not in files and _in_scope(p, files, prefixes) for p in published):
+            return None
+
+        for attempt in range(MAX_ATTEMPTS):
+            head = self._api('GET', f"ref/heads/{self.branch}")['object']['sha']
+            base_tree = self._api('GET', f"commits/{head}")['tree']['sha']
+            remote = self._remote_files(head, base_tree, files, prefixes)
+            try:
+                commit = self._commit(head, base_tree, files, shas, remote, prefixes, message)
+            except requests.exceptions.HTTPError as e:
+                # 422: 分支在此期间有了新的提交，不是快进
+                if e.response is None or e.response.status_code != 422 or attempt + 1 >= MAX_ATTEMPTS:
+                    raise
+                print("⚠️  分支已有新的提交，重新发布")
+                continue
+            remote.update(shas)
+            state['head'] = commit or head
+            state['files'] = {p: sha for p, sha in remote.items() if p in files or not _in_scope(p, files, prefixes)}
+            save_state(self.state_file, self.state, keys=[self._state_key])
+            return commit
@@ -0,0 +1,326 @@
+"""
+GitHub Secrets 发布
+- 只写入值发生变化的Secret（本地保存上次写入值的哈希）
+- 按 key_id 缓存每个仓库/组织的公钥，使用 ETag 条件请求重新验证，同一进程内只验证一次
+- 需要写入时才获取公钥，多个Secret并发PUT
+- 目标可以是多个仓库和组织（组织 Secret 可限定可见的仓库），所有目标的公钥获取、加密和PUT
+  在同一个有界线程池中并发执行
+
+目标格式（GITHUB_SECRET_TARGETS 环境变量，逗号分隔）:
+    owner/repo                     仓库 Secret
+    org:ORG                        组织 Secret，组织内私有仓库可见（private）
+    org:ORG:all                    组织 Secret，组织内所有仓库可见
+    org:ORG:repo1+repo2            组织 Secret，只有列出的仓库可见（selected）
+"""
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import http_client
+import metrics
+import resilience
+from crypto_utils import encrypt_batch
+
+# 本地状态文件：公钥缓存与已写入Secret的哈希
+DEFAULT_STATE_FILE = os.environ.get('SECRETS_STATE_FILE', '.secrets_state.json')
+DEFAULT_MAX_WORKERS = 4
+# 多个目标时线程池的大小（所有目标的请求共用）
+DEFAULT_FANOUT_WORKERS = 8
+TARGETS_ENV = 'GITHUB_SECRET_TARGETS'
+ORG_PREFIX = 'org:'
+VISIBILITIES = ('all', 'private', 'selected')
+
+
+def secret_hash(value: str) -> str:
+    """计算Secret值的哈希（只保存哈希，不保存明文）"""
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+def parse_target(spec):
+    """解析一个目标，返回 (owner, repo, visibility, selected_repos)，组织目标的 repo 为 None"""
+    spec = spec.strip()
+    if spec.startswith(ORG_PREFIX):
+        org, _, scope = spec[len(ORG_PREFIX):].partition(':')
+        if not org:
+            raise ValueError(f"无效的Secret目标: {spec}")
+        if not scope or scope in VISIBILITIES[:2]:
+            return org, None, scope or 'private', ()
+        return org, None, 'selected', tuple(r for r in scope.split('+') if r)
+    owner, _, repo = spec.partition('/')
+    if not owner or not repo or '/' in repo:
+        raise ValueError(f"无效的Secret目标: {spec}")
+    return owner, repo, None, ()
+
+
+def parse_targets(value):
+    """解析逗号/空白分隔的目标列表"""
+    return [parse_target(spec) for spec in value.replace(',', ' ').split()]
+
+
+def load_state(path):
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️  读取Secret状态文件失败，将重新写入全部Secret: {e}")
+        return {}
+
+
+def save_state(path, state, keys=None):
+    """原子写入状态文件（临时文件 + 重命名）
+
+    keys: 只写回这些顶层键，文件中的其他内容（同一状态文件的其他发布器写入的）保持不变
+    path 为 None 时不保存
+    """
+    if not path:
+        return
+    if keys is not None:
+        merged = load_state(path)
+        merged.update({key: state[key] for key in keys if key in state})
+        state = merged
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+class SecretPublisher:
+    """向一个仓库或组织发布Actions Secrets
+
+    repo 为 None 时写入组织 owner 的 Secret，visibility 为 all / private / selected，
+    selected 时只有 selected_repos（组织内的仓库名）可以使用。
+    state: 与其他发布器共用的状态字典（见 SecretFanout），为 None 时从 state_file 读取
+    """
+
+    def __init__(self, token, owner, repo=None, state_file=DEFAULT_STATE_FILE,
+                 max_workers=DEFAULT_MAX_WORKERS, proxies=None, visibility=None, selected_repos=(),
+                 state=None):
+        self.owner = owner
+        self.repo = repo
+        self.state_file = state_file
+        self.max_workers = max_workers
+        self.proxies = proxies
+        if repo is None:
+            self.visibility = visibility or 'private'
+            self.selected_repos = tuple(selected_repos)
+            if self.visibility not in VISIBILITIES:
+                raise ValueError(f"无效的组织Secret可见性: {self.visibility}")
+            self.base_address = f"{http_client.GITHUB_API_URL}/orgs/{owner}/actions/secrets/"
+        else:
+            self.visibility, self.selected_repos = None, ()
+            self.base_address = f"{http_client.GITHUB_API_URL}/repos/{owner}/{repo}/actions/secrets/"
+        self.headers = {
+            'Accept': 'application/vnd.github.v3+json',
+            'Authorization': f'token {token}',
+        }
+        self.state = load_state(state_file) if state is None else state
+        # 本进程中已验证过的公钥，同一个发布器多次发布时不再请求
+        self._public_key = None
+        self._put_params = {}
+
+    @property
+    def target(self):
+        return f"{ORG_PREFIX}{self.owner}" if self.repo is None else f"{self.owner}/{self.repo}"
+
+    @property
+    def _state_key(self):
+        return self.target
+
+    @property
+    def _repo_state(self):
+        return self.state.setdefault(self._state_key, {})
+
+    @property
+    def _scope(self):
+        """组织Secret的可见范围，范围变化时需要重新写入全部Secret"""
+        if self.repo is None:
+            return f"{self.visibility}:{'+'.join(sorted(self.selected_repos))}"
+        return None
+
+    def get_public_key(self):
+        """获取仓库/组织公钥，缓存命中时用 If-None-Match 重新验证"""
+        if self._public_key is not None:
+            return self._public_key
+        cached = self._repo_state.get('public_key')
+        headers = dict(self.headers)
+        if cached and cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+
+        response = resilience.get(self.base_address + 'public-key', resilience.IDEMPOTENT,
+                                  headers=headers, proxies=self.proxies)
+        if response.status_code == 304 and cached:
+            self._public_key = cached['key_id'], cached['key']
+            return self._public_key
+        try:
+            response.raise_for_status()
+            data = response.json()
+            key_id, key = data['key_id'], data['key']
+        except requests.exceptions.HTTPError as e:
+            print(f"❌ 获取 {self.target} 公钥失败: {e}")
+            print(f"响应内容: {response.text[:500]}")
+            raise
+        except KeyError as e:
+            print(f"❌ 获取 {self.target} 公钥失败，响应中缺少字段: {e}")
+            raise
+
+        print(f"✅ 获取 {self.target} 公钥成功 (key_id: {key_id})")
+        self._repo_state['public_key'] = {
+            'key_id': key_id,
+            'key': key,
+            'etag': response.headers.get('ETag'),
+        }
+        self._public_key = key_id, key
+        return self._public_key
+
+    def _repository_ids(self):
+        """selected 可见性需要的仓库ID（按仓库名缓存在状态文件中）"""
+        cached = self._repo_state.setdefault('repository_ids', {})
+        for name in self.selected_repos:
+            if name not in cached:
+                response = resilience.get(f"{http_client.GITHUB_API_URL}/repos/{self.owner}/{name}",
+                                          resilience.IDEMPOTENT, headers=self.headers, proxies=self.proxies)
+                try:
+                    response.raise_for_status()
+                except requests.exceptions.HTTPError as e:
+                    print(f"❌ 获取仓库 {self.owner}/{name} 失败: {e}")
+                    raise
+                cached[name] = response.json()['id']
+        return [cached[name] for name in self.selected_repos]
+
+    def _put(self, name, encrypted_value, key_id):
+        params = {
+            'encrypted_value': encrypted_value,
+            'key_id': key_id,
+        }
+        params.update(self._put_params)
+        # 用同一个值重复PUT结果相同，可以按幂等请求重试
+        response = resilience.put(self.base_address + name, resilience.IDEMPOTENT,
+                                  data=json.dumps(params), headers=self.headers,
+                                  proxies=self.proxies)
+        try:
+            response.raise_for_status()
+        except requests.exceptions.HTTPError as e:
+            if response.status_code == 422:
+                # 公钥可能已轮换，下次发布时重新验证
+                self._public_key = None
+            print(f"❌ 更新 {self.target} 的Secret {name} 失败: {e}")
+            print(f"响应内容: {response.text[:500]}")
+            raise
+        return response.status_code
+
+    def changed(self, secrets: dict) -> dict:
+        """筛选出与上次写入值不同的Secret（组织Secret的可见范围变化时全部重新写入）"""
+        state = self._repo_state
+        pushed = state.get('secrets', {}) if state.get('scope') == self._scope else {}
+        return {
+            name: value for name, value in secrets.items()
+            if value is not None and pushed.get(name) != secret_hash(value)
+        }
+
+    def prepare(self, secrets: dict):
+        """筛选出变化的Secret并用目标的公钥加密
+
+        返回 (key_id, {名称: 密文}, {名称: 明文})，没有变化时返回None
+        """
+        changed = self.changed(secrets)
+        if not changed:
+            return None
+        key_id, key = self.get_public_key()
+        if self.repo is None:
+            self._put_params = {'visibility': self.visibility}
+            if self.visibility == 'selected':
+                self._put_params['selected_repository_ids'] = self._repository_ids()
+        return key_id, encrypt_batch(key, changed), changed
+
+    def record(self, name, value):
+        """记录写入成功的Secret"""
+        state = self._repo_state
+        if state.get('scope') != self._scope:
+            state['scope'] = self._scope
+            state['secrets'] = {}
+        state.setdefault('secrets', {})[name] = secret_hash(value)
+
+    @metrics.timed('update_secrets')
+    def publish(self, secrets: dict) -> dict:
+        """写入发生变化的Secret，返回 {名称: HTTP状态码}，未变化的名称不出现在结果中"""
+        statuses, errors = fan_out([self], secrets, self.max_workers)
+        # 部分失败时也记录已成功的Secret，下次只重试失败的
+        if statuses[self.target] or errors:
+            save_state(self.state_file, self.state, keys=[self._state_key])
+        if errors:
+            raise errors[0]
+        return statuses[self.target]
+
+
+def fan_out(publishers, secrets: dict, max_workers):
+    """在一个有界线程池中把 secrets 写入多个目标
+
+    先并发获取各目标的公钥并加密，再并发PUT所有目标的所有Secret；一个目标失败不影响其他目标。
+    返回 ({目标: {名称: HTTP状态码}}, 异常列表)
+    """
+    statuses = {p.target: {} for p in publishers}
+    errors = []
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        prepared = []
+        for publisher, future in [(p, executor.submit(p.prepare, secrets)) for p in publishers]:
+            try:
+                result = future.result()
+            except Exception as e:
+                errors.append(e)
+                continue
+            if result is not None:
+                prepared.append((publisher, result))
+
+        futures = [
+            (publisher, name, changed[name], executor.submit(publisher._put, name, encrypted[name], key_id))
+            for publisher, (key_id, encrypted, changed) in prepared
+            for name in changed
+        ]
+        for publisher, name, value, future in futures:
+            try:
+                statuses[publisher.target][name] = future.result()
+                publisher.record(name, value)
+            except Exception as e:
+                errors.append(e)
+    return statuses, errors
+
+
+class SecretFanout:
+    """把同一组Secret发布到多个仓库/组织（共用状态文件和线程池）
+
+    targets: 目标字符串（格式见模块说明）或 parse_target() 的结果
+    """
+
+    def __init__(self, token, targets, state_file=DEFAULT_STATE_FILE,
+                 max_workers=DEFAULT_FANOUT_WORKERS, proxies=None):
+        self.state_file = state_file
+        self.max_workers = max_workers
+        self.state = load_state(state_file)
+        self.publishers = []
+        for target in targets:
+            owner, repo, visibility, selected = parse_target(target) if isinstance(target, str) else target
+            self.publishers.append(SecretPublisher(token, owner, repo, state_file, proxies=proxies,
+                                                   visibility=visibility, selected_repos=selected,
+                                                   state=self.state))
+
+    @property
+    def targets(self):
+        return [p.target for p in self.publishers]
+
+    @metrics.timed('update_secrets')
+    def publish(self, secrets: dict) -> dict:
+        """写入各目标中发生变化的Secret，返回 {目标: {名称: HTTP状态码}}
+
+        部分目标失败时，成功写入的仍会记录，然后抛出第一个异常
+        """
+        statuses, errors = fan_out(self.publishers, secrets, self.max_workers)
+        if any(statuses.values()) or errors:
+            save_state(self.state_file, self.state, keys=[p._state_key for p in self.publishers])
+        if errors:
+            raise errors[0]
+        return statuses
@@ -0,0 +1,250 @@
+"""
+账号健康检查
+并发检查大量账号的 SESSDATA 是否有效，不进行刷新:
+- cookie/info: 是否需要刷新；-101 表示会话已失效
+- nav: 登录状态（isLogin），确认会话在 www 端仍然有效
+结果分为 valid（有效）/ needs_refresh（需要刷新）/ dead（已失效，需要重新登录），
+请求失败无法判断的记为 error。
+
+检查结果保存在 SQLite 的 health 表中（可以与 tokens.db 共用），有效期内再次检查直接使用缓存，
+监控面板和刷新服务用 --cached-only / HealthCache.load() 查询，不会重新请求B站。
+
+用法:
+    python health.py --store tokens.db [-c 64] [--ttl 300]
+    python health.py accounts.json --cache health.db
+    python health.py --store tokens.db --cached-only --json
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import http_client
+import resilience
+from http_client import BILIBILI_HEADERS
+from lease import account_key
+
+VALID = 'valid'
+NEEDS_REFRESH = 'needs_refresh'
+DEAD = 'dead'
+ERROR = 'error'
+STATUSES = (VALID, NEEDS_REFRESH, DEAD, ERROR)
+
+NOT_LOGGED_IN = -101
+# 检查结果的缓存时间（秒）
+DEFAULT_TTL = 300
+DEFAULT_CONCURRENCY = 64
+DEFAULT_CACHE = 'health.db'
+# 连接等待写锁的时间（毫秒）
+BUSY_TIMEOUT = 5000
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS health (
+    key TEXT PRIMARY KEY,
+    mid INTEGER,
+    status TEXT NOT NULL,
+    code INTEGER,
+    detail TEXT,
+    checked_at REAL NOT NULL
+);
+'''
+
+
+def _api_get(url, cookies):
+    """返回 (错误码, data)，请求失败时抛出异常"""
+    response = resilience.get(url, cookies=cookies, headers=BILIBILI_HEADERS)
+    response.raise_for_status()
+    body = response.json()
+    return body.get('code'), body.get('data') or {}
+
+
+def probe(account):
+    """检查单个账号，返回 {key, mid, status, code, detail, checked_at}"""
+    result = {
+        'key': account_key(account),
+        'mid': account.get('mid'),
+        'status': ERROR,
+        'code': None,
+        'detail': None,
+        'checked_at': time.time(),
+    }
+    sessdata = account.get('sessdata')
+    if not sessdata:
+        result.update(status=DEAD, detail="缺少 sessdata")
+        return result
+    cookies = {'SESSDATA': sessdata}
+    if account.get('bili_jct'):
+        cookies['bili_jct'] = account['bili_jct']
+    try:
+        code, data = _api_get(f"{http_client.PASSPORT_URL}/x/passport-login/web/cookie/info", cookies)
+        result['code'] = code
+        if code == NOT_LOGGED_IN:
+            result.update(status=DEAD, detail="cookie/info: 账号未登录")
+            return result
+        if code != 0:
+            result['detail'] = f"cookie/info: code {code}"
+            return result
+        needs_refresh = data.get('refresh', False)
+
+        code, data = _api_get(f"{http_client.API_URL}/x/web-interface/nav", cookies)
+        result['code'] = code
+        if code == NOT_LOGGED_IN or (code == 0 and not data.get('isLogin')):
+            result.update(status=DEAD, detail="nav: 未登录")
+        elif code != 0 and not needs_refresh:
+            result['detail'] = f"nav: code {code}"
+        else:
+            result['status'] = NEEDS_REFRESH if needs_refresh else VALID
+    except Exception as e:
+        result['detail'] = str(e)
+    return result
+
+
+class HealthCache:
+    """检查结果缓存（SQLite），每个线程使用独立连接"""
+
+    def __init__(self, path=DEFAULT_CACHE):
+        self.path = path
+        self._local = threading.local()
+        self._conn.executescript(SCHEMA)
+
+    @property
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT / 1000, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def save(self, results):
+        """保存检查结果，error 不缓存（下次重新检查）"""
+        rows = [(r['key'], r['mid'], r['status'], r['code'], r['detail'], r['checked_at'])
+                for r in results if r['status'] != ERROR]
+        conn = self._conn
+        conn.execute('BEGIN')
+        try:
+            conn.executemany(
+                "INSERT INTO health (key, mid, status, code, detail, checked_at) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET mid = excluded.mid, status = excluded.status, "
+                "code = excluded.code, detail = excluded.detail, checked_at = excluded.checked_at",
+                rows,
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def load(self, ttl=DEFAULT_TTL):
+        """返回 ttl 秒内的检查结果 {key: result}，ttl 为 None 时返回全部"""
+        sql, params = "SELECT * FROM health", []
+        if ttl is not None:
+            sql += " WHERE checked_at >= ?"
+            params.append(time.time() - ttl)
+        return {row['key']: dict(row, cached=True) for row in self._conn.execute(sql, params)}
+
+    def summary(self, ttl=DEFAULT_TTL):
+        """ttl 秒内各状态的账号数"""
+        counts = dict.fromkeys(STATUSES, 0)
+        for row in self._conn.execute(
+                "SELECT status, COUNT(*) AS n FROM health WHERE checked_at >= ? GROUP BY status",
+                (time.time() - ttl,)):
+            counts[row['status']] = row['n']
+        return counts
+
+    def invalidate(self, key):
+        """账号刷新或重新登录后删除其缓存结果"""
+        self._conn.execute("DELETE FROM health WHERE key = ?", (key,))
+
+
+def check_accounts(accounts, concurrency=DEFAULT_CONCURRENCY, cache=None, ttl=DEFAULT_TTL,
+                   force=False, on_result=None):
+    """并发检查账号，cache 中 ttl 秒内的结果直接使用（force 为True时全部重新检查）
+
+    返回与 accounts 顺序对应的结果列表，来自缓存的结果带有 cached=True
+    """
+    cached = cache.load(ttl) if cache is not None and not force else {}
+    results = [cached.get(account_key(account)) for account in accounts]
+    pending = [i for i, r in enumerate(results) if r is None]
+    if on_result:
+        for r in results:
+            if r is not None:
+                on_result(r)
+    if pending:
+        http_client.ensure_pool_size(concurrency)
+        with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(pending)))) as executor:
+            for i, result in zip(pending, executor.map(lambda i: probe(accounts[i]), pending)):
+                results[i] = result
+                if on_result:
+                    on_result(result)
+        if cache is not None:
+            cache.save([results[i] for i in pending])
+    return results
+
+
+def summarize(results):
+    counts = dict.fromkeys(STATUSES, 0)
+    for r in results:
+        counts[r['status']] += 1
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量检查账号 SESSDATA 是否有效")
+    parser.add_argument('accounts', nargs='?', help="账号文件（tokens.json 或 账号数组）")
+    parser.add_argument('--store', metavar='DB', help="从Token数据库读取账号（如 tokens.db）")
+    parser.add_argument('--cache', metavar='DB',
+                        help=f"检查结果缓存，默认与 --store 共用数据库，否则为 {DEFAULT_CACHE}")
+    parser.add_argument('-c', '--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"并发数（默认 {DEFAULT_CONCURRENCY}）")
+    parser.add_argument('--ttl', type=int, default=DEFAULT_TTL, help=f"缓存有效期（秒，默认 {DEFAULT_TTL}）")
+    parser.add_argument('--force', action='store_true', help="忽略缓存，重新检查所有账号")
+    parser.add_argument('--cached-only', action='store_true', help="只读取缓存的检查结果，不请求B站")
+    parser.add_argument('--json', action='store_true', help="以JSON输出汇总和每个账号的状态")
+    args = parser.parse_args()
+    http_client.enable_dns_cache()
+
+    cache = HealthCache(args.cache or args.store or DEFAULT_CACHE)
+    if args.cached_only:
+        results = list(cache.load(args.ttl).values())
+    elif args.store:
+        from token_store import TokenStore
+        results = check_accounts(list(TokenStore(args.store).all()), args.concurrency, cache,
+                                 args.ttl, args.force)
+    elif args.accounts and os.path.exists(args.accounts):
+        from bili_refresh import load_accounts
+        results = check_accounts(load_accounts(args.accounts), args.concurrency, cache,
+                                 args.ttl, args.force)
+    else:
+        print(f"❌ 错误: 未找到账号文件 {args.accounts or ''}")
+        sys.exit(1)
+
+    counts = summarize(results)
+    if args.json:
+        print(json.dumps({
+            'summary': counts,
+            'accounts': [{k: r.get(k) for k in ('mid', 'status', 'code', 'detail', 'checked_at')}
+                         for r in results],
+        }, ensure_ascii=False))
+        return
+
+    print("=" * 60)
+    print(f"账号健康检查: {len(results)} 个账号"
+          f"（其中 {sum(1 for r in results if r.get('cached'))} 个来自缓存）")
+    print("=" * 60)
+    for r in results:
+        if r['status'] == DEAD:
+            print(f"❌ [{r['mid']}] 已失效: {r['detail']}")
+        elif r['status'] == ERROR:
+            print(f"⚠️  [{r['mid']}] 检查失败: {r['detail']}")
+    print(f"\n有效 {counts[VALID]}，需要刷新 {counts[NEEDS_REFRESH]}，"
+          f"已失效 {counts[DEAD]}，检查失败 {counts[ERROR]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""
+共享HTTP客户端
+所有脚本共用一个 requests.Session：按主机复用连接池（keep-alive），
+并支持提前解析/建立连接（预热）。
+一次刷新对 passport.bilibili.com、www.bilibili.com、api.github.com 各只建立一次连接。
+
+进程内DNS缓存会替换 socket.getaddrinfo，影响整个进程，因此导入时不启用，
+由命令行入口调用 enable_dns_cache() 开启；作为库导入时不改变宿主进程的解析行为。
+"""
+import os
+import re
+import socket
+import threading
+import time
+from collections import OrderedDict
+from http.cookiejar import DefaultCookiePolicy
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+import metrics
+import rate_limit
+
+# 添加必要的请求头，避免被B站安全策略拦截
+BILIBILI_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Referer': 'https://www.bilibili.com/',
+    'Origin': 'https://www.bilibili.com',
+    'Accept': 'application/json, text/plain, */*',
+    'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+}
+
+# 请求超时（秒）
+DEFAULT_TIMEOUT = 10
+# 预热连接的超时（秒）
+PREWARM_TIMEOUT = 5
+
+# 各服务的地址，可通过环境变量指向本地模拟服务（见 mock_servers.py）
+PASSPORT_URL = os.environ.get('BILIBILI_PASSPORT_URL', 'https://passport.bilibili.com')
+WWW_URL = os.environ.get('BILIBILI_WWW_URL', 'https://www.bilibili.com')
+API_URL = os.environ.get('BILIBILI_API_URL', 'https://api.bilibili.com')
+GITHUB_API_URL = os.environ.get('GITHUB_API_URL', 'https://api.github.com')
+
+# 缓存的主机连接池数量、每个主机保持的连接数
+POOL_CONNECTIONS = 8
+POOL_MAXSIZE = 32
+
+# DNS缓存有效期（秒）与最多缓存的条目数
+DNS_TTL = 300
+DNS_CACHE_SIZE = 256
+
+_dns_cache = OrderedDict()
+_dns_lock = threading.Lock()
+_original_getaddrinfo = socket.getaddrinfo
+# B站JSON响应开头的错误码字段
+_CODE_PREFIX_RE = re.compile(rb'\s*\{\s*"code"\s*:\s*(-?\d+)')
+# 当前线程正在进行的请求的 DNS/连接耗时，由 request() 读取后写入 metrics
+_timings = threading.local()
+
+
+def _add_timing(name, seconds):
+    setattr(_timings, name, getattr(_timings, name, 0.0) + seconds)
+
+
+def _cached_getaddrinfo(host, port, family=0, type=0, proto=0, flags=0):
+    """带TTL缓存的 socket.getaddrinfo，超过 DNS_CACHE_SIZE 时淘汰最久未使用的条目"""
+    key = (host, port, family, type, proto, flags)
+    now = time.monotonic()
+    with _dns_lock:
+        entry = _dns_cache.get(key)
+        if entry and entry[0] > now:
+            _dns_cache.move_to_end(key)
+            return entry[1]
+    started = time.perf_counter()
+    result = _original_getaddrinfo(host, port, family, type, proto, flags)
+    _add_timing('dns', time.perf_counter() - started)
+    with _dns_lock:
+        _dns_cache[key] = (now + DNS_TTL, result)
+        _dns_cache.move_to_end(key)
+        while len(_dns_cache) > DNS_CACHE_SIZE:
+            _dns_cache.popitem(last=False)
+    return result
+
+
+def enable_dns_cache():
+    """启用进程内DNS缓存（urllib3 建立连接时通过 socket.getaddrinfo 解析），由命令行入口调用"""
+    socket.getaddrinfo = _cached_getaddrinfo
+
+
+def clear_dns_cache():
+    """清空DNS缓存"""
+    with _dns_lock:
+        _dns_cache.clear()
+
+
+class _TimedHTTPConnection(HTTPConnection):
+    """统计新建连接（TCP + TLS握手）的耗时，复用的连接不会调用 connect"""
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            _add_timing('connect', time.perf_counter() - started)
+
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            _add_timing('connect', time.perf_counter() - started)
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _TimedAdapter(HTTPAdapter):
+    """只在共享Session的连接上统计建立连接的耗时，不修改 urllib3 的全局类"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _TimedHTTPConnectionPool,
+            'https': _TimedHTTPSConnectionPool,
+        }
+
+
+def _mount_adapter(s, pool_maxsize):
+    adapter = _TimedAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=pool_maxsize)
+    s.mount('https://', adapter)
+    s.mount('http://', adapter)
+
+
+def _create_session():
+    s = requests.Session()
+    _mount_adapter(s, POOL_MAXSIZE)
+    # 不在Session中保存任何Cookie，避免多个账号之间串用；
+    # 每次请求显式传入cookies，响应的新Cookie仍可从 response.cookies 读取
+    s.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    return s
+
+
+session = _create_session()
+_pool_maxsize = POOL_MAXSIZE
+_pool_lock = threading.Lock()
+
+
+def ensure_pool_size(size):
+    """保证每个主机的连接池至少能容纳 size 个并发连接
+
+    其他线程可能正在使用共享Session：在锁内换上新的适配器后关闭旧的，
+    旧连接池的空闲连接立即关闭，正在使用的连接在请求完成、归还时关闭
+    """
+    global _pool_maxsize
+    with _pool_lock:
+        if size <= _pool_maxsize:
+            return
+        old = session.get_adapter('https://')
+        _mount_adapter(session, size)
+        _pool_maxsize = size
+    old.close()
+
+
+def _record(method, url, started, response=None, error=None, stream=False, retries=0):
+    total = time.perf_counter() - started
+    dns = getattr(_timings, 'dns', 0.0)
+    # connect 包含了新建连接时的DNS解析（未启用DNS缓存时无法单独统计DNS耗时）
+    connect = max(getattr(_timings, 'connect', 0.0) - dns, 0.0)
+    if response is None:
+        metrics.record_http(method, url, None, total, dns, connect,
+                            retries=retries, error=str(error))
+        return
+    body = response.request.body
+    received = response.headers.get('Content-Length')
+    if received is None:
+        received = 0 if stream else len(response.content)
+    metrics.record_http(
+        method, url, response.status_code, total, dns, connect,
+        ttfb=response.elapsed.total_seconds(),
+        bytes_sent=len(body) if body else 0,
+        bytes_received=int(received),
+        retries=retries,
+    )
+
+
+def api_code(response):
+    """JSON响应中的B站错误码，非JSON响应返回None
+
+    B站响应的第一个字段是 code，直接从正文开头读取而不解析整个JSON（正文由调用方解析）；
+    结果缓存在响应对象上，限速器、重试和凭据池读取同一个响应时不会重复计算
+    """
+    try:
+        return response._api_code
+    except AttributeError:
+        pass
+    code = None
+    if 'json' in response.headers.get('Content-Type', ''):
+        content = response.content
+        match = _CODE_PREFIX_RE.match(content)
+        if match:
+            code = int(match.group(1))
+        elif b'"code"' in content:
+            try:
+                code = response.json().get('code')
+            except (ValueError, AttributeError):
+                code = None
+    response._api_code = code
+    return code
+
+
+def request(method, url, retries=0, limit=True, **kwargs):
+    """通过共享Session发送请求，未指定时使用默认超时，并记录耗时
+
+    retries: 这是第几次重试（由 resilience 传入，只用于统计）
+    limit: B站刷新/登录接口的请求先在该接口的自适应限速器上排队（见 rate_limit.py），
+           调用方已经排过队时传入False，响应仍然会反馈给限速器
+    """
+    kwargs.setdefault('timeout', DEFAULT_TIMEOUT)
+    stream = kwargs.get('stream', False)
+    limiter = rate_limit.limiter_for(url)
+    if limiter is not None and limit:
+        limiter.acquire()
+    _timings.dns = _timings.connect = 0.0
+    started = time.perf_counter()
+    try:
+        response = session.request(method, url, **kwargs)
+    except Exception as e:
+        _record(method, url, started, error=e, retries=retries)
+        raise
+    _record(method, url, started, response, stream=stream, retries=retries)
+    if limiter is not None:
+        # 流式响应的正文还没有读取，只根据状态码判断
+        limiter.record(response.status_code, None if stream else api_code(response),
+                       response.elapsed.total_seconds())
+    return response
+
+
+def get(url, **kwargs):
+    return request('GET', url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request('POST', url, **kwargs)
+
+
+def put(url, **kwargs):
+    return request('PUT', url, **kwargs)
+
+
+def _warm(base_url):
+    try:
+        parts = urlsplit(base_url)
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        socket.getaddrinfo(parts.hostname, port, 0, socket.SOCK_STREAM)
+        # HEAD请求只为建立TLS连接并放回连接池
+        headers = BILIBILI_HEADERS if base_url in (PASSPORT_URL, WWW_URL, API_URL) else None
+        session.head(f"{base_url}/", headers=headers,
+                     allow_redirects=False, timeout=PREWARM_TIMEOUT)
+    except Exception:
+        pass
+
+
+def prewarm(base_urls, wait=False):
+    """提前解析DNS并建立到各服务的连接
+
+    wait为False时在后台线程中进行，不阻塞调用方
+    """
+    threads = [threading.Thread(target=_warm, args=(url,), daemon=True) for url in base_urls]
+    for t in threads:
+        t.start()
+    if wait:
+        for t in threads:
+            t.join()
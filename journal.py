@@ -0,0 +1,88 @@
+"""
+刷新日志（journal）
+cookie/refresh 成功后，新的 refresh_token/Cookie 在写回来源、发布到各去向之前只存在于内存中，
+进程崩溃或网络中断会导致新凭据丢失，只能重新扫码登录。
+刷新流程在每个会产生新状态的步骤之后把结果写入日志（每个账号一个文件，原子写入并 fsync），
+下次运行时从中断的步骤继续，全部写回/发布成功后删除。
+
+状态（见 bili_refresh.py）:
+    refreshed  已拿到新凭据，待确认更新（使旧会话失效）
+    confirmed  已确认更新，待写回来源和发布
+
+日志中包含凭据，文件权限为 0600；设置 REFRESH_JOURNAL_KEY 后使用 AES-GCM 加密（用于 GitHub Actions 缓存）。
+"""
+import hashlib
+import json
+import os
+from base64 import b64decode, b64encode
+
+from sessdata_file import atomic_write
+
+JOURNAL_DIR_ENV = 'REFRESH_JOURNAL_DIR'
+JOURNAL_KEY_ENV = 'REFRESH_JOURNAL_KEY'
+DEFAULT_JOURNAL_DIR = '.refresh_journal'
+
+
+class Journal:
+    """按账号保存刷新流程的中间状态，key 为加密口令（可选）"""
+
+    def __init__(self, directory=DEFAULT_JOURNAL_DIR, key=None):
+        self.directory = directory
+        self._key = hashlib.sha256(key.encode('utf-8')).digest() if key else None
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, name):
+        return os.path.join(self.directory, name.replace(':', '-') + '.json')
+
+    def _encode(self, entry):
+        data = json.dumps(entry, ensure_ascii=False).encode('utf-8')
+        if self._key is None:
+            return data
+        from Crypto.Cipher import AES
+
+        cipher = AES.new(self._key, AES.MODE_GCM)
+        ciphertext, tag = cipher.encrypt_and_digest(data)
+        return json.dumps({
+            'nonce': b64encode(cipher.nonce).decode(),
+            'data': b64encode(ciphertext).decode(),
+            'tag': b64encode(tag).decode(),
+        }).encode('utf-8')
+
+    def _decode(self, data):
+        document = json.loads(data)
+        if 'nonce' not in document:
+            return document
+        if self._key is None:
+            return None
+        from Crypto.Cipher import AES
+
+        cipher = AES.new(self._key, AES.MODE_GCM, nonce=b64decode(document['nonce']))
+        plaintext = cipher.decrypt_and_verify(b64decode(document['data']), b64decode(document['tag']))
+        return json.loads(plaintext)
+
+    def load(self, name):
+        """读取账号的日志，不存在或无法读取（如加密口令已更换）时返回None"""
+        try:
+            with open(self._path(name), 'rb') as f:
+                return self._decode(f.read())
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def save(self, name, entry):
+        atomic_write(self._path(name), self._encode(entry), mode=0o600)
+
+    def clear(self, name):
+        try:
+            os.unlink(self._path(name))
+        except FileNotFoundError:
+            pass
+
+    def pending(self):
+        """有未完成日志的账号数量"""
+        return sum(1 for f in os.listdir(self.directory) if f.endswith('.json'))
+
+
+def from_env():
+    """根据环境变量 REFRESH_JOURNAL_DIR / REFRESH_JOURNAL_KEY 创建日志"""
+    return Journal(os.environ.get(JOURNAL_DIR_ENV, DEFAULT_JOURNAL_DIR),
+                   os.environ.get(JOURNAL_KEY_ENV))
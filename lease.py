@@ -0,0 +1,230 @@
+"""
+账号租约（lease）
+同一账号同一时间只允许一个刷新者：两个刷新者同时刷新时，一方的 confirm_refresh 会使另一方
+刚拿到的 refresh_token 失效，只能重新扫码登录。
+- 租约带 TTL，持有者崩溃后自动过期
+- 每次获得租约都会分配一个单调递增的 fencing token；续约/写入前用它确认租约仍属于自己，
+  Token数据库按 fencing token 拒绝过期持有者的写入（见 TokenStore.update_tokens）
+后端:
+- FileLeaseBackend: 单机，目录中每个账号一个文件，用文件锁保护读-改-写
+- SQLiteLeaseBackend: 多个节点共享同一个数据库文件（可以与 tokens.db 共用）
+
+设置环境变量 REFRESH_LEASE 为目录或 .db 文件后，refresh.py / refresh_local.py 也会使用租约。
+"""
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+LEASE_ENV = 'REFRESH_LEASE'
+DEFAULT_LEASE_DIR = '.leases'
+# 租约有效期（秒），需要大于一次完整刷新（含重试）加写回的时间
+DEFAULT_TTL = 300
+# 连接等待写锁的时间（毫秒）
+BUSY_TIMEOUT = 5000
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS leases (
+    key TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    token INTEGER NOT NULL,
+    expires_at REAL NOT NULL
+);
+'''
+
+
+def default_owner():
+    """租约持有者标识：主机名:进程号:随机串"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def account_key(account):
+    """账号的租约键，优先使用 mid，没有 mid 时使用 refresh_token 的哈希"""
+    mid = account.get('mid')
+    if mid:
+        return f"account:{mid}"
+    digest = hashlib.sha256((account.get('refresh_token') or '').encode('utf-8')).hexdigest()
+    return f"token:{digest[:16]}"
+
+
+class Lease:
+    """已获得的租约，token 为 fencing token"""
+
+    def __init__(self, backend, key, owner, token, expires_at):
+        self.backend = backend
+        self.key = key
+        self.owner = owner
+        self.token = token
+        self.expires_at = expires_at
+
+    def renew(self, ttl=None):
+        """延长租约，租约已过期或被他人接手时返回False"""
+        return self.backend.renew(self, ttl)
+
+    def release(self):
+        return self.backend.release(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def _holds(record, lease, now):
+    return record is not None and record['token'] == lease.token and record['expires_at'] > now
+
+
+class LeaseBackend:
+    """租约后端：子类实现 _update(key, change)，在锁/事务内读取记录、调用 change 并写回"""
+
+    def __init__(self, ttl=DEFAULT_TTL, owner=None):
+        self.ttl = ttl
+        self.owner = owner or default_owner()
+
+    def _update(self, key, change):
+        """change(record) -> (新记录或None表示不写入, 返回值)"""
+        raise NotImplementedError
+
+    def acquire(self, key, ttl=None):
+        """获取租约，已被他人持有且未过期时返回None"""
+        ttl = ttl or self.ttl
+
+        def change(record):
+            now = time.time()
+            if record is not None and record['expires_at'] > now:
+                return None, None
+            token = (record['token'] if record else 0) + 1
+            expires_at = now + ttl
+            new = {'owner': self.owner, 'token': token, 'expires_at': expires_at}
+            return new, Lease(self, key, self.owner, token, expires_at)
+        return self._update(key, change)
+
+    def renew(self, lease, ttl=None):
+        ttl = ttl or self.ttl
+
+        def change(record):
+            now = time.time()
+            if not _holds(record, lease, now):
+                return None, False
+            lease.expires_at = now + ttl
+            return dict(record, expires_at=lease.expires_at), True
+        return self._update(lease.key, change)
+
+    def release(self, lease):
+        """释放租约（保留 token 计数，下一个持有者的 fencing token 继续递增）"""
+        def change(record):
+            if not _holds(record, lease, time.time()):
+                return None, False
+            return dict(record, expires_at=0), True
+        return self._update(lease.key, change)
+
+
+@contextmanager
+def file_lock(path):
+    """进程间互斥的文件锁（同一进程的不同线程之间同样互斥）"""
+    with open(path, 'a+b') as f:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class FileLeaseBackend(LeaseBackend):
+    """单机租约：目录下每个键一个 JSON 文件，读-改-写由同名 .lock 文件的文件锁保护"""
+
+    def __init__(self, directory=DEFAULT_LEASE_DIR, ttl=DEFAULT_TTL, owner=None):
+        super().__init__(ttl, owner)
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key.replace(':', '-'))
+
+    def _update(self, key, change):
+        from sessdata_file import atomic_write
+
+        path = self._path(key)
+        with file_lock(path + '.lock'):
+            try:
+                with open(path + '.json', 'r', encoding='utf-8') as f:
+                    record = json.load(f)
+            except (OSError, ValueError):
+                record = None
+            new, value = change(record)
+            if new is not None:
+                atomic_write(path + '.json', json.dumps(new))
+            return value
+
+
+class SQLiteLeaseBackend(LeaseBackend):
+    """多节点共享的租约表，读-改-写在 BEGIN IMMEDIATE 事务中完成"""
+
+    def __init__(self, path, ttl=DEFAULT_TTL, owner=None):
+        super().__init__(ttl, owner)
+        self.path = path
+        self._local = threading.local()
+        self._conn.executescript(SCHEMA)
+
+    @property
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT / 1000, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def _update(self, key, change):
+        conn = self._conn
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute("SELECT owner, token, expires_at FROM leases WHERE key = ?",
+                               (key,)).fetchone()
+            new, value = change(dict(row) if row else None)
+            if new is not None:
+                conn.execute(
+                    "INSERT INTO leases (key, owner, token, expires_at) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET owner = excluded.owner, token = excluded.token, "
+                    "expires_at = excluded.expires_at",
+                    (key, new['owner'], new['token'], new['expires_at']),
+                )
+            conn.execute('COMMIT')
+            return value
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+
+
+def open_backend(location, ttl=DEFAULT_TTL):
+    """按位置创建后端：.db 文件使用 SQLite，否则作为目录使用文件锁"""
+    if location.endswith('.db'):
+        return SQLiteLeaseBackend(location, ttl)
+    return FileLeaseBackend(location, ttl)
+
+
+def from_env():
+    """根据环境变量 REFRESH_LEASE 创建后端，未设置时返回None"""
+    location = os.environ.get(LEASE_ENV)
+    return open_backend(location) if location else None
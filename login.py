@@ -1,30 +1,77 @@
+import argparse
+import io
+import threading
 import time
+import webbrowser
 import requests
-from urllib.parse import urlencode
-from hashlib import md5
+from base64 import b64encode
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 import qrcode
 import os
 import json
 from datetime import datetime
 
+import http_client
+from http_client import BILIBILI_HEADERS
+from sessdata_file import atomic_write
+from signing import AppSigner
+
 
 APPKEY = "4409e2ce8ffd12b8"
 APPSEC = "59b43e04ad6965f34319062b478f83dd"
+APP_SIGNER = AppSigner(APPKEY, APPSEC)
+
+AUTH_CODE_URL = f"{http_client.PASSPORT_URL}/x/passport-tv-login/qrcode/auth_code"
+POLL_URL = f"{http_client.PASSPORT_URL}/x/passport-tv-login/qrcode/poll"
 
-# 添加必要的请求头，避免被B站安全策略拦截
+# B站请求头，登录接口以表单方式提交
 HEADERS = {
-    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-    'Referer': 'https://www.bilibili.com/',
-    'Origin': 'https://www.bilibili.com',
-    'Accept': 'application/json, text/plain, */*',
-    'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+    **BILIBILI_HEADERS,
     'Content-Type': 'application/x-www-form-urlencoded',
 }
 
 
 def get_sign(params):
-    items = sorted(params.items())
-    return md5(f"{urlencode(items)}{APPSEC}".encode('utf-8')).hexdigest()
+    return APP_SIGNER.sign_value(params)
+
+
+def poll_login(auth_code):
+    """查询扫码登录状态，每次轮询使用新的 ts 和签名"""
+    poll_params = {
+        'appkey': APPKEY,
+        'local_id': 0,
+        'ts': int(time.time()),
+        'auth_code': auth_code
+    }
+    poll_params['sign'] = get_sign(poll_params)
+    return http_client.post(POLL_URL, params=poll_params, headers=HEADERS)
+
+
+def parse_login_result(data):
+    """从登录成功的返回数据中提取 tokens.json 的内容"""
+    token_info = data.get('token_info', {})
+    cookie_info = data.get('cookie_info', {})
+    
+    # 查找SESSDATA和bili_jct
+    sessdata = None
+    bili_jct = None
+    for cookie in cookie_info.get('cookies', []):
+        cookie_name = cookie.get('name')
+        if cookie_name == 'SESSDATA':
+            sessdata = cookie.get('value')
+        elif cookie_name == 'bili_jct':
+            bili_jct = cookie.get('value')
+    
+    return {
+        'access_token': token_info.get('access_token'),
+        'refresh_token': token_info.get('refresh_token'),
+        'sessdata': sessdata,
+        'bili_jct': bili_jct,  # 保存CSRF token用于刷新
+        'mid': data.get('mid'),
+        'expires_in': token_info.get('expires_in'),
+        'obtained_at': datetime.now().isoformat()
+    }
 
 
 def qr_login():
@@ -34,10 +81,10 @@ def qr_login():
         'ts': int(time.time())
     }
     params['sign'] = get_sign(params)
-    url = f"https://passport.bilibili.com/x/passport-tv-login/qrcode/auth_code"
+    url = AUTH_CODE_URL
     
     try:
-        r = requests.post(url, params=params, headers=HEADERS, timeout=10)
+        r = http_client.post(url, params=params, headers=HEADERS)
         print(f"状态码: {r.status_code}")
         print(f"响应内容: {r.text[:500]}")  # 只打印前500字符
         
@@ -108,17 +155,8 @@ def qr_login():
         print("等待扫码中...\n")
 
         # 轮询登录状态
-        poll_params = {
-            'appkey': APPKEY,
-            'local_id': 0,
-            'ts': int(time.time()),
-            'auth_code': auth_code
-        }
-        poll_params['sign'] = get_sign(poll_params)
-        poll_url = f"https://passport.bilibili.com/x/passport-tv-login/qrcode/poll"
-        
         while True:
-            poll_r = requests.post(poll_url, params=poll_params, headers=HEADERS, timeout=10)
+            poll_r = poll_login(auth_code)
             print(f"轮询响应: {poll_r.text[:200]}")
             
             try:
@@ -134,41 +172,17 @@ def qr_login():
                 print("=" * 50)
                 
                 # 提取关键信息
-                data = poll_data.get('data', {})
-                token_info = data.get('token_info', {})
-                cookie_info = data.get('cookie_info', {})
-                
-                access_token = token_info.get('access_token')
-                refresh_token = token_info.get('refresh_token')
+                tokens_data = parse_login_result(poll_data.get('data', {}))
+                bili_jct = tokens_data['bili_jct']
                 
-                # 查找SESSDATA和bili_jct
-                sessdata = None
-                bili_jct = None
-                for cookie in cookie_info.get('cookies', []):
-                    cookie_name = cookie.get('name')
-                    if cookie_name == 'SESSDATA':
-                        sessdata = cookie.get('value')
-                    elif cookie_name == 'bili_jct':
-                        bili_jct = cookie.get('value')
-                
-                print(f"\n用户ID: {data.get('mid')}")
-                print(f"Access Token: {access_token[:20]}...")
-                print(f"Refresh Token: {refresh_token[:20]}...")
-                print(f"SESSDATA: {sessdata}")
+                print(f"\n用户ID: {tokens_data['mid']}")
+                print(f"Access Token: {tokens_data['access_token'][:20]}...")
+                print(f"Refresh Token: {tokens_data['refresh_token'][:20]}...")
+                print(f"SESSDATA: {tokens_data['sessdata']}")
                 print(f"bili_jct: {bili_jct[:20] if bili_jct else '未找到'}...")
                 
                 # 保存token信息到文件
                 tokens_file = "tokens.json"
-                tokens_data = {
-                    'access_token': access_token,
-                    'refresh_token': refresh_token,
-                    'sessdata': sessdata,
-                    'bili_jct': bili_jct,  # 保存CSRF token用于刷新
-                    'mid': data.get('mid'),
-                    'expires_in': token_info.get('expires_in'),
-                    'obtained_at': datetime.now().isoformat()
-                }
-                
                 with open(tokens_file, 'w', encoding='utf-8') as f:
                     json.dump(tokens_data, f, indent=2, ensure_ascii=False)
                 
@@ -214,5 +228,180 @@ def qr_login():
         import traceback
         traceback.print_exc()
 
+
+# 批量登录: 轮询间隔（秒）的下限/上限，未扫码时逐步放慢，已扫码待确认时加快
+POLL_MIN_INTERVAL = 1
+POLL_MAX_INTERVAL = 10
+POLL_BACKOFF = 1.5
+# 二维码有效期（秒）
+QR_EXPIRE = 180
+
+_accounts_lock = threading.Lock()
+
+
+def request_auth_code():
+    """申请一个TV登录二维码，返回 (二维码URL, auth_code)"""
+    params = {
+        'appkey': APPKEY,
+        'local_id': 0,
+        'ts': int(time.time())
+    }
+    params['sign'] = get_sign(params)
+    r = http_client.post(AUTH_CODE_URL, params=params, headers=HEADERS)
+    r.raise_for_status()
+    data = r.json()
+    if data.get('code') != 0:
+        raise Exception(f"API返回错误码 {data.get('code')}, 消息: {data.get('message', '未知错误')}")
+    return data['data']['url'], data['data']['auth_code']
+
+
+def save_account(accounts_file, tokens_data):
+    """把一个账号写入多账号文件（按mid更新或追加），原子写入"""
+    with _accounts_lock:
+        accounts = []
+        if os.path.exists(accounts_file):
+            with open(accounts_file, 'r', encoding='utf-8') as f:
+                accounts = json.load(f)
+            if isinstance(accounts, dict):
+                accounts = [accounts]
+        accounts = [a for a in accounts if a.get('mid') != tokens_data['mid']]
+        accounts.append(tokens_data)
+        atomic_write(accounts_file, json.dumps(accounts, indent=2, ensure_ascii=False))
+
+
+def render_qr_html(qr_urls, html_file):
+    """把所有二维码渲染到一个本地HTML页面"""
+    cells = []
+    for index, qr_url in enumerate(qr_urls, 1):
+        img = qrcode.make(qr_url, box_size=6, border=2)
+        buffer = io.BytesIO()
+        img.save(buffer, format='PNG')
+        data = b64encode(buffer.getvalue()).decode('ascii')
+        cells.append(
+            f'<figure><img src="data:image/png;base64,{data}">'
+            f'<figcaption>#{index}</figcaption></figure>'
+        )
+    page = (
+        '<!DOCTYPE html><html><head><meta charset="utf-8"><title>B站批量扫码登录</title>'
+        '<style>body{font-family:sans-serif;display:flex;flex-wrap:wrap}'
+        'figure{margin:12px;text-align:center}</style></head><body>'
+        + ''.join(cells) + '</body></html>'
+    )
+    with open(html_file, 'w', encoding='utf-8') as f:
+        f.write(page)
+
+
+def wait_for_login(index, auth_code, save):
+    """轮询单个二维码直到登录成功或过期，成功后立即调用 save 保存，返回mid（失败返回None）"""
+    interval = POLL_MIN_INTERVAL
+    deadline = time.monotonic() + QR_EXPIRE
+    while time.monotonic() < deadline:
+        try:
+            poll_data = poll_login(auth_code).json()
+            code = poll_data.get('code')
+        except Exception as e:
+            print(f"⚠️  [#{index}] 轮询失败: {e}")
+            code = None
+        
+        if code == 0:
+            try:
+                tokens_data = parse_login_result(poll_data.get('data', {}))
+                save(tokens_data)
+            except Exception as e:
+                print(f"❌ [#{index}] 登录成功但保存账号失败: {e}")
+                return None
+            print(f"✅ [#{index}] 登录成功, 用户ID: {tokens_data['mid']}")
+            return tokens_data['mid']
+        elif code == 86090:
+            # 已扫码，等待确认: 尽快轮询
+            interval = POLL_MIN_INTERVAL
+        elif code == 86038:
+            print(f"❌ [#{index}] 二维码已失效")
+            return None
+        else:
+            # 未扫码(86101)或出错: 逐步放慢轮询
+            interval = min(interval * POLL_BACKOFF, POLL_MAX_INTERVAL)
+        time.sleep(interval)
+    print(f"❌ [#{index}] 等待扫码超时")
+    return None
+
+
+def _request_auth_code(index):
+    """申请一个二维码，失败时打印原因并返回None，不影响批量中的其他二维码"""
+    try:
+        return request_auth_code()
+    except Exception as e:
+        print(f"❌ [#{index}] 申请二维码失败: {e}")
+        return None
+
+
+def qr_login_batch(count, accounts_file='accounts.json', html_file='bilibili_qrcodes.html',
+                   terminal=False, store=None):
+    """批量扫码登录: 一次申请所有二维码，并发轮询，登录成功的账号立即写入 accounts_file
+
+    store: 可选的 TokenStore，指定时账号写入数据库而不是 accounts_file
+    """
+    if store is not None:
+        save = store.upsert
+        target = store.path
+    else:
+        save = partial(save_account, accounts_file)
+        target = accounts_file
+
+    print("=" * 50)
+    print(f"批量扫码登录: {count} 个账号")
+    print("=" * 50)
+    
+    with ThreadPoolExecutor(max_workers=min(count, 16)) as executor:
+        codes = [c for c in executor.map(_request_auth_code, range(1, count + 1)) if c]
+    if not codes:
+        print("❌ 没有申请到任何二维码")
+        return []
+    
+    if terminal:
+        for index, (qr_url, _) in enumerate(codes, 1):
+            qr = qrcode.QRCode(border=2)
+            qr.add_data(qr_url)
+            qr.make(fit=True)
+            print(f"\n#{index}")
+            qr.print_ascii(invert=True)
+    
+    render_qr_html([qr_url for qr_url, _ in codes], html_file)
+    html_path = os.path.abspath(html_file)
+    print(f"\n二维码页面已保存到: {html_path}")
+    webbrowser.open(f"file://{html_path}")
+    print(f"请使用B站APP依次扫描页面中的二维码（{QR_EXPIRE}秒内有效）...\n")
+    
+    http_client.ensure_pool_size(len(codes))
+    with ThreadPoolExecutor(max_workers=len(codes)) as executor:
+        mids = list(executor.map(
+            lambda item: wait_for_login(item[0], item[1][1], save),
+            enumerate(codes, 1),
+        ))
+    
+    succeeded = [mid for mid in mids if mid]
+    print("\n" + "=" * 50)
+    print(f"完成: 成功 {len(succeeded)} / {count}, 失败 {count - len(succeeded)}, "
+          f"账号已保存到 {os.path.abspath(target)}")
+    print("=" * 50)
+    return succeeded
+
+
 if __name__ == "__main__":
-    qr_login()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="B站扫码登录")
+    parser.add_argument('--batch', type=int, metavar='N', help="批量登录N个账号")
+    parser.add_argument('--accounts', default='accounts.json', help="批量登录的账号保存文件")
+    parser.add_argument('--html', default='bilibili_qrcodes.html', help="批量登录的二维码页面")
+    parser.add_argument('--terminal', action='store_true', help="批量登录时同时在终端打印二维码")
+    parser.add_argument('--store', metavar='DB', help="批量登录的账号写入Token数据库（如 tokens.db）")
+    args = parser.parse_args()
+    http_client.enable_dns_cache()
+    
+    if args.batch:
+        store = None
+        if args.store:
+            from token_store import TokenStore
+            store = TokenStore(args.store)
+        qr_login_batch(args.batch, args.accounts, args.html, args.terminal, store)
+    else:
+        qr_login()
@@ -0,0 +1,253 @@
+"""
+刷新流程的耗时统计
+- span(): 记录每个步骤的耗时；@timed 装饰器用于流程中的各个函数
+- record_http(): 由 http_client 对每个请求调用，记录 DNS/连接/首字节/总耗时、传输字节数、重试次数
+- 导出为 Prometheus textfile（直方图，可跨机器计算 p50/p99）和每次运行的 JSON trace
+
+设置环境变量 REFRESH_METRICS_DIR 后，各脚本结束时调用 export() 写出:
+    <目录>/refresh.prom
+    <目录>/trace-<run_id>.json
+"""
+import functools
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+METRICS_DIR_ENV = 'REFRESH_METRICS_DIR'
+PROM_FILE = 'refresh.prom'
+# 直方图桶（秒）
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# trace 中最多保留的记录数，常驻服务中内存不会无限增长
+MAX_TRACE_RECORDS = 10000
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Recorder:
+    """收集一次运行（或常驻服务运行期间）的所有耗时数据，线程安全"""
+
+    def __init__(self):
+        self.run_id = uuid.uuid4().hex[:12]
+        self.started = datetime.now(timezone.utc).isoformat()
+        self.spans = deque(maxlen=MAX_TRACE_RECORDS)
+        self.requests = deque(maxlen=MAX_TRACE_RECORDS)
+        self.step_histograms = {}
+        self.http_histograms = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def _inc(self, key, value=1):
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def add_span(self, record):
+        with self._lock:
+            self.spans.append(record)
+            key = (record['name'], record['status'])
+            self.step_histograms.setdefault(key, Histogram()).observe(record['duration'])
+
+    def add_request(self, record):
+        with self._lock:
+            self.requests.append(record)
+            key = (record['host'], record['path'], record['method'])
+            self.http_histograms.setdefault(key, Histogram()).observe(record['total'])
+            self._inc(('http_requests_total', key + (str(record['status']),)))
+            self._inc(('http_sent_bytes_total', key), record['bytes_sent'])
+            self._inc(('http_received_bytes_total', key), record['bytes_received'])
+            # retries 是这次请求为第几次重试，每个重试请求计1次
+            if record['retries']:
+                self._inc(('http_retries_total', key))
+            for phase in ('dns', 'connect', 'ttfb'):
+                self._inc((f'http_{phase}_seconds_total', key), record[phase])
+
+
+recorder = Recorder()
+_context = threading.local()
+
+
+def reset():
+    """开始新的一次运行"""
+    global recorder
+    recorder = Recorder()
+
+
+def current_account():
+    return getattr(_context, 'account', None)
+
+
+@contextmanager
+def account_context(account):
+    """标记当前线程正在处理的账号，span 和请求记录会带上该账号"""
+    previous = current_account()
+    _context.account = account
+    try:
+        yield
+    finally:
+        _context.account = previous
+
+
+@contextmanager
+def span(name, **attrs):
+    """记录一个步骤的耗时"""
+    record = {'name': name, 'account': current_account(), 'start': time.time(), 'status': 'ok'}
+    record.update(attrs)
+    started = time.perf_counter()
+    try:
+        yield record
+    except BaseException:
+        record['status'] = 'error'
+        raise
+    finally:
+        record['duration'] = time.perf_counter() - started
+        recorder.add_span(record)
+
+
+def timed(name):
+    """装饰器：把函数调用记录为一个 span"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# GitHub Git Data API 路径中的 SHA 和分支名
+_GIT_SHA = re.compile(r'/git/(commits|trees|blobs)/[^/]+$')
+_GIT_REF = re.compile(r'/git/(refs?)/heads/.+$')
+
+
+def record_http(method, url, status, total, dns=0.0, connect=0.0, ttfb=0.0,
+                bytes_sent=0, bytes_received=0, retries=0, error=None):
+    """记录一次HTTP请求（status 为 None 表示请求失败）"""
+    parts = urlsplit(url)
+    # 路径中的 correspond/1/<签名>、Git 对象的 SHA 等动态部分不作为指标标签
+    path = parts.path
+    if path.startswith('/correspond/'):
+        path = '/correspond/1/{path}'
+    elif '/actions/secrets/' in path:
+        path = path.rsplit('/', 1)[0] + '/{name}'
+    elif '/git/' in path:
+        path = _GIT_REF.sub(r'/git/\1/heads/{branch}', _GIT_SHA.sub(r'/git/\1/{sha}', path))
+    recorder.add_request({
+        'method': method,
+        'host': parts.hostname or '',
+        'path': path,
+        'status': status if status is not None else 'error',
+        'account': current_account(),
+        'start': time.time() - total,
+        'total': total,
+        'dns': dns,
+        'connect': connect,
+        'ttfb': ttfb,
+        'bytes_sent': bytes_sent,
+        'bytes_received': bytes_received,
+        'retries': retries,
+        'error': error,
+    })
+
+
+def _labels(**labels):
+    return ','.join(f'{k}="{str(v)}"' for k, v in labels.items())
+
+
+def _histogram_lines(metric, histograms, label_names):
+    lines = [f'# TYPE {metric} histogram']
+    for key, h in sorted(histograms.items(), key=lambda item: str(item[0])):
+        labels = _labels(**dict(zip(label_names, key)))
+        cumulative = 0
+        for bound, count in zip(BUCKETS + (float('inf'),), h.counts):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else repr(bound)
+            lines.append(f'{metric}_bucket{{{labels},le="{le}"}} {cumulative}')
+        lines.append(f'{metric}_sum{{{labels}}} {h.sum}')
+        lines.append(f'{metric}_count{{{labels}}} {h.count}')
+    return lines
+
+
+def prometheus_text():
+    """生成 Prometheus textfile collector 格式的文本"""
+    with recorder._lock:
+        lines = _histogram_lines('bili_refresh_step_duration_seconds', recorder.step_histograms,
+                                 ('step', 'status'))
+        lines += _histogram_lines('bili_refresh_http_duration_seconds', recorder.http_histograms,
+                                  ('host', 'path', 'method'))
+        by_metric = {}
+        for (metric, key), value in recorder.counters.items():
+            by_metric.setdefault(metric, []).append((key, value))
+    http_labels = ('host', 'path', 'method')
+    for metric, items in sorted(by_metric.items()):
+        lines.append(f'# TYPE bili_refresh_{metric} counter')
+        for key, value in sorted(items, key=lambda item: str(item[0])):
+            names = http_labels + ('status',) if len(key) == 4 else http_labels
+            lines.append(f'bili_refresh_{metric}{{{_labels(**dict(zip(names, key)))}}} {value}')
+    lines.append('# TYPE bili_refresh_last_run_timestamp_seconds gauge')
+    lines.append(f'bili_refresh_last_run_timestamp_seconds {time.time()}')
+    return '\n'.join(lines) + '\n'
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def trace():
+    """生成本次运行的 JSON trace，包含每个步骤的 p50/p99"""
+    with recorder._lock:
+        spans = list(recorder.spans)
+        requests = list(recorder.requests)
+    durations = {}
+    for record in spans:
+        durations.setdefault(record['name'], []).append(record['duration'])
+    return {
+        'run_id': recorder.run_id,
+        'started': recorder.started,
+        'summary': {
+            name: {
+                'count': len(values),
+                'p50': _percentile(values, 0.5),
+                'p99': _percentile(values, 0.99),
+            }
+            for name, values in durations.items()
+        },
+        'spans': spans,
+        'requests': requests,
+    }
+
+
+def export(directory=None):
+    """写出 Prometheus textfile 和 JSON trace；未指定目录且未设置环境变量时不做任何事"""
+    directory = directory or os.environ.get(METRICS_DIR_ENV)
+    if not directory:
+        return None
+    from sessdata_file import atomic_write
+
+    os.makedirs(directory, exist_ok=True)
+    atomic_write(os.path.join(directory, PROM_FILE), prometheus_text())
+    trace_path = os.path.join(directory, f'trace-{recorder.run_id}.json')
+    atomic_write(trace_path, json.dumps(trace(), ensure_ascii=False, default=str))
+    return trace_path
@@ -0,0 +1,114 @@
+"""
+多账号 SESSDATA 发布格式
+publish/
+├── index.json          # 索引: mid -> 分片路径、内容哈希、更新时间
+├── shards/<mid>.json   # 每个账号一个分片，格式同 SESSDATA 文件并带 mid
+├── bundle.ndjson       # 所有分片，每行一个
+└── *.gz                # 以上文件的 gzip 预压缩版本
+读取方只需下载索引，对比哈希后拉取发生变化的分片。
+账号的 SESSDATA 未变化时分片与其 updated 保持不变，文件不会被重写。
+"""
+import gzip
+import hashlib
+import json
+import os
+
+from sessdata_file import atomic_write, build_document
+
+DEFAULT_PUBLISH_DIR = 'publish'
+INDEX_FILE = 'index.json'
+BUNDLE_FILE = 'bundle.ndjson'
+SHARDS_DIR = 'shards'
+FORMAT_VERSION = 1
+
+
+def _dumps(data):
+    # 固定键顺序和分隔符，相同内容总是得到相同的字节和哈希
+    return json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _write_if_changed(path, data: bytes):
+    """内容变化时原子写入文件及其 .gz 版本，返回是否写入"""
+    try:
+        with open(path, 'rb') as f:
+            if f.read() == data:
+                return False
+    except OSError:
+        pass
+    atomic_write(path, data)
+    # mtime=0 让相同内容的压缩结果保持一致
+    atomic_write(f"{path}.gz", gzip.compress(data, compresslevel=9, mtime=0))
+    return True
+
+
+def _remove(path):
+    for p in (path, f"{path}.gz"):
+        try:
+            os.remove(p)
+        except FileNotFoundError:
+            pass
+
+
+def load_index(publish_dir=DEFAULT_PUBLISH_DIR):
+    try:
+        with open(os.path.join(publish_dir, INDEX_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'version': FORMAT_VERSION, 'accounts': {}}
+
+
+def publish_accounts(accounts, publish_dir=DEFAULT_PUBLISH_DIR):
+    """发布多个账号的SESSDATA，返回内容发生变化的 mid 列表
+
+    accounts: 包含 mid、sessdata 的账号字典（tokens.json 格式）
+    """
+    os.makedirs(os.path.join(publish_dir, SHARDS_DIR), exist_ok=True)
+    old_entries = load_index(publish_dir).get('accounts', {})
+    entries = {}
+    shards = []
+    changed = []
+
+    for account in accounts:
+        mid, sessdata = account.get('mid'), account.get('sessdata')
+        if mid is None or not sessdata:
+            continue
+        key = str(mid)
+        old_entry = old_entries.get(key)
+        shard_path = f"{SHARDS_DIR}/{key}.json"
+
+        # 值未变化时沿用原来的 updated，分片字节不变
+        document = build_document(sessdata)
+        if old_entry and old_entry.get('value_hash') == content_hash(sessdata.encode('utf-8')):
+            document['updated'] = old_entry['updated']
+        document['mid'] = mid
+        data = _dumps(document).encode('utf-8')
+
+        if _write_if_changed(os.path.join(publish_dir, shard_path), data):
+            changed.append(mid)
+        entries[key] = {
+            'shard': shard_path,
+            'hash': content_hash(data),
+            'value_hash': content_hash(sessdata.encode('utf-8')),
+            'updated': document['updated'],
+        }
+        shards.append(data)
+
+    # 删除已不存在的账号的分片
+    for key, entry in old_entries.items():
+        if key not in entries:
+            _remove(os.path.join(publish_dir, entry['shard']))
+
+    if changed or entries.keys() != old_entries.keys():
+        _write_if_changed(os.path.join(publish_dir, BUNDLE_FILE), b'\n'.join(shards) + b'\n')
+        index = {
+            'version': FORMAT_VERSION,
+            'updated': build_document('')['updated'],
+            'bundle': BUNDLE_FILE,
+            'accounts': dict(sorted(entries.items())),
+        }
+        _write_if_changed(os.path.join(publish_dir, INDEX_FILE), _dumps(index).encode('utf-8'))
+    return changed
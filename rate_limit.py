@@ -0,0 +1,211 @@
+"""
+请求限速
+TokenBucket: 令牌桶，按固定速率补充令牌，允许不超过容量的突发请求（线程安全）
+AdaptiveLimiter: 按响应自动调整速率的令牌桶（AIMD），http_client 为每个B站刷新/登录接口各使用一个:
+- 被拦截（-412/-352）或 HTTP 429/412 时速率降为 DECREASE（0.7）倍，同一冷却期内只减一次（避免同时在途的失败把速率压到最低）
+- 请求在限速器上排队、且延迟没有明显升高时，慢启动阶段每秒约翻倍，之后每秒增加 INCREASE 次/秒
+- 结果是稳定在服务端不拦截的最高速率附近，而不是靠重试退避消化被拦截的请求
+
+设置环境变量 REFRESH_RATE_LIMIT=off 关闭接口限速（例如在模拟服务上做基准测试时）。
+"""
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+class TokenBucket:
+    """令牌桶：rate 为每秒补充的令牌数，capacity 为桶容量（允许的突发请求数）"""
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1)
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated = now
+
+    def tokens(self):
+        """当前可用的令牌数"""
+        with self._lock:
+            self._refill(self._clock())
+            return self._tokens
+
+    def wait_time(self, n=1):
+        """还需等待多少秒才有 n 个令牌，0 表示现在就有"""
+        with self._lock:
+            self._refill(self._clock())
+            missing = n - self._tokens
+        if missing <= 0:
+            return 0.0
+        return missing / self.rate if self.rate > 0 else float('inf')
+
+    def try_acquire(self, n=1):
+        """有足够令牌时取走并返回True，否则不等待直接返回False"""
+        with self._lock:
+            self._refill(self._clock())
+            if self._tokens < n:
+                return False
+            self._tokens -= n
+            return True
+
+    def acquire(self, n=1, timeout=None):
+        """等待直到取得 n 个令牌，超时返回False"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.try_acquire(n):
+            wait = self.wait_time(n)
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or wait > remaining:
+                    return False
+            time.sleep(wait)
+        return True
+
+
+RATE_LIMIT_ENV = 'REFRESH_RATE_LIMIT'
+# 需要限速的接口（路径前缀）
+ENDPOINTS = {
+    'cookie_info': '/x/passport-login/web/cookie/info',
+    'correspond': '/correspond/1/',
+    'cookie_refresh': '/x/passport-login/web/cookie/refresh',
+    'confirm_refresh': '/x/passport-login/web/confirm/refresh',
+    'qrcode_poll': '/x/passport-tv-login/qrcode/poll',
+}
+# 初始速率与上下限（次/秒）
+INITIAL_RATE = 10.0
+MIN_RATE = 0.5
+MAX_RATE = 500.0
+# 拥塞避免阶段每秒增加的速率（次/秒）
+INCREASE = 5.0
+# 被拦截时速率乘以的系数
+DECREASE = 0.7
+# 两次减速之间的最短间隔（秒）
+COOLDOWN = 1.0
+# 延迟的指数移动平均超过基线（最近一个窗口内的最低延迟）的倍数时不再加速
+LATENCY_FACTOR = 3.0
+EWMA_WEIGHT = 0.1
+BASELINE_WINDOW = 60.0
+# 调用方在此时间（秒）内等待过令牌，才认为速率是瓶颈并允许加速
+SATURATION_WINDOW = 1.0
+# 表示被限流的B站错误码与HTTP状态码（风控拦截时返回 HTTP 412 和HTML页面，没有错误码）
+THROTTLE_CODES = frozenset({-412, -352})
+THROTTLE_STATUS = frozenset({429, 412})
+
+
+class AdaptiveLimiter:
+    """AIMD 自适应限速器（线程安全）"""
+
+    def __init__(self, rate=INITIAL_RATE, min_rate=MIN_RATE, max_rate=MAX_RATE, clock=time.monotonic):
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.bucket = TokenBucket(rate, max(rate, 1), clock)
+        self._clock = clock
+        # 慢启动阈值：首次被拦截前为无穷大
+        self.ssthresh = float('inf')
+        self.throttled = 0
+        self._last_decrease = float('-inf')
+        self._last_wait = float('-inf')
+        self._latency = None
+        self._baseline = None
+        self._window_min = float('inf')
+        self._window_start = clock()
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self):
+        return self.bucket.rate
+
+    def _set_rate(self, rate):
+        bucket = self.bucket
+        with bucket._lock:
+            bucket._refill(self._clock())
+            bucket.rate = min(max(rate, self.min_rate), self.max_rate)
+            # 桶容量为1秒的请求数，降速后多余的令牌作废
+            bucket.capacity = max(bucket.rate, 1)
+            bucket._tokens = min(bucket._tokens, bucket.capacity)
+
+    def acquire(self):
+        """等待一个令牌"""
+        if not self.bucket.try_acquire():
+            with self._lock:
+                self._last_wait = self._clock()
+            self.bucket.acquire()
+
+    def _congested(self, latency, now):
+        """延迟的移动平均是否明显高于基线；基线每个窗口更新一次，网络变化后能重新适应"""
+        self._window_min = min(self._window_min, latency)
+        if self._baseline is None or now - self._window_start >= BASELINE_WINDOW:
+            self._baseline = self._window_min
+            self._window_min = float('inf')
+            self._window_start = now
+        self._baseline = min(self._baseline, latency)
+        self._latency = latency if self._latency is None else (
+            EWMA_WEIGHT * latency + (1 - EWMA_WEIGHT) * self._latency)
+        return self._latency > LATENCY_FACTOR * max(self._baseline, 0.001)
+
+    def record(self, status=None, code=None, latency=None):
+        """记录一次请求的结果：HTTP状态码、B站错误码、耗时（秒）"""
+        now = self._clock()
+        with self._lock:
+            if status in THROTTLE_STATUS or code in THROTTLE_CODES:
+                self.throttled += 1
+                if now - self._last_decrease >= COOLDOWN:
+                    self._last_decrease = now
+                    self.ssthresh = max(self.rate * DECREASE, self.min_rate)
+                    self._set_rate(self.ssthresh)
+                return
+            if status is None or status >= 500:
+                return
+            if latency is not None and self._congested(latency, now):
+                return
+            if now - self._last_wait > SATURATION_WINDOW:
+                return
+            rate = self.rate
+            # 每个成功请求增加 1（慢启动，每秒约翻倍）或 INCREASE/rate（每秒增加 INCREASE）
+            self._set_rate(rate + (1.0 if rate < self.ssthresh else INCREASE / rate))
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def enabled():
+    return os.environ.get(RATE_LIMIT_ENV, '').lower() not in ('0', 'off', 'false', 'no')
+
+
+def endpoint(url):
+    """URL 对应的限速接口名，不需要限速时返回None"""
+    path = urlsplit(url).path
+    for name, prefix in ENDPOINTS.items():
+        if path.startswith(prefix):
+            return name
+    return None
+
+
+def limiter_for(url):
+    """URL 对应接口的共享限速器，不需要限速或已关闭限速时返回None"""
+    name = endpoint(url)
+    if name is None or not enabled():
+        return None
+    limiter = _limiters.get(name)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.setdefault(name, AdaptiveLimiter())
+    return limiter
+
+
+def snapshot():
+    """各接口当前的速率（次/秒）与被拦截次数"""
+    return {name: {'rate': round(l.rate, 2), 'throttled': l.throttled}
+            for name, l in sorted(_limiters.items())}
+
+
+def reset():
+    with _limiters_lock:
+        _limiters.clear()
@@ -0,0 +1,93 @@
+"""
+多账号并发刷新引擎
+对一组账号并发执行官方Cookie刷新流程（见 bili_refresh.py）
+用法: python refresh_engine.py accounts.json [-c 并发数]
+      python refresh_engine.py --store tokens.db [-c 并发数]
+"""
+import argparse
+import os
+import sys
+import time
+
+import http_client
+import metrics
+from journal import JOURNAL_DIR_ENV, DEFAULT_JOURNAL_DIR, Journal
+from lease import LEASE_ENV, open_backend
+from bili_refresh import (
+    DEFAULT_CONCURRENCY,
+    PublicationSink,
+    Refresher,
+    StoreSource,
+    TokensFileSource,
+)
+
+
+def print_result(result):
+    """打印单个账号的刷新结果"""
+    mid = result['mid']
+    elapsed = result['elapsed']
+    if result['status'] == 'refreshed':
+        suffix = "" if result.get('confirmed') else "（确认更新失败）"
+        print(f"✅ [{mid}] Cookie刷新成功{suffix} ({elapsed:.2f}s)")
+    elif result['status'] == 'valid':
+        print(f"✅ [{mid}] Cookie仍然有效，无需刷新 ({elapsed:.2f}s)")
+    elif result['status'] == 'skipped':
+        print(f"⚠️  [{mid}] 其他刷新者正在处理，跳过")
+    else:
+        print(f"❌ [{mid}] 刷新失败: {result['error']} ({elapsed:.2f}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多账号并发刷新B站Cookie")
+    parser.add_argument('accounts', nargs='?', help="账号文件（tokens.json 或 账号数组）")
+    parser.add_argument('--store', metavar='DB', help="从Token数据库读取账号并逐个写回（如 tokens.db）")
+    parser.add_argument('-c', '--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"并发数（默认 {DEFAULT_CONCURRENCY}）")
+    parser.add_argument('--publish-dir', metavar='DIR', help="刷新后把所有账号的SESSDATA发布到该目录（分片+索引）")
+    parser.add_argument('--lease', metavar='PATH', default=os.environ.get(LEASE_ENV),
+                        help="账号租约：目录（单机文件锁）或 .db 文件（多节点共享），避免重复刷新同一账号")
+    parser.add_argument('--journal', metavar='DIR',
+                        default=os.environ.get(JOURNAL_DIR_ENV, DEFAULT_JOURNAL_DIR),
+                        help="刷新日志目录，拿到新凭据后先写入日志，中断后下次运行从中断处继续")
+    args = parser.parse_args()
+    http_client.enable_dns_cache()
+    leases = open_backend(args.lease) if args.lease else None
+    journal = Journal(args.journal)
+
+    if args.store:
+        # 每个账号刷新成功后立即更新数据库中对应的一行；获得租约后从数据库读取最新凭据
+        source = StoreSource(args.store)
+    elif args.accounts and os.path.exists(args.accounts):
+        # 使用租约时可能有其他进程同时刷新同一个文件，逐个账号在租约内重新读取、在文件锁内写回
+        source = TokensFileSource(args.accounts, shared=leases is not None)
+    else:
+        print(f"❌ 错误: 未找到账号文件 {args.accounts or ''}")
+        sys.exit(1)
+    sinks = [PublicationSink(args.publish_dir)] if args.publish_dir else []
+    refresher = Refresher(source, sinks, args.concurrency, leases=leases, journal=journal)
+
+    print("=" * 60)
+    print(f"B站Cookie并发刷新: {args.store or args.accounts}, 并发 {args.concurrency}")
+    print("=" * 60)
+    started = time.monotonic()
+    results = refresher.run(on_result=print_result)
+    if isinstance(source, TokensFileSource) and any(r['status'] == 'refreshed' for r in results):
+        print(f"\n✅ Token已更新到 {args.accounts}")
+    for sink in sinks:
+        print(f"✅ 已发布到 {sink.publish_dir}，{len(sink.changed)} 个账号的SESSDATA有变化")
+
+    counts = {}
+    for r in results:
+        counts[r['status']] = counts.get(r['status'], 0) + 1
+    print("\n" + "=" * 60)
+    print(f"完成: 有效 {counts.get('valid', 0)}, 已刷新 {counts.get('refreshed', 0)}, "
+          f"失败 {counts.get('failed', 0)}, 跳过 {counts.get('skipped', 0)}, 总耗时 {time.monotonic() - started:.2f}s")
+    print("=" * 60)
+
+    metrics.export()
+    if counts.get('failed'):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
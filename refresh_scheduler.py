@@ -0,0 +1,263 @@
+"""
+按过期时间调度的常驻刷新服务
+用最小堆维护每个账号的下次检查时间，根据 tokens 中的 expires_in/obtained_at、
+SESSDATA 自带的过期时间以及 check_need_refresh() 返回的服务器时间，
+在需要刷新之前检查账号，并加入随机抖动避免集中请求。
+用法: python refresh_scheduler.py accounts.json [-c 并发数]
+      python refresh_scheduler.py --store tokens.db [-c 并发数]
+"""
+import argparse
+import heapq
+import os
+import random
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import http_client
+import metrics
+from journal import JOURNAL_DIR_ENV, DEFAULT_JOURNAL_DIR, Journal
+from lease import LEASE_ENV, account_key, open_backend
+from bili_refresh import (
+    DEFAULT_CONCURRENCY,
+    finish_journal,
+    refresh_account,
+    StoreSource,
+    TokensFileSource,
+)
+from refresh_engine import print_result
+from sessdata_file import sessdata_expiry
+
+# 两次检查的最短/最长间隔（秒）
+MIN_INTERVAL = 10 * 60
+MAX_INTERVAL = 12 * 3600
+# 刷新失败后的首次重试间隔（秒），之后按2倍退避直到 MAX_INTERVAL
+RETRY_INTERVAL = 5 * 60
+# 检查间隔为距过期剩余时间的比例，越接近过期检查越频繁
+INTERVAL_RATIO = 0.25
+# 随机抖动比例
+JITTER = 0.1
+# 账号文件最短写回间隔（秒）
+SAVE_INTERVAL = 60
+
+
+def token_expiry(account):
+    """根据 obtained_at + expires_in 计算token过期时间"""
+    expires_in = account.get('expires_in')
+    obtained_at = account.get('last_refreshed') or account.get('obtained_at')
+    if not expires_in or not obtained_at:
+        return None
+    try:
+        return datetime.fromisoformat(obtained_at).timestamp() + int(expires_in)
+    except (TypeError, ValueError):
+        return None
+
+
+def next_check_time(account, now, clock_skew=0.0, jitter=JITTER):
+    """计算账号下次检查的本地时间
+
+    clock_skew: 服务器时间 - 本地时间（秒），过期时间按服务器时钟换算到本地
+    """
+    deadlines = [t for t in (sessdata_expiry(account.get('sessdata')), token_expiry(account)) if t]
+    if deadlines:
+        remaining = min(deadlines) - clock_skew - now
+        interval = min(max(remaining * INTERVAL_RATIO, MIN_INTERVAL), MAX_INTERVAL)
+    else:
+        interval = MAX_INTERVAL
+    return now + interval * random.uniform(1 - jitter, 1 + jitter)
+
+
+class RefreshScheduler:
+    """常驻刷新调度器
+
+    堆中每个账号只保留一项 (下次检查时间, 序号, mid)，调度时弹出、完成后重新放入，
+    内存占用只与账号数量有关，不随运行时间增长。
+    """
+
+    def __init__(self, accounts, concurrency=DEFAULT_CONCURRENCY, on_result=None, jitter=JITTER,
+                 leases=None, reload=None, journal=None, priority=()):
+        self.accounts = {account.get('mid'): account for account in accounts}
+        self.concurrency = max(1, concurrency)
+        self.on_result = on_result
+        self.jitter = jitter
+        # 多个节点同时运行时，用租约保证同一账号只由一个节点刷新（见 lease.py）
+        self.leases = leases
+        self.reload = reload
+        # 拿到新凭据后先写入日志，写回之前中断时下次从日志继续（见 journal.py）
+        self.journal = journal
+        self._heap = []
+        self._seq = 0
+        self._failures = {}
+        self._skew = {}
+        self._cond = threading.Condition()
+        self._slots = threading.Semaphore(self.concurrency)
+        self._stop = threading.Event()
+
+        # 启动时把所有账号分散在第一个抖动窗口内检查；
+        # priority 中的账号（如健康检查发现需要刷新的）立即检查
+        now = time.time()
+        priority = set(priority)
+        for mid in self.accounts:
+            due = now if mid in priority else now + random.uniform(0, MIN_INTERVAL * jitter)
+            self._push(due, mid)
+
+    def _push(self, due, mid):
+        with self._cond:
+            self._seq += 1
+            heapq.heappush(self._heap, (due, self._seq, mid))
+            self._cond.notify()
+
+    def _schedule_next(self, result):
+        mid = result['mid']
+        now = time.time()
+        if result['status'] == 'failed':
+            failures = self._failures.get(mid, 0) + 1
+            self._failures[mid] = failures
+            delay = min(RETRY_INTERVAL * 2 ** (failures - 1), MAX_INTERVAL)
+            due = now + delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+        else:
+            self._failures.pop(mid, None)
+            if result.get('server_time'):
+                self._skew[mid] = result['server_time'] / 1000 - now
+            due = next_check_time(self.accounts[mid], now, self._skew.get(mid, 0.0), self.jitter)
+        self._push(due, mid)
+
+    def _run_one(self, mid):
+        # 刷新或处理结果出错时也要重新放回堆中，否则该账号在服务运行期间再也不会被检查
+        result = {'mid': mid, 'status': 'failed'}
+        try:
+            result = refresh_account(self.accounts[mid], leases=self.leases, reload=self.reload,
+                                     journal=self.journal)
+            if result['status'] in ('refreshed', 'valid') and self.reload:
+                # 其他节点可能已经刷新过，使用租约内读到的最新凭据计算下次检查时间
+                self.accounts[mid] = result['account']
+            if result['status'] == 'refreshed':
+                self.accounts[mid] = result['account']
+            if self.on_result:
+                try:
+                    self.on_result(result)
+                except Exception as e:
+                    # 写回失败（如数据库被锁）：新凭据仍在刷新日志中，按失败退避后重试写回
+                    print(f"❌ [{mid}] 处理刷新结果失败: {e}")
+                    result = dict(result, status='failed')
+        except Exception as e:
+            print(f"❌ [{mid}] 刷新出错: {e}")
+        finally:
+            try:
+                self._schedule_next(result)
+            finally:
+                self._slots.release()
+
+    def next_due(self):
+        """最近一次待检查的时间，没有账号时返回None"""
+        with self._cond:
+            return self._heap[0][0] if self._heap else None
+
+    def stop(self):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+
+    def run(self, on_tick=None, tick_interval=SAVE_INTERVAL):
+        """运行调度循环直到 stop() 被调用
+
+        on_tick: 可选回调，每轮循环调用一次，空闲时至少每 tick_interval 秒一次（例如写回账号文件）
+        """
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            while not self._stop.is_set():
+                mid = None
+                with self._cond:
+                    now = time.time()
+                    if self._heap and self._heap[0][0] <= now:
+                        _, _, mid = heapq.heappop(self._heap)
+                    else:
+                        wait = self._heap[0][0] - now if self._heap else tick_interval
+                        self._cond.wait(min(wait, tick_interval))
+                if on_tick:
+                    on_tick()
+                if mid is not None:
+                    self._slots.acquire()
+                    executor.submit(self._run_one, mid)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="按过期时间调度的B站Cookie刷新服务")
+    parser.add_argument('accounts', nargs='?', help="账号文件（tokens.json 或 账号数组）")
+    parser.add_argument('--store', metavar='DB', help="从Token数据库读取账号并逐个写回（如 tokens.db）")
+    parser.add_argument('-c', '--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"并发数（默认 {DEFAULT_CONCURRENCY}）")
+    parser.add_argument('--lease', metavar='PATH', default=os.environ.get(LEASE_ENV),
+                        help="账号租约：目录（单机文件锁）或 .db 文件（多节点共享），多个服务可以同时运行")
+    parser.add_argument('--journal', metavar='DIR',
+                        default=os.environ.get(JOURNAL_DIR_ENV, DEFAULT_JOURNAL_DIR),
+                        help="刷新日志目录，拿到新凭据后先写入日志，中断后下次运行从中断处继续")
+    args = parser.parse_args()
+    http_client.enable_dns_cache()
+    leases = open_backend(args.lease) if args.lease else None
+    journal = Journal(args.journal)
+
+    health = None
+    priority = ()
+    if args.store:
+        from health import NEEDS_REFRESH, HealthCache
+        # 刷新成功后立即更新数据库中对应的一行；获得租约后从数据库读取最新凭据
+        source = StoreSource(args.store)
+        # health.py 的检查结果与账号保存在同一个数据库中，需要刷新的账号优先检查
+        health = HealthCache(args.store)
+        priority = [r['mid'] for r in health.load().values() if r['status'] == NEEDS_REFRESH]
+    elif args.accounts and os.path.exists(args.accounts):
+        # 使用租约时可能有其他进程同时刷新同一个文件，逐个账号在租约内重新读取、在文件锁内写回；
+        # 否则 save() 只更新内存中的副本，定期整体写回
+        source = TokensFileSource(args.accounts, shared=leases is not None)
+    else:
+        print(f"❌ 错误: 未找到账号文件 {args.accounts or ''}")
+        sys.exit(1)
+    accounts = source.load()
+
+    # 已交给来源但尚未 flush() 的结果，flush 后清除其日志
+    unsaved = []
+    unsaved_lock = threading.Lock()
+
+    def on_result(result):
+        if result['status'] == 'refreshed' and source.save(result):
+            with unsaved_lock:
+                unsaved.append(result)
+            if health is not None:
+                health.invalidate(account_key(result['account']))
+        print_result(result)
+
+    scheduler = RefreshScheduler(accounts, args.concurrency, on_result=on_result, leases=leases,
+                                 reload=source.reload, journal=journal, priority=priority)
+    last_save = [time.monotonic()]
+    last_export = [time.monotonic()]
+
+    def save(force=False):
+        if time.monotonic() - last_export[0] >= SAVE_INTERVAL or force:
+            metrics.export()
+            last_export[0] = time.monotonic()
+        if unsaved and (force or time.monotonic() - last_save[0] >= SAVE_INTERVAL):
+            with unsaved_lock:
+                saved = unsaved[:]
+                del unsaved[:]
+            if source.flush():
+                print(f"✅ Token已更新到 {args.accounts}")
+            for result in saved:
+                finish_journal(journal, result)
+            last_save[0] = time.monotonic()
+
+    signal.signal(signal.SIGINT, lambda *_: scheduler.stop())
+    signal.signal(signal.SIGTERM, lambda *_: scheduler.stop())
+
+    print("=" * 60)
+    print(f"B站Cookie刷新服务: {len(accounts)} 个账号, 并发 {args.concurrency}")
+    print("=" * 60)
+    scheduler.run(on_tick=save)
+    save(force=True)
+    print("\n刷新服务已停止")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+"""
+请求重试、对冲与熔断
+- 按错误类型分类重试：网络错误/超时、HTTP 5xx/429、B站限流类错误码（-412 等）
+- 指数退避 + 随机抖动，每次调用的总耗时受 deadline 限制
+- 幂等的 GET 可以对冲（hedge）：第一个请求超过 hedge_after 秒仍未返回时再发一个，取先成功的
+- 每个主机一个熔断器：连续失败达到阈值后，在 reset_timeout 内直接失败而不是等待超时
+
+非幂等的请求（如 cookie/refresh）只在请求确定没有发出（建立连接失败）或被明确拒绝（限流错误码）时重试。
+"""
+import queue
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+import urllib3.exceptions
+
+import http_client
+import metrics
+import rate_limit
+from http_client import api_code
+
+# 每次调用最多尝试的次数
+MAX_ATTEMPTS = 3
+# 退避时间（秒）：第n次重试前等待 [0, min(MAX_DELAY, BASE_DELAY * 2^n)] 内的随机时间
+BASE_DELAY = 0.5
+MAX_DELAY = 8.0
+# 包括重试在内，一次调用的总时长上限（秒）
+DEADLINE = 30.0
+# 对冲请求的等待时间（秒）
+HEDGE_AFTER = 1.0
+# 连续失败多少次后熔断，熔断多久后放行一个探测请求（秒）
+FAILURE_THRESHOLD = 5
+RESET_TIMEOUT = 30.0
+
+# 可重试的B站错误码：请求被拦截、服务器错误、限流、服务超时、请求过于频繁
+RETRYABLE_CODES = {-412, -500, -503, -504, -509, -799}
+# 明确表示请求被拒绝、没有处理的错误码（拦截、风控校验失败、限流、请求过于频繁），
+# 非幂等请求只对这些错误码重试；-500/-503/-504 时服务器可能已经处理过（如已经换发了新的token）
+THROTTLED_CODES = {-412, -352, -509, -799}
+
+
+class CircuitOpenError(Exception):
+    """主机处于熔断状态，请求未发出"""
+
+
+class CircuitBreaker:
+    """单个主机的熔断器（closed -> open -> half_open -> closed）"""
+
+    def __init__(self, failure_threshold=FAILURE_THRESHOLD, reset_timeout=RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """是否允许发出请求；熔断到期后只放行一个探测请求"""
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open':
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = 'half_open'
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+
+
+class RetryPolicy:
+    """重试策略
+
+    idempotent: 为 False 时只重试确定未发出的请求和被明确拒绝的请求
+    hedge_after: 设置后对每次尝试做对冲，只应用于幂等请求
+    """
+
+    def __init__(self, attempts=MAX_ATTEMPTS, base_delay=BASE_DELAY, max_delay=MAX_DELAY,
+                 deadline=DEADLINE, idempotent=True, hedge_after=None):
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.idempotent = idempotent
+        self.hedge_after = hedge_after
+
+    def backoff(self, attempt):
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+IDEMPOTENT = RetryPolicy()
+HEDGED = RetryPolicy(hedge_after=HEDGE_AFTER)
+NON_IDEMPOTENT = RetryPolicy(idempotent=False)
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker(host):
+    """返回主机对应的熔断器"""
+    with _breakers_lock:
+        cb = _breakers.get(host)
+        if cb is None:
+            cb = _breakers[host] = CircuitBreaker()
+        return cb
+
+
+def reset_breakers():
+    """清除所有熔断状态"""
+    with _breakers_lock:
+        _breakers.clear()
+
+
+def _server_failed(response):
+    return response.status_code == 429 or response.status_code >= 500
+
+
+def _not_sent(error):
+    """请求是否确定没有发送到服务器（建立连接阶段失败）"""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(reason, urllib3.exceptions.NewConnectionError)
+
+
+def _retry_after(response):
+    try:
+        return float(response.headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
+
+
+def _close_later(results, pending):
+    """取回对冲中落后的响应并关闭，避免流式响应占用连接"""
+    def drain():
+        for _ in range(pending):
+            response, _ = results.get()
+            if response is not None:
+                response.close()
+    threading.Thread(target=drain, daemon=True).start()
+
+
+def _hedged(send, hedge_after):
+    """先发一个请求，hedge_after 秒内未返回再发一个，返回先成功的结果
+
+    第一个请求已经在限速器上排过队（send(limit=False)），对冲的请求自己排队
+    """
+    results = queue.Queue()
+    account = metrics.current_account()
+
+    def run(limit):
+        with metrics.account_context(account):
+            try:
+                results.put((send(limit=limit), None))
+            except Exception as e:
+                results.put((None, e))
+
+    threading.Thread(target=run, args=(False,), daemon=True).start()
+    launched = 1
+    try:
+        response, error = results.get(timeout=hedge_after)
+    except queue.Empty:
+        threading.Thread(target=run, args=(True,), daemon=True).start()
+        launched = 2
+        response, error = results.get()
+    received = 1
+    if (error is not None or _server_failed(response)) and launched == 2:
+        # 先返回的失败了，等另一个
+        other, other_error = results.get()
+        received = 2
+        if other_error is None and not _server_failed(other):
+            if response is not None:
+                response.close()
+            response, error = other, None
+        elif other is not None:
+            other.close()
+    if launched > received:
+        _close_later(results, launched - received)
+    if error is not None:
+        raise error
+    return response
+
+
+def request(method, url, policy=None, **kwargs):
+    """带分类重试、对冲和熔断的请求
+
+    可重试的失败在重试用尽后：网络错误抛出最后一次的异常，HTTP/错误码失败返回最后一次的响应。
+    主机处于熔断状态时抛出 CircuitOpenError。
+    """
+    if policy is None:
+        policy = IDEMPOTENT if method in ('GET', 'HEAD') else NON_IDEMPOTENT
+    host = urlsplit(url).hostname
+    cb = breaker(host)
+    deadline = time.monotonic() + policy.deadline
+    check_code = not kwargs.get('stream', False)
+    limiter = rate_limit.limiter_for(url)
+    attempt = 0
+    while True:
+        if not cb.allow():
+            raise CircuitOpenError(f"{host} 连续请求失败，已暂停请求")
+        if limiter is not None:
+            # 先在接口限速器上排队，排队时间不计入对冲等待和请求耗时
+            limiter.acquire()
+
+        def send(retries=attempt, limit=False):
+            return http_client.request(method, url, retries=retries, limit=limit, **kwargs)
+
+        response = error = None
+        try:
+            if policy.hedge_after is not None and policy.idempotent:
+                response = _hedged(send, policy.hedge_after)
+            else:
+                response = send()
+        except requests.exceptions.RequestException as e:
+            cb.record_failure()
+            error = e
+            retryable = policy.idempotent or _not_sent(e)
+        except Exception:
+            cb.record_failure()
+            raise
+        else:
+            if _server_failed(response):
+                cb.record_failure()
+                # 非幂等请求收到5xx时服务器可能已经处理过，不重试
+                retryable = policy.idempotent or response.status_code == 429
+            else:
+                cb.record_success()
+                codes = RETRYABLE_CODES if policy.idempotent else THROTTLED_CODES
+                retryable = check_code and api_code(response) in codes
+
+        if not retryable or attempt + 1 >= policy.attempts:
+            break
+        delay = policy.backoff(attempt)
+        if response is not None:
+            delay = max(delay, _retry_after(response) or 0)
+        if time.monotonic() + delay >= deadline:
+            break
+        if response is not None:
+            response.close()
+        time.sleep(delay)
+        attempt += 1
+
+    if error is not None:
+        raise error
+    return response
+
+
+def get(url, policy=None, **kwargs):
+    return request('GET', url, policy, **kwargs)
+
+
+def post(url, policy=None, **kwargs):
+    return request('POST', url, policy, **kwargs)
+
+
+def put(url, policy=None, **kwargs):
+    return request('PUT', url, policy, **kwargs)
@@ -0,0 +1,187 @@
+"""
+SESSDATA 读取客户端
+供使用 SESSDATA 的服务导入，获取发布的 SESSDATA 文档并在进程内缓存:
+- 缓存有效期根据服务端 Cache-Control，或文档的 updated 与刷新周期推算（见 sessdata_file.next_change）
+- 使用 ETag 条件请求重新验证
+- 缓存过期后先返回旧值，由单个后台线程重新验证，热路径不等待网络
+- 首次获取只由一个线程请求，并发的调用等待同一次结果
+- 使用独立的 requests.Session，不经过刷新流程的 http_client（不计入刷新指标，也不占用接口限速额度）
+
+用法:
+    from sessdata_client import SessdataClient
+    client = SessdataClient("https://raw.githubusercontent.com/用户名/仓库名/main/SESSDATA")
+    sessdata = client.get()
+"""
+import json
+import re
+import threading
+import time
+
+import requests
+
+from http_client import DEFAULT_TIMEOUT
+from sessdata_file import next_change
+
+# 发布端的刷新周期（秒），用于推算下次更新时间
+DEFAULT_REFRESH_INTERVAL = 24 * 3600
+# 缓存有效期上下限（秒）
+MIN_TTL = 60
+MAX_TTL = 3600
+
+_MAX_AGE_RE = re.compile(r'max-age=(\d+)')
+
+# 读取方共用的会话，与刷新流程的 http_client.session 分开
+_session = requests.Session()
+
+
+class SessdataClient:
+    """带TTL缓存和后台重新验证的SESSDATA读取客户端（线程安全）"""
+
+    def __init__(self, url, refresh_interval=DEFAULT_REFRESH_INTERVAL,
+                 min_ttl=MIN_TTL, max_ttl=MAX_TTL, session=None):
+        self.url = url
+        self.session = session or _session
+        self.refresh_interval = refresh_interval
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self.document = None
+        self.etag = None
+        self.expires_at = 0.0
+        self.last_error = None
+        self._lock = threading.Lock()
+        # 缓存为空时只允许一个线程请求
+        self._fetch_lock = threading.Lock()
+        self._revalidating = False
+
+    def _ttl(self, document, response):
+        """优先使用服务端 Cache-Control，其次推算下一次刷新的时间"""
+        match = _MAX_AGE_RE.search(response.headers.get('Cache-Control', ''))
+        if match:
+            ttl = int(match.group(1))
+        else:
+            now = time.time()
+            next_refresh = next_change(document, self.refresh_interval, now)
+            if next_refresh is None:
+                return self.min_ttl
+            ttl = next_refresh - now
+        return min(max(ttl, self.min_ttl), self.max_ttl)
+
+    def _fetch(self):
+        headers = {'If-None-Match': self.etag} if self.etag and self.document else {}
+        response = self.session.get(self.url, headers=headers, timeout=DEFAULT_TIMEOUT)
+        if response.status_code == 304:
+            document = self.document
+        else:
+            response.raise_for_status()
+            document = json.loads(response.content.decode('utf-8'))
+        ttl = self._ttl(document, response)
+        with self._lock:
+            self.document = document
+            self.etag = response.headers.get('ETag') or self.etag
+            self.expires_at = time.monotonic() + ttl
+            self.last_error = None
+
+    def _revalidate(self):
+        try:
+            self._fetch()
+        except Exception as e:
+            # 失败时继续使用旧值，min_ttl 后再重试
+            with self._lock:
+                self.last_error = e
+                self.expires_at = time.monotonic() + self.min_ttl
+        finally:
+            with self._lock:
+                self._revalidating = False
+
+    def refresh(self):
+        """立即同步获取最新文档（可在服务启动时调用预热缓存）"""
+        self._fetch()
+        return self.document
+
+    def get_document(self):
+        """返回 {"value", "updated"} 文档
+
+        首次调用会同步请求（并发的首次调用只请求一次）；之后缓存过期时返回旧值并在后台重新验证
+        """
+        with self._lock:
+            document = self.document
+            if document is not None and time.monotonic() < self.expires_at:
+                return document
+            start_background = document is not None and not self._revalidating
+            if start_background:
+                self._revalidating = True
+        if document is None:
+            with self._fetch_lock:
+                # 等待锁期间其他线程可能已经取到了文档
+                with self._lock:
+                    document = self.document
+                if document is None:
+                    return self.refresh()
+            return document
+        if start_background:
+            threading.Thread(target=self._revalidate, daemon=True).start()
+        return document
+
+    def get(self):
+        """返回SESSDATA值"""
+        return self.get_document()['value']
+
+
+class PublicationClient:
+    """读取多账号发布目录（publication.py 生成）：下载索引，只拉取哈希变化的分片
+
+    base_url 为发布目录的地址，例如 https://raw.githubusercontent.com/用户名/仓库名/main/publish
+    """
+
+    def __init__(self, base_url, session=None):
+        self.base_url = base_url.rstrip('/')
+        self.session = session or _session
+        self.index_etag = None
+        self.hashes = {}
+        self.documents = {}
+
+    def _get(self, path, headers=None):
+        return self.session.get(f"{self.base_url}/{path}", headers=headers, timeout=DEFAULT_TIMEOUT)
+
+    def sync(self):
+        """同步到最新发布内容，返回内容发生变化的 mid 列表"""
+        headers = {'If-None-Match': self.index_etag} if self.index_etag else None
+        response = self._get('index.json', headers)
+        if response.status_code == 304:
+            return []
+        response.raise_for_status()
+        self.index_etag = response.headers.get('ETag')
+        entries = json.loads(response.content.decode('utf-8')).get('accounts', {})
+
+        changed = []
+        for key, entry in entries.items():
+            if self.hashes.get(key) == entry['hash']:
+                continue
+            shard = self._get(entry['shard'])
+            shard.raise_for_status()
+            self.documents[key] = json.loads(shard.content.decode('utf-8'))
+            self.hashes[key] = entry['hash']
+            changed.append(self.documents[key]['mid'])
+        for key in list(self.documents):
+            if key not in entries:
+                del self.documents[key]
+                del self.hashes[key]
+        return changed
+
+    def get(self, mid):
+        """返回指定账号的SESSDATA值，不存在时返回None"""
+        document = self.documents.get(str(mid))
+        return document['value'] if document else None
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_sessdata(url):
+    """按URL复用客户端，返回SESSDATA值"""
+    with _clients_lock:
+        client = _clients.get(url)
+        if client is None:
+            client = _clients[url] = SessdataClient(url)
+    return client.get()
@@ -0,0 +1,124 @@
+"""
+SESSDATA 文件格式与写入
+发布的 SESSDATA 文件内容为: {"value": "SESSDATA值", "updated": "2025-12-20 01:14:09 CST"}
+updated 表示 SESSDATA 值最近一次变化的时间；值未变化时不重写文件，避免每天产生一次提交。
+因此读取方不能用 updated + 刷新周期 作为下次更新时间（值长期不变时这个时间早已过去），
+而应使用 next_change()：值只会在按周期运行的刷新中变化，下次可能变化的时间是 updated 之后、
+当前时间之后的第一个刷新时间，并且不晚于 SESSDATA 值中携带的过期时间。
+"""
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+from urllib.parse import unquote
+from zoneinfo import ZoneInfo
+
+import metrics
+
+SESSDATA_FILE = 'SESSDATA'
+TIMEZONE = 'Asia/Shanghai'
+UPDATED_FORMAT = '%Y-%m-%d %H:%M:%S %Z'
+
+
+def build_document(value, now=None):
+    """生成SESSDATA文件内容"""
+    tz = ZoneInfo(TIMEZONE)
+    now = now.astimezone(tz) if now else datetime.now(tz)
+    return {
+        'value': value,
+        'updated': now.strftime(UPDATED_FORMAT),
+    }
+
+
+def dumps_document(document):
+    return json.dumps(document, ensure_ascii=False)
+
+
+def parse_updated(text):
+    """解析 updated 字段为带时区的 datetime，失败返回None
+
+    %Z 输出的时区缩写（CST）无法可靠反解析，按 Asia/Shanghai 处理
+    """
+    if not text:
+        return None
+    try:
+        naive = datetime.strptime(text.rsplit(' ', 1)[0], '%Y-%m-%d %H:%M:%S')
+    except ValueError:
+        return None
+    return naive.replace(tzinfo=ZoneInfo(TIMEZONE))
+
+
+def sessdata_expiry(value):
+    """SESSDATA 值中携带的过期时间戳（格式: 随机串,过期时间戳,校验串，可能经过URL编码），无法解析时返回None
+
+    refresh_scheduler 用它安排检查时间，与发布的 SESSDATA 文件使用同一个解析
+    """
+    parts = unquote(value or '').split(',')
+    if len(parts) >= 2 and parts[1].isdigit():
+        return int(parts[1])
+    return None
+
+
+def next_change(document, refresh_interval, now=None):
+    """文档的值最早可能变化的时间戳，无法确定时返回None
+
+    刷新每 refresh_interval 秒运行一次，取 updated 之后第一个晚于 now 的刷新时间；
+    SESSDATA 在此之前过期时取过期时间（过期后必然已经换了新值）
+    """
+    now = time.time() if now is None else now
+    updated = parse_updated(document.get('updated'))
+    if updated is None or refresh_interval <= 0:
+        return None
+    updated = updated.timestamp()
+    runs = max(1, int((now - updated) // refresh_interval) + 1)
+    result = updated + runs * refresh_interval
+    expiry = sessdata_expiry(document.get('value'))
+    if expiry is not None and now < expiry < result:
+        result = expiry
+    return result
+
+
+def read_document(path=SESSDATA_FILE):
+    """读取SESSDATA文件，不存在或格式错误时返回None"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def atomic_write(path, data, mode=0o644):
+    """写入同目录下的临时文件后重命名替换，读取方不会看到写了一半的文件
+
+    data 为 str 时按 UTF-8 写入，为 bytes 时原样写入；mode 为最终的文件权限
+    """
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp 创建的文件权限为0600，改为指定的权限
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+@metrics.timed('write_sessdata')
+def write_sessdata(value, path=SESSDATA_FILE):
+    """SESSDATA值发生变化时原子写入文件，返回 (是否写入, 文件中的文档)"""
+    existing = read_document(path)
+    if existing and existing.get('value') == value:
+        return False, existing
+    document = build_document(value)
+    atomic_write(path, dumps_document(document))
+    return True, document
@@ -0,0 +1,166 @@
+"""
+本地 SESSDATA 服务
+从内存提供当前的 SESSDATA 文档（与刷新脚本写出的 {"value","updated"} 格式相同），
+支持强 ETag、If-None-Match -> 304，并根据下次计划刷新时间设置 Cache-Control（private，代理不缓存）。
+用法: python sessdata_server.py [--file SESSDATA] [--port 8080]
+"""
+import argparse
+import hashlib
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from sessdata_file import SESSDATA_FILE, dumps_document, next_change, read_document
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8080
+# 默认刷新周期（秒），与 GitHub Actions 每天一次的定时任务一致
+DEFAULT_REFRESH_INTERVAL = 24 * 3600
+# 已过计划刷新时间、或无法确定时使用的 max-age（秒）
+FALLBACK_MAX_AGE = 60
+# 检查文件是否变化的最短间隔（秒）
+RELOAD_INTERVAL = 1.0
+PATHS = ('/', '/SESSDATA')
+
+
+class SessdataCache:
+    """内存中的 SESSDATA 文档，可由文件自动重新加载，也可由刷新流程直接写入"""
+
+    def __init__(self, path=None, refresh_interval=DEFAULT_REFRESH_INTERVAL):
+        self.path = path
+        self.refresh_interval = refresh_interval
+        self.document = None
+        self.body = None
+        self.etag = None
+        self.next_refresh = None
+        self._mtime = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        if path:
+            self.reload()
+
+    def set_document(self, document, next_refresh=None):
+        """更新文档；next_refresh 为下次计划刷新的时间戳，未指定时按刷新周期推算（见 sessdata_file.next_change）"""
+        body = dumps_document(document).encode('utf-8')
+        etag = '"%s"' % hashlib.sha256(body).hexdigest()[:32]
+        with self._lock:
+            self.document = document
+            self.body, self.etag, self.next_refresh = body, etag, next_refresh
+
+    def reload(self):
+        """文件发生变化时重新加载"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        document = read_document(self.path)
+        if document is not None:
+            self.set_document(document)
+            self._mtime = mtime
+
+    def snapshot(self):
+        """返回 (body, etag, max_age)，必要时先检查文件变化"""
+        if self.path:
+            now = time.monotonic()
+            if now - self._checked >= RELOAD_INTERVAL:
+                self._checked = now
+                self.reload()
+        with self._lock:
+            document, body, etag, next_refresh = self.document, self.body, self.etag, self.next_refresh
+        now = time.time()
+        if (next_refresh is None or next_refresh <= now) and document is not None:
+            # 值未变化时文档不会更新，按刷新周期推算下一次刷新
+            next_refresh = next_change(document, self.refresh_interval, now)
+        max_age = FALLBACK_MAX_AGE
+        if next_refresh is not None and next_refresh > now:
+            max_age = int(next_refresh - now)
+        return body, etag, max_age
+
+
+def etag_matches(header, etag):
+    """If-None-Match 比较（RFC 7232 弱比较）"""
+    if header.strip() == '*':
+        return True
+    for candidate in header.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+class SessdataHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    cache = None
+
+    def _respond(self, send_body):
+        if self.path.split('?', 1)[0] not in PATHS:
+            self.send_error(404)
+            return
+        body, etag, max_age = self.cache.snapshot()
+        if body is None:
+            self.send_error(503, "SESSDATA not available")
+            return
+
+        if_none_match = self.headers.get('If-None-Match')
+        not_modified = if_none_match is not None and etag_matches(if_none_match, etag)
+        self.send_response(304 if not_modified else 200)
+        self.send_header('ETag', etag)
+        # 文档中是有效的登录凭据，只允许客户端自己缓存，共享缓存/代理不能保存
+        self.send_header('Cache-Control', f'private, max-age={max_age}')
+        if not_modified:
+            self.end_headers()
+            return
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def do_GET(self):
+        self._respond(True)
+
+    def do_HEAD(self):
+        self._respond(False)
+
+    def log_message(self, format, *args):
+        # 高QPS轮询下不逐条打印访问日志
+        pass
+
+
+def create_server(cache, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """创建服务器（未启动），调用 serve_forever() 开始服务"""
+    handler = type('Handler', (SessdataHandler,), {'cache': cache})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地SESSDATA服务")
+    parser.add_argument('--file', default=SESSDATA_FILE, help=f"SESSDATA文件（默认 {SESSDATA_FILE}）")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--refresh-interval', type=int, default=DEFAULT_REFRESH_INTERVAL,
+                        help="刷新周期（秒），用于推算下次刷新时间")
+    args = parser.parse_args()
+
+    cache = SessdataCache(args.file, args.refresh_interval)
+    if cache.body is None:
+        print(f"⚠️  暂时无法读取 {args.file}，文件生成后会自动加载")
+    server = create_server(cache, args.host, args.port)
+    print(f"✅ SESSDATA服务已启动: http://{args.host}:{args.port}/SESSDATA")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,50 +1,13 @@
 """
 帮助脚本：将token上传到GitHub Secrets
+可以同时写入多个仓库和组织（组织Secret可限定可见的仓库），所有目标并发写入（见 github_secrets.py）
 需要先安装: pip install requests pynacl
 """
 import json
 import os
 import sys
-from base64 import b64encode
-from nacl import encoding, public
-import requests
 
-
-def encrypt(public_key: str, secret_value: str) -> str:
-    """使用GitHub公钥加密值"""
-    public_key_obj = public.PublicKey(public_key.encode("utf-8"), encoding.Base64Encoder())
-    sealed_box = public.SealedBox(public_key_obj)
-    encrypted = sealed_box.encrypt(secret_value.encode("utf-8"))
-    return b64encode(encrypted).decode("utf-8")
-
-
-def get_public_key(token: str, owner: str, repo: str):
-    """获取GitHub仓库的公钥"""
-    url = f"https://api.github.com/repos/{owner}/{repo}/actions/secrets/public-key"
-    headers = {
-        'Accept': 'application/vnd.github.v3+json',
-        'Authorization': f'token {token}'
-    }
-    response = requests.get(url, headers=headers)
-    if response.status_code != 200:
-        raise Exception(f"获取公钥失败: {response.status_code} - {response.text}")
-    return response.json()['key_id'], response.json()['key']
-
-
-def update_secret(token: str, owner: str, repo: str, secret_name: str, secret_value: str, key_id: str, public_key: str):
-    """更新GitHub Secret"""
-    encrypted_value = encrypt(public_key, secret_value)
-    url = f"https://api.github.com/repos/{owner}/{repo}/actions/secrets/{secret_name}"
-    headers = {
-        'Accept': 'application/vnd.github.v3+json',
-        'Authorization': f'token {token}'
-    }
-    data = {
-        'encrypted_value': encrypted_value,
-        'key_id': key_id
-    }
-    response = requests.put(url, headers=headers, json=data)
-    return response.status_code
+from github_secrets import SecretFanout, SecretPublisher, parse_targets
 
 
 def main():
@@ -74,12 +37,15 @@ def main():
     print("请输入GitHub仓库信息:")
     owner = input("GitHub用户名/组织名: ").strip()
     repo = input("仓库名: ").strip()
+    print("\n还可以把同样的Secret写入其他仓库或组织（直接回车跳过）")
+    print("格式: owner/repo，组织Secret为 org:组织名（私有仓库可见）、org:组织名:all、org:组织名:仓库1+仓库2")
+    extra = input("其他目标（逗号分隔）: ").strip()
     
     print("\n需要GitHub Personal Access Token (PAT)")
     print("创建步骤:")
     print("1. 访问 https://github.com/settings/tokens")
     print("2. 点击 'Generate new token (classic)'")
-    print("3. 勾选权限: repo (全部), workflow")
+    print("3. 勾选权限: repo (全部), workflow（写入组织Secret还需要 admin:org）")
     print("4. 生成并复制token")
     print()
     
@@ -88,72 +54,45 @@ def main():
     if not github_token or not owner or not repo:
         print("❌ 错误: 信息不完整")
         sys.exit(1)
+    try:
+        targets = parse_targets(f"{owner}/{repo},{extra}")
+    except ValueError as e:
+        print(f"❌ 错误: {e}")
+        sys.exit(1)
+    
+    # 同一账号的凭据，写入所有目标
+    secrets = {
+        'REFRESH_TOKEN': tokens['refresh_token'],
+        # 以下用于Cookie刷新
+        'SESSDATA': tokens.get('sessdata') or None,
+        'BILI_JCT': tokens.get('bili_jct') or None,
+        'MID': str(tokens['mid']) if tokens.get('mid') else None,
+    }
+    # 只写入第一个仓库
+    primary = {'ACCESS_TOKEN': tokens['access_token']}
+    
+    # REPO_ACCESS_TOKEN 用于GitHub Actions提交代码
+    print(f"\nREPO_ACCESS_TOKEN 用于GitHub Actions自动提交代码（只写入 {owner}/{repo}）")
+    use_same_token = input("是否使用同一个token作为REPO_ACCESS_TOKEN? (y/n): ").strip().lower()
+    if use_same_token == 'y':
+        # 个人token权限很大，不能写入其他仓库或组织Secret（组织Secret会被组织内的仓库读取）
+        primary['REPO_ACCESS_TOKEN'] = github_token
     
     try:
-        print("\n正在获取GitHub公钥...")
-        key_id, public_key = get_public_key(github_token, owner, repo)
-        print(f"✅ 获取公钥成功 (key_id: {key_id})")
-        
-        # 更新ACCESS_TOKEN
-        print("\n正在更新 ACCESS_TOKEN...")
-        status = update_secret(github_token, owner, repo, 'ACCESS_TOKEN', 
-                              tokens['access_token'], key_id, public_key)
-        if status == 201 or status == 204:
-            print("✅ ACCESS_TOKEN 更新成功")
-        else:
-            print(f"❌ ACCESS_TOKEN 更新失败: HTTP {status}")
-        
-        # 更新REFRESH_TOKEN
-        print("\n正在更新 REFRESH_TOKEN...")
-        status = update_secret(github_token, owner, repo, 'REFRESH_TOKEN', 
-                              tokens['refresh_token'], key_id, public_key)
-        if status == 201 or status == 204:
-            print("✅ REFRESH_TOKEN 更新成功")
-        else:
-            print(f"❌ REFRESH_TOKEN 更新失败: HTTP {status}")
-        
-        # 更新SESSDATA（用于Cookie刷新）
-        if tokens.get('sessdata'):
-            print("\n正在更新 SESSDATA...")
-            status = update_secret(github_token, owner, repo, 'SESSDATA', 
-                                  tokens['sessdata'], key_id, public_key)
-            if status == 201 or status == 204:
-                print("✅ SESSDATA 更新成功")
-            else:
-                print(f"❌ SESSDATA 更新失败: HTTP {status}")
-        
-        # 更新BILI_JCT（用于Cookie刷新）
-        if tokens.get('bili_jct'):
-            print("\n正在更新 BILI_JCT...")
-            status = update_secret(github_token, owner, repo, 'BILI_JCT', 
-                                  tokens['bili_jct'], key_id, public_key)
-            if status == 201 or status == 204:
-                print("✅ BILI_JCT 更新成功")
-            else:
-                print(f"❌ BILI_JCT 更新失败: HTTP {status}")
-        
-        # 更新MID（用于Cookie刷新）
-        if tokens.get('mid'):
-            print("\n正在更新 MID...")
-            status = update_secret(github_token, owner, repo, 'MID', 
-                                  str(tokens['mid']), key_id, public_key)
-            if status == 201 or status == 204:
-                print("✅ MID 更新成功")
-            else:
-                print(f"❌ MID 更新失败: HTTP {status}")
+        # 不使用状态文件，每次都写入全部Secret
+        fanout = SecretFanout(github_token, targets, state_file=None)
+        print(f"\n正在更新 {len(fanout.targets)} 个目标的 Secrets...")
+        statuses = fanout.publish(secrets)
+        statuses.setdefault(f"{owner}/{repo}", {}).update(
+            SecretPublisher(github_token, owner, repo, state_file=None).publish(primary))
+        for target, target_statuses in statuses.items():
+            for name, status in target_statuses.items():
+                if status == 201 or status == 204:
+                    print(f"✅ {target}: {name} 更新成功")
+                else:
+                    print(f"❌ {target}: {name} 更新失败: HTTP {status}")
         
-        # 更新REPO_ACCESS_TOKEN（用于GitHub Actions提交代码）
-        print("\nREPO_ACCESS_TOKEN 用于GitHub Actions自动提交代码")
-        use_same_token = input("是否使用同一个token作为REPO_ACCESS_TOKEN? (y/n): ").strip().lower()
-        if use_same_token == 'y':
-            print("\n正在更新 REPO_ACCESS_TOKEN...")
-            status = update_secret(github_token, owner, repo, 'REPO_ACCESS_TOKEN', 
-                                  github_token, key_id, public_key)
-            if status == 201 or status == 204:
-                print("✅ REPO_ACCESS_TOKEN 更新成功")
-            else:
-                print(f"❌ REPO_ACCESS_TOKEN 更新失败: HTTP {status}")
-        else:
+        if use_same_token != 'y':
             print("⚠️  请手动在GitHub仓库设置中添加 REPO_ACCESS_TOKEN")
             print("   路径: Settings -> Secrets and variables -> Actions")
         
@@ -0,0 +1,114 @@
+"""
+B站接口签名
+- AppSigner: APP 接口签名（appkey + ts，参数排序后拼接 appsec 取 md5），TV 扫码登录等接口使用
+- WbiSigner: Web 端 WBI 签名（wts + w_rid），密钥由 nav 接口返回的 img_key/sub_key 混淆得到
+
+两种签名都只对参数做一次排序和编码，得到的查询字符串直接作为请求URL的一部分，
+不再由 requests 重新编码；单个参数的编码结果有缓存，高频调用同一接口时几乎没有签名开销。
+WBI 混淆密钥在进程内缓存（默认1小时，B站每天更换一次），过期后只由一个线程重新获取。
+"""
+import threading
+import time
+from functools import lru_cache
+from hashlib import md5
+from urllib.parse import quote, quote_plus
+
+# img_key + sub_key 的字符重排表，取前32位作为混淆密钥
+MIXIN_KEY_ENC_TAB = (
+    46, 47, 18, 2, 53, 8, 23, 32, 15, 50, 10, 31, 58, 3, 45, 35, 27, 43, 5, 49,
+    33, 9, 42, 19, 29, 28, 14, 39, 12, 38, 41, 13, 37, 48, 7, 16, 24, 55, 40,
+    61, 26, 17, 0, 1, 60, 51, 30, 4, 22, 25, 54, 21, 56, 59, 6, 63, 57, 62, 11,
+    36, 20, 34, 44, 52,
+)
+# WBI 签名前要从参数值中去掉的字符
+WBI_FILTERED = str.maketrans('', '', "!'()*")
+# 混淆密钥的缓存时间（秒）
+WBI_KEY_TTL = 3600
+# 单个参数编码结果的缓存数量
+ENCODE_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=ENCODE_CACHE_SIZE)
+def _app_pair(key, value):
+    return f"{quote_plus(key)}={quote_plus(value)}"
+
+
+@lru_cache(maxsize=ENCODE_CACHE_SIZE)
+def _wbi_pair(key, value):
+    # 与浏览器的 encodeURIComponent 一致，空格编码为 %20
+    return f"{quote(key, safe='')}={quote(value.translate(WBI_FILTERED), safe='')}"
+
+
+def _encode(params, pair):
+    """按键排序后编码为查询字符串"""
+    return '&'.join(pair(str(k), str(v)) for k, v in sorted(params.items()))
+
+
+class AppSigner:
+    """APP 接口签名"""
+
+    def __init__(self, appkey, appsec):
+        self.appkey = appkey
+        self.appsec = appsec
+
+    def sign_value(self, params):
+        """params 的签名值（参数中应已包含 appkey）"""
+        return md5(f"{_encode(params, _app_pair)}{self.appsec}".encode('utf-8')).hexdigest()
+
+    def sign(self, params, ts=None):
+        """加入 appkey、ts 和 sign，返回编码好的查询字符串"""
+        params = dict(params, appkey=self.appkey, ts=int(ts or time.time()))
+        query = _encode(params, _app_pair)
+        sign = md5(f"{query}{self.appsec}".encode('utf-8')).hexdigest()
+        return f"{query}&sign={sign}"
+
+
+def mixin_key(img_key, sub_key):
+    """由 img_key 和 sub_key 计算 WBI 混淆密钥"""
+    raw = img_key + sub_key
+    return ''.join(raw[i] for i in MIXIN_KEY_ENC_TAB)[:32]
+
+
+def _key_from_url(url):
+    """wbi_img 中的图片地址 -> 文件名（不含扩展名）"""
+    return url.rsplit('/', 1)[-1].split('.', 1)[0]
+
+
+def keys_from_nav(data):
+    """从 nav 接口的 data 中取出 (img_key, sub_key)"""
+    wbi_img = data['wbi_img']
+    return _key_from_url(wbi_img['img_url']), _key_from_url(wbi_img['sub_url'])
+
+
+class WbiSigner:
+    """WBI 签名，fetch_keys() 返回 (img_key, sub_key)，结果缓存 ttl 秒"""
+
+    def __init__(self, fetch_keys, ttl=WBI_KEY_TTL):
+        self.fetch_keys = fetch_keys
+        self.ttl = ttl
+        self._mixin_key = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def mixin_key(self):
+        key = self._mixin_key
+        if key is not None and time.monotonic() < self._expires_at:
+            return key
+        with self._lock:
+            # 等锁期间其他线程可能已经获取过
+            if self._mixin_key is None or time.monotonic() >= self._expires_at:
+                self._mixin_key = mixin_key(*self.fetch_keys())
+                self._expires_at = time.monotonic() + self.ttl
+            return self._mixin_key
+
+    def invalidate(self):
+        """签名被拒绝（密钥已更换）时调用，下次签名重新获取密钥"""
+        with self._lock:
+            self._expires_at = 0.0
+
+    def sign(self, params, wts=None):
+        """加入 wts 和 w_rid，返回编码好的查询字符串"""
+        params = dict(params, wts=int(wts or time.time()))
+        query = _encode(params, _wbi_pair)
+        w_rid = md5(f"{query}{self.mixin_key()}".encode('utf-8')).hexdigest()
+        return f"{query}&w_rid={w_rid}"
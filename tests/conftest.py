@@ -0,0 +1,70 @@
+import os
+import sys
+
+import pytest
+
+# 脚本都在仓库根目录，测试直接导入
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakePassport:
+    """代替B站 passport 接口的刷新步骤，记录调用次数"""
+
+    def __init__(self):
+        self.need_refresh = True
+        self.refresh_ok = True
+        self.confirm_ok = True
+        # 设置后确认更新抛出该异常（模拟中断）
+        self.confirm_error = None
+        self.calls = {'check': 0, 'refresh': 0, 'confirm': 0}
+        self._serial = 0
+
+    def check_need_refresh(self, cookies):
+        self.calls['check'] += 1
+        if self.need_refresh is None:
+            return None, None
+        return self.need_refresh, 1700000000000
+
+    def refresh_cookie(self, refresh_token, refresh_csrf, cookies):
+        self.calls['refresh'] += 1
+        if not self.refresh_ok:
+            return None, None
+        self._serial += 1
+        new = f"{refresh_token}+{self._serial}"
+        return {'SESSDATA': f"s-{new}", 'bili_jct': f"j-{new}"}, new
+
+    def confirm_refresh(self, old_refresh_token, cookies):
+        self.calls['confirm'] += 1
+        if self.confirm_error:
+            raise self.confirm_error
+        return self.confirm_ok
+
+
+@pytest.fixture
+def passport(monkeypatch):
+    import bili_refresh
+
+    fake = FakePassport()
+    monkeypatch.setattr(bili_refresh, 'check_need_refresh', fake.check_need_refresh)
+    monkeypatch.setattr(bili_refresh, 'get_correspond_path', lambda ts: 'path')
+    monkeypatch.setattr(bili_refresh, 'get_refresh_csrf', lambda path, cookies: 'csrf')
+    monkeypatch.setattr(bili_refresh, 'refresh_cookie', fake.refresh_cookie)
+    monkeypatch.setattr(bili_refresh, 'confirm_refresh', fake.confirm_refresh)
+    monkeypatch.setattr(bili_refresh.http_client, 'prewarm', lambda *args, **kwargs: None)
+    return fake
+
+
+@pytest.fixture
+def github(monkeypatch):
+    """本地模拟的 GitHub 接口（benchmarks/mock_servers.py），返回服务状态（含每个接口的请求次数 hits）"""
+    import http_client
+
+    monkeypatch.syspath_prepend(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                             'benchmarks'))
+    from mock_servers import start_mock_server
+
+    server, base_url = start_mock_server()
+    monkeypatch.setattr(http_client, 'GITHUB_API_URL', base_url)
+    yield server.RequestHandlerClass.state
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,60 @@
+import io
+import json
+from urllib.parse import parse_qsl
+
+import requests
+
+import bili_client
+from bili_client import BiliClient
+from credential_pool import CredentialPool
+from signing import AppSigner
+
+
+def make_response(data):
+    response = requests.Response()
+    response.status_code = 200
+    response.headers['Content-Type'] = 'application/json'
+    response._content = json.dumps({'code': 0, 'data': data}).encode()
+    response.raw = io.BytesIO()
+    return response
+
+
+def capture(monkeypatch):
+    calls = []
+
+    def fake_request(method, url, **kwargs):
+        calls.append(dict(kwargs, method=method, url=url))
+        return make_response(kwargs['cookies'].get('SESSDATA'))
+    monkeypatch.setattr(bili_client.resilience, 'request', fake_request)
+    return calls
+
+
+def test_app_signed_post_signs_form_body(monkeypatch):
+    calls = capture(monkeypatch)
+    client = BiliClient('s', 'jct', appkey='key', appsec='sec')
+
+    client.post('/x/v2/like', {'aid': 1}, params={'platform': 'android'}, sign='app')
+
+    call = calls[0]
+    assert call['params'] is None and '?' not in call['url']
+    assert call['headers']['Content-Type'] == 'application/x-www-form-urlencoded'
+    form = dict(parse_qsl(call['data']))
+    assert form['aid'] == '1' and form['platform'] == 'android' and form['csrf'] == 'jct'
+    sign = form.pop('sign')
+    assert sign == AppSigner('key', 'sec').sign_value(form)
+
+
+def test_pooled_client_does_not_share_cached_responses(monkeypatch):
+    calls = capture(monkeypatch)
+    pool = CredentialPool([{'mid': 1, 'sessdata': 'a'}, {'mid': 2, 'sessdata': 'b'}])
+    client = BiliClient(pool=pool, cache_ttl=30)
+
+    assert [client.get('/x/web-interface/nav') for _ in range(2)] == ['a', 'b']
+    assert len(calls) == 2
+
+
+def test_single_account_client_caches(monkeypatch):
+    calls = capture(monkeypatch)
+    client = BiliClient('a', cache_ttl=30)
+    assert [client.get('/x/web-interface/nav') for _ in range(2)] == ['a', 'a']
+    assert len(calls) == 1
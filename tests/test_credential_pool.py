@@ -0,0 +1,102 @@
+import pytest
+import requests
+
+import credential_pool
+from credential_pool import CredentialPool, response_code
+
+
+def make_response(status, body, content_type):
+    response = requests.Response()
+    response.status_code = status
+    response.headers['Content-Type'] = content_type
+    response._content = body.encode('utf-8')
+    return response
+
+
+def test_response_code():
+    assert response_code(make_response(412, '<html>blocked</html>', 'text/html')) == -412
+    assert response_code(make_response(200, '{"code": -101}', 'application/json')) == -101
+    assert response_code(make_response(200, '<html></html>', 'text/html')) is None
+
+
+def test_request_quarantines_credential_on_http_412(monkeypatch):
+    monkeypatch.setattr(credential_pool.http_client, 'request',
+                        lambda *args, **kwargs: make_response(412, '<html>blocked</html>', 'text/html'))
+    pool = CredentialPool([{'mid': 1, 'sessdata': 'a'}, {'mid': 2, 'sessdata': 'b'}])
+
+    response = pool.request('GET', 'https://api.bilibili.com/x/web-interface/nav')
+
+    assert response.status_code == 412
+    assert pool.stats()['quarantined'] == 1
+
+
+def test_bili_client_reports_http_412_before_raising(monkeypatch):
+    import bili_client
+    from bili_client import BiliClient
+
+    monkeypatch.setattr(bili_client.resilience, 'request',
+                        lambda *args, **kwargs: make_response(412, '<html>blocked</html>', 'text/html'))
+    pool = CredentialPool([{'mid': 1, 'sessdata': 'a'}])
+    client = BiliClient(pool=pool)
+
+    with pytest.raises(requests.HTTPError):
+        client.get('/x/web-interface/nav', cache=False)
+    assert pool.stats()['quarantined'] == 1
+
+
+def test_acquire_raises_when_pool_is_empty():
+    with pytest.raises(credential_pool.NoCredentialError):
+        CredentialPool().acquire()
+
+
+def test_acquire_raises_when_every_credential_is_not_logged_in():
+    pool = CredentialPool([{'mid': 1, 'sessdata': 'a'}, {'mid': 2, 'sessdata': 'b'}])
+    for _ in range(2):
+        pool.report(pool.acquire(), credential_pool.NOT_LOGGED_IN)
+
+    with pytest.raises(credential_pool.NoCredentialError):
+        pool.acquire()
+    # 提供新的 SESSDATA 后恢复
+    pool.update([{'mid': 1, 'sessdata': 'a2'}])
+    assert pool.acquire(timeout=1).mid == 1
+
+
+def test_round_robin_rotates_and_skips_quarantined():
+    pool = CredentialPool([{'mid': m, 'sessdata': str(m)} for m in (1, 2, 3)], burst=100, rate=100)
+    assert [pool.acquire().mid for _ in range(6)] == [1, 2, 3, 1, 2, 3]
+
+    pool.report(pool._credentials[2], -412)
+    assert [pool.acquire().mid for _ in range(4)] == [1, 3, 1, 3]
+
+
+def test_lru_picks_least_recently_used():
+    pool = CredentialPool([{'mid': m, 'sessdata': str(m)} for m in (1, 2, 3)],
+                          strategy=credential_pool.LRU, burst=100, rate=100)
+    first = [pool.acquire().mid for _ in range(3)]
+    assert sorted(first) == [1, 2, 3]
+    assert [pool.acquire().mid for _ in range(3)] == first
+
+
+def test_weighted_allocates_in_proportion():
+    pool = CredentialPool([{'mid': 1, 'sessdata': 'a', 'weight': 3}, {'mid': 2, 'sessdata': 'b'}],
+                          strategy=credential_pool.WEIGHTED, burst=100, rate=100)
+    picks = [pool.acquire().mid for _ in range(40)]
+    assert picks.count(1) == 30 and picks.count(2) == 10
+    # 不会连续集中分配给权重高的账号
+    assert all(picks[i:i + 4].count(2) == 1 for i in range(0, 40, 4))
+
+
+def test_acquire_waits_for_rate_limited_credential():
+    pool = CredentialPool([{'mid': 1, 'sessdata': 'a'}], rate=50, burst=1)
+    assert pool.try_acquire() is not None
+    assert pool.try_acquire() is None
+    assert pool.acquire(timeout=0.001) is None
+    assert pool.acquire(timeout=1).mid == 1
+
+
+def test_removed_credential_is_not_scheduled():
+    pool = CredentialPool([{'mid': 1, 'sessdata': 'a'}, {'mid': 2, 'sessdata': 'b'}], burst=100, rate=100)
+    credential = pool.acquire()
+    pool.remove(credential.mid)
+    pool.report(credential, 0)
+    assert {pool.acquire().mid for _ in range(3)} == {2}
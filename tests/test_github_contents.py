@@ -0,0 +1,43 @@
+from github_contents import ContentsPublisher, blob_sha
+
+
+def test_blob_sha_matches_git():
+    # git hash-object 对 "hello\n" 的结果
+    assert blob_sha(b'hello\n') == 'ce013625030ba8dba906f756967f9e9ca394464a'
+
+
+def test_publish_skips_unchanged_files(tmp_path, monkeypatch, github):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'SESSDATA').write_text('{"value": "a"}', encoding='utf-8')
+    publisher = ContentsPublisher('t', 'me', 'repo', state_file=str(tmp_path / 'state.json'))
+
+    first = publisher.publish(['SESSDATA'])
+    assert first is not None
+    hits = dict(github['hits'])
+
+    # 内容未变化时不请求任何接口，新的发布器从状态文件判断
+    assert publisher.publish(['SESSDATA']) is None
+    assert ContentsPublisher('t', 'me', 'repo', state_file=str(tmp_path / 'state.json')).publish(['SESSDATA']) is None
+    assert github['hits'] == hits
+
+    (tmp_path / 'SESSDATA').write_text('{"value": "b"}', encoding='utf-8')
+    second = publisher.publish(['SESSDATA'])
+    assert second not in (None, first)
+    assert github['git_refs'][('me', 'repo', 'main')] == second
+
+
+def test_publish_directory_removes_deleted_files(tmp_path, monkeypatch, github):
+    monkeypatch.chdir(tmp_path)
+    shards = tmp_path / 'publish'
+    shards.mkdir()
+    (shards / '1.json').write_text('1', encoding='utf-8')
+    (shards / '2.json').write_text('2', encoding='utf-8')
+    publisher = ContentsPublisher('t', 'me', 'repo', state_file=str(tmp_path / 'state.json'))
+    publisher.publish(['publish'])
+
+    (shards / '2.json').unlink()
+    commit = publisher.publish(['publish'])
+
+    tree = github['git_objects'][github['git_objects'][commit]['tree']]
+    assert list(tree) == ['publish/1.json']
+    assert publisher.publish(['publish']) is None
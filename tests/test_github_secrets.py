@@ -0,0 +1,34 @@
+import pytest
+
+from bili_refresh import GitHubSecretsSink
+
+
+def test_secret_targets_always_include_primary_repo():
+    sink = GitHubSecretsSink.from_env({
+        'REPO_ACCESS_TOKEN': 't', 'GITHUB_OWNER': 'me', 'GITHUB_REPO': 'repo',
+        'GITHUB_SECRET_TARGETS': 'me/other-repo, me/repo,org:my-org',
+    })
+    assert sink.targets == ['me/repo', 'me/other-repo', 'org:my-org']
+
+
+def test_invalid_secret_target_fails_before_refresh():
+    with pytest.raises(ValueError):
+        GitHubSecretsSink.from_env({'REPO_ACCESS_TOKEN': 't', 'GITHUB_SECRET_TARGETS': 'not-a-target'})
+
+
+def test_publish_only_writes_changed_secrets(tmp_path, github):
+    from github_secrets import SecretPublisher
+
+    state_file = str(tmp_path / 'state.json')
+    publisher = SecretPublisher('t', 'me', 'repo', state_file=state_file)
+    assert set(publisher.publish({'SESSDATA': 'a', 'BILI_JCT': 'b'})) == {'SESSDATA', 'BILI_JCT'}
+
+    assert publisher.publish({'SESSDATA': 'a', 'BILI_JCT': 'b'}) == {}
+    assert publisher.publish({'SESSDATA': 'a2', 'BILI_JCT': 'b'}) == {'SESSDATA': 204}
+    assert github['hits']['put_secret'] == 3
+    # 公钥在同一个发布器内只获取一次
+    assert github['hits']['public_key'] == 1
+
+    # 已写入的哈希保存在状态文件中，新进程也不会重复写入
+    assert SecretPublisher('t', 'me', 'repo', state_file=state_file).publish({'SESSDATA': 'a2'}) == {}
+    assert github['hits']['put_secret'] == 3
@@ -0,0 +1,59 @@
+import socket
+
+import pytest
+
+import http_client
+
+
+def test_import_does_not_patch_getaddrinfo():
+    assert socket.getaddrinfo is not http_client._cached_getaddrinfo
+
+
+def test_dns_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(http_client, '_original_getaddrinfo', lambda host, port, *args: [(host, port)])
+    monkeypatch.setattr(http_client, 'DNS_CACHE_SIZE', 2)
+    http_client.clear_dns_cache()
+    for host in ('a.example', 'b.example', 'a.example', 'c.example'):
+        http_client._cached_getaddrinfo(host, 443)
+    assert [key[0] for key in http_client._dns_cache] == ['a.example', 'c.example']
+    http_client.clear_dns_cache()
+
+
+def make_response(body, content_type='application/json'):
+    import requests
+
+    response = requests.Response()
+    response.status_code = 200
+    response.headers['Content-Type'] = content_type
+    response._content = body
+    return response
+
+
+def test_api_code_reads_prefix_without_parsing(monkeypatch):
+    response = make_response(b'{"code":-412,"message":"\\xe8\\xaf\\xb7\\xe6\\xb1\\x82\\xe8\\xa2\\xab\\xe6\\x8b\\xa6\\xe6\\x88\\xaa"}')
+    monkeypatch.setattr(response, 'json', lambda **kwargs: pytest.fail("不应解析整个JSON"))
+    assert http_client.api_code(response) == -412
+    assert http_client.api_code(response) == -412
+
+
+def test_api_code_fallbacks():
+    assert http_client.api_code(make_response(b'{"ttl": 1, "code": 0}')) == 0
+    assert http_client.api_code(make_response(b'{"sha": "abc"}')) is None
+    assert http_client.api_code(make_response(b'[1, 2]')) is None
+    assert http_client.api_code(make_response(b'<html>', 'text/html')) is None
+
+
+def test_ensure_pool_size_closes_replaced_adapter(monkeypatch):
+    closed = []
+    old = http_client.session.get_adapter('https://')
+    monkeypatch.setattr(old, 'close', lambda: closed.append(old))
+    monkeypatch.setattr(http_client, '_pool_maxsize', http_client._pool_maxsize)
+    size = http_client._pool_maxsize + 1
+
+    http_client.ensure_pool_size(size)
+    http_client.ensure_pool_size(size)
+
+    new = http_client.session.get_adapter('https://')
+    assert new is not old and new is http_client.session.get_adapter('http://')
+    assert new._pool_maxsize == size
+    assert closed == [old]
@@ -0,0 +1,90 @@
+import json
+
+import pytest
+
+from bili_refresh import STATE_CONFIRMED, STATE_REFRESHED, Refresher, Sink, TokensFileSource, read_accounts
+from journal import Journal
+
+
+def account(mid, token):
+    return {'mid': mid, 'refresh_token': token, 'sessdata': f's-{token}', 'bili_jct': f'j-{token}'}
+
+
+class FailingSink(Sink):
+    def __init__(self):
+        self.fail = True
+        self.published = []
+
+    def publish(self, results, log=None):
+        if self.fail:
+            raise ConnectionError("publish failed")
+        self.published.append(results)
+
+
+@pytest.fixture
+def tokens(tmp_path):
+    path = tmp_path / 'accounts.json'
+    path.write_text(json.dumps([account(1, 'r0')]), encoding='utf-8')
+    return str(path)
+
+
+def test_resume_after_sink_failure_does_not_refresh_again(tmp_path, tokens, passport):
+    journal = Journal(str(tmp_path / 'journal'))
+    sink = FailingSink()
+    refresher = Refresher(TokensFileSource(tokens), [sink], journal=journal)
+
+    with pytest.raises(ConnectionError):
+        refresher.run()
+    # 新凭据已写回来源，但发布失败，日志保留
+    assert read_accounts(tokens)[0][0]['refresh_token'] == 'r0+1'
+    assert journal.load('account:1')['state'] == STATE_CONFIRMED
+
+    sink.fail = False
+    result = Refresher(TokensFileSource(tokens), [sink], journal=journal).run()[0]
+
+    assert result['status'] == 'refreshed' and result['resumed']
+    assert result['account']['refresh_token'] == 'r0+1'
+    assert passport.calls == {'check': 1, 'refresh': 1, 'confirm': 1}
+    assert sink.published and journal.pending() == 0
+
+
+def test_resume_retries_confirm_after_interruption(tmp_path, tokens, passport):
+    journal = Journal(str(tmp_path / 'journal'))
+    passport.confirm_error = ConnectionError("connection reset")
+
+    result = Refresher(TokensFileSource(tokens), journal=journal).run()[0]
+    assert result['status'] == 'failed'
+    # 新凭据只在日志中，来源仍是旧的 refresh_token
+    assert journal.load('account:1')['state'] == STATE_REFRESHED
+    assert read_accounts(tokens)[0][0]['refresh_token'] == 'r0'
+
+    passport.confirm_error = None
+    result = Refresher(TokensFileSource(tokens), journal=journal).run()[0]
+
+    assert result['status'] == 'refreshed' and result['confirmed']
+    assert passport.calls['refresh'] == 1 and passport.calls['confirm'] == 2
+    assert read_accounts(tokens)[0][0]['refresh_token'] == 'r0+1'
+    assert journal.pending() == 0
+
+
+def test_journal_kept_when_source_rejects_result(tmp_path, tokens, passport):
+    journal = Journal(str(tmp_path / 'journal'))
+
+    class RejectingSource(TokensFileSource):
+        def save(self, result):
+            return False
+
+    Refresher(RejectingSource(tokens), journal=journal).run()
+    assert journal.pending() == 1
+
+
+def test_unrelated_journal_entry_is_discarded(tmp_path, tokens, passport):
+    journal = Journal(str(tmp_path / 'journal'))
+    journal.save('account:1', {'state': STATE_CONFIRMED, 'old_refresh_token': 'x0', 'refresh_token': 'x1',
+                               'cookies': {}, 'refreshed_at': '2026-01-01T00:00:00'})
+
+    result = Refresher(TokensFileSource(tokens), journal=journal).run()[0]
+
+    assert not result.get('resumed')
+    assert result['account']['refresh_token'] == 'r0+1'
+    assert journal.pending() == 0
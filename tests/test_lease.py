@@ -0,0 +1,67 @@
+import time
+
+import pytest
+
+from lease import FileLeaseBackend, SQLiteLeaseBackend, account_key
+
+
+@pytest.fixture(params=['file', 'sqlite'])
+def backends(request, tmp_path):
+    """同一个后端位置上的两个持有者"""
+    if request.param == 'file':
+        return [FileLeaseBackend(str(tmp_path / 'leases'), owner=o) for o in ('a', 'b')]
+    return [SQLiteLeaseBackend(str(tmp_path / 'leases.db'), owner=o) for o in ('a', 'b')]
+
+
+def test_lease_is_exclusive_until_released(backends):
+    first, second = backends
+    lease = first.acquire('account:1')
+    assert lease is not None
+    assert second.acquire('account:1') is None
+    # 其他账号不受影响
+    assert second.acquire('account:2') is not None
+
+    assert lease.release() is True
+    taken = second.acquire('account:1')
+    assert taken.owner == 'b'
+    assert taken.token > lease.token
+
+
+def test_expired_lease_is_taken_over_and_old_holder_is_fenced(backends):
+    first, second = backends
+    stale = first.acquire('account:1', ttl=0.05)
+    time.sleep(0.1)
+
+    current = second.acquire('account:1')
+    assert current is not None and current.token == stale.token + 1
+    # 过期的持有者不能续约或释放新持有者的租约
+    assert stale.renew() is False
+    assert stale.release() is False
+    assert second.acquire('account:1') is None
+    assert current.renew() is True
+
+
+def test_account_key_falls_back_to_token_hash():
+    assert account_key({'mid': 42, 'refresh_token': 'x'}) == 'account:42'
+    key = account_key({'refresh_token': 'x'})
+    assert key.startswith('token:') and len(key) == len('token:') + 16
+    assert account_key({'refresh_token': 'y'}) != key
+
+
+def test_refresh_skips_account_leased_by_another_refresher(backends, passport):
+    from bili_refresh import refresh_account
+
+    first, second = backends
+    account = {'mid': 1, 'refresh_token': 'r0', 'sessdata': 's', 'bili_jct': 'j'}
+    held = second.acquire(account_key(account))
+
+    result = refresh_account(account, leases=first)
+    assert result['status'] == 'skipped'
+    assert passport.calls['check'] == 0
+
+    held.release()
+    result = refresh_account(account, leases=first)
+    assert result['status'] == 'refreshed'
+    assert result['fence'] == held.token + 1
+    # 写回新凭据之前租约不释放
+    assert second.acquire(account_key(account)) is None
@@ -0,0 +1,58 @@
+import itertools
+import json
+
+import login
+
+
+def test_save_account_updates_by_mid(tmp_path):
+    path = str(tmp_path / 'accounts.json')
+    login.save_account(path, {'mid': 1, 'refresh_token': 'a'})
+    login.save_account(path, {'mid': 2, 'refresh_token': 'b'})
+    login.save_account(path, {'mid': 1, 'refresh_token': 'c'})
+    with open(path, encoding='utf-8') as f:
+        accounts = json.load(f)
+    assert sorted((a['mid'], a['refresh_token']) for a in accounts) == [(1, 'c'), (2, 'b')]
+    assert not list(tmp_path.glob('*.tmp'))
+
+
+class FakeStore:
+    path = 'tokens.db'
+
+    def __init__(self):
+        self.saved = []
+
+    def upsert(self, account):
+        if account['mid'] == 3:
+            raise OSError("database is locked")
+        self.saved.append(account['mid'])
+
+
+class FakeResponse:
+    def __init__(self, auth_code):
+        self.auth_code = auth_code
+
+    def json(self):
+        return {'code': 0, 'data': {'auth_code': self.auth_code}}
+
+
+def test_batch_keeps_going_when_one_item_fails(tmp_path, monkeypatch):
+    issued = itertools.count(1)
+
+    def request_auth_code():
+        number = next(issued)
+        if number == 2:
+            raise ConnectionError("boom")
+        return f"https://qr/{number}", number
+
+    monkeypatch.setattr(login, 'request_auth_code', request_auth_code)
+    monkeypatch.setattr(login, 'poll_login', FakeResponse)
+    monkeypatch.setattr(login, 'parse_login_result', lambda data: {'mid': data['auth_code']})
+    monkeypatch.setattr(login, 'render_qr_html', lambda urls, html_file: None)
+    monkeypatch.setattr(login.webbrowser, 'open', lambda url: None)
+    store = FakeStore()
+
+    succeeded = login.qr_login_batch(4, html_file=str(tmp_path / 'qr.html'), store=store)
+
+    # 第2个二维码申请失败、第3个账号保存失败，其余账号照常保存
+    assert sorted(succeeded) == [1, 4]
+    assert sorted(store.saved) == [1, 4]
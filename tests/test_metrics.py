@@ -0,0 +1,31 @@
+import metrics
+
+
+def counter(name, path):
+    return sum(value for (key, labels), value in metrics.recorder.counters.items()
+               if key == name and labels[1] == path)
+
+
+def test_retries_counted_once_per_retry_request():
+    metrics.reset()
+    for retries in range(3):
+        metrics.record_http('GET', 'https://api.example.com/x', 500 if retries < 2 else 200, 0.1,
+                            retries=retries)
+    assert counter('http_retries_total', '/x') == 2
+
+
+def test_git_data_paths_are_normalized():
+    metrics.reset()
+    base = 'https://api.github.com/repos/owner/repo/git'
+    for path in ('commits/3f2a9c', 'trees/8d1e0b?recursive=1', 'blobs/77aa01',
+                 'refs/heads/main', 'ref/heads/feature/x', 'trees'):
+        metrics.record_http('GET', f'{base}/{path}', 200, 0.1)
+    paths = {record['path'] for record in metrics.recorder.requests}
+    assert paths == {
+        '/repos/owner/repo/git/commits/{sha}',
+        '/repos/owner/repo/git/trees/{sha}',
+        '/repos/owner/repo/git/blobs/{sha}',
+        '/repos/owner/repo/git/refs/heads/{branch}',
+        '/repos/owner/repo/git/ref/heads/{branch}',
+        '/repos/owner/repo/git/trees',
+    }
@@ -0,0 +1,9 @@
+from rate_limit import DECREASE, AdaptiveLimiter
+
+
+def test_http_412_decreases_rate():
+    now = [0.0]
+    limiter = AdaptiveLimiter(rate=10, clock=lambda: now[0])
+    limiter.record(status=412)
+    assert limiter.rate == 10 * DECREASE
+    assert limiter.throttled == 1
@@ -0,0 +1,59 @@
+from bili_refresh import refresh_account, refresh_accounts
+
+
+def account(mid=1, token='r0'):
+    return {'mid': mid, 'refresh_token': token, 'sessdata': f's-{token}', 'bili_jct': f'j-{token}'}
+
+
+def test_valid_cookie_is_not_refreshed(passport):
+    passport.need_refresh = False
+    result = refresh_account(account())
+
+    assert result['status'] == 'valid'
+    assert result['account'] == account()
+    assert passport.calls['refresh'] == 0
+
+
+def test_refreshed_account_carries_new_credentials(passport):
+    result = refresh_account(account())
+
+    assert result['status'] == 'refreshed'
+    assert result['confirmed'] is True
+    assert result['error'] is None
+    assert result['account']['refresh_token'] == 'r0+1'
+    assert result['account']['sessdata'] == 's-r0+1'
+    assert result['account']['last_refreshed']
+
+
+def test_confirm_failure_still_returns_new_credentials(passport):
+    passport.confirm_ok = False
+    result = refresh_account(account())
+
+    assert result['status'] == 'refreshed'
+    assert result['confirmed'] is False
+
+
+def test_failures_keep_the_old_account(passport):
+    passport.need_refresh = None
+    assert refresh_account(account())['status'] == 'failed'
+
+    passport.need_refresh = True
+    passport.refresh_ok = False
+    result = refresh_account(account())
+    assert result['status'] == 'failed'
+    assert result['error'] and result['account'] == account()
+
+    result = refresh_account({'mid': 1, 'refresh_token': 'r0'})
+    assert result['status'] == 'failed'
+    assert passport.calls['check'] == 2
+
+
+def test_refresh_accounts_keeps_input_order(passport):
+    accounts = [account(mid, f'r{mid}') for mid in range(1, 6)]
+    seen = []
+
+    results = refresh_accounts(accounts, concurrency=3, on_result=seen.append)
+
+    assert [r['mid'] for r in results] == [1, 2, 3, 4, 5]
+    assert sorted(r['mid'] for r in seen) == [1, 2, 3, 4, 5]
+    assert all(r['status'] == 'refreshed' for r in results)
@@ -0,0 +1,40 @@
+import bili_refresh
+from bili_refresh import REFRESH_CSRF_MAX_TAG, _find_refresh_csrf
+
+PAGE = b'<html><body>' + b'x' * 5000 + b'<div id="1-name">0123456789abcdef</div><p>tail</p></body></html>'
+
+
+def split(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def test_find_refresh_csrf_across_chunk_boundaries():
+    # 每一种块大小都会把标签切在不同的位置，包括切在开始标签和口令中间
+    for size in range(1, 64):
+        assert _find_refresh_csrf(split(PAGE, size)) == '0123456789abcdef', size
+    assert _find_refresh_csrf([PAGE]) == '0123456789abcdef'
+
+
+def test_find_refresh_csrf_missing():
+    assert _find_refresh_csrf(split(b'<html>no token</html>', 7)) is None
+
+
+def test_find_refresh_csrf_buffer_is_bounded(monkeypatch):
+    def chunks():
+        yield b'<div id="1-name">'
+        for _ in range(1000):
+            yield b'a' * 100
+
+    # 开始标签之后一直没有结束标签时不会缓冲整个页面
+    sizes = []
+    pattern = bili_refresh._REFRESH_CSRF_RE
+
+    class Spy:
+        def search(self, buffer):
+            sizes.append(len(buffer))
+            return pattern.search(buffer)
+
+    monkeypatch.setattr(bili_refresh, '_REFRESH_CSRF_RE', Spy())
+    assert _find_refresh_csrf(chunks()) is None
+    assert len(sizes) == 1001
+    assert max(sizes) <= REFRESH_CSRF_MAX_TAG + 100
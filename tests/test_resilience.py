@@ -0,0 +1,125 @@
+import io
+import json
+import threading
+import time
+
+import pytest
+import requests
+
+import resilience
+from resilience import CircuitBreaker, CircuitOpenError, RetryPolicy
+
+URL = 'https://service.example/x'
+
+
+def make_response(status=200, code=0):
+    response = requests.Response()
+    response.status_code = status
+    response.headers['Content-Type'] = 'application/json'
+    response._content = json.dumps({'code': code}).encode()
+    response.raw = io.BytesIO()
+    return response
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    monkeypatch.setattr(resilience.time, 'sleep', lambda seconds: None)
+    resilience.reset_breakers()
+    yield
+    resilience.reset_breakers()
+
+
+def serve(monkeypatch, *responses):
+    """依次返回 responses 中的响应（异常则抛出），返回调用记录"""
+    calls = []
+
+    def fake_request(method, url, retries=0, limit=True, **kwargs):
+        calls.append((method, retries))
+        item = responses[min(len(calls), len(responses)) - 1]
+        if isinstance(item, Exception):
+            raise item
+        return item() if callable(item) else item
+    monkeypatch.setattr(resilience.http_client, 'request', fake_request)
+    return calls
+
+
+def test_get_retries_server_error_codes(monkeypatch):
+    calls = serve(monkeypatch, make_response(code=-504), make_response(code=0))
+    response = resilience.get(URL)
+    assert response.json()['code'] == 0
+    assert [retries for _, retries in calls] == [0, 1]
+
+
+def test_post_is_not_retried_on_server_error_code(monkeypatch):
+    calls = serve(monkeypatch, make_response(code=-504))
+    assert resilience.post(URL).json()['code'] == -504
+    assert len(calls) == 1
+
+
+def test_post_is_not_retried_on_http_5xx(monkeypatch):
+    calls = serve(monkeypatch, make_response(status=502))
+    assert resilience.post(URL).status_code == 502
+    assert len(calls) == 1
+
+
+def test_post_is_retried_when_throttled(monkeypatch):
+    calls = serve(monkeypatch, make_response(code=-412), make_response(code=0))
+    assert resilience.post(URL).json()['code'] == 0
+    assert len(calls) == 2
+
+
+def test_post_is_retried_only_when_not_sent(monkeypatch):
+    calls = serve(monkeypatch, requests.exceptions.ConnectTimeout(), make_response())
+    assert resilience.post(URL).status_code == 200
+    assert len(calls) == 2
+
+    calls = serve(monkeypatch, requests.exceptions.ReadTimeout())
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        resilience.post(URL)
+    assert len(calls) == 1
+
+
+def test_attempts_are_bounded(monkeypatch):
+    calls = serve(monkeypatch, requests.exceptions.ConnectionError())
+    with pytest.raises(requests.exceptions.ConnectionError):
+        resilience.get(URL, policy=RetryPolicy(attempts=3))
+    assert len(calls) == 3
+
+
+def test_hedged_get_returns_faster_response(monkeypatch):
+    release = threading.Event()
+
+    def slow():
+        release.wait(2)
+        return make_response(code=-1)
+
+    calls = serve(monkeypatch, slow, make_response(code=0))
+    started = time.monotonic()
+    response = resilience.get(URL, policy=RetryPolicy(hedge_after=0.05))
+    release.set()
+    assert response.json()['code'] == 0
+    assert len(calls) == 2
+    assert time.monotonic() - started < 1
+
+
+def test_circuit_breaker_opens_and_probes():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == 'open' and not breaker.allow()
+    breaker.opened_at -= 30
+    # 熔断到期后只放行一个探测请求
+    assert breaker.allow() and not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == 'closed' and breaker.allow()
+
+
+def test_open_circuit_fails_fast(monkeypatch):
+    calls = serve(monkeypatch, make_response(status=503))
+    policy = RetryPolicy(attempts=1)
+    for _ in range(resilience.FAILURE_THRESHOLD):
+        resilience.get(URL, policy=policy)
+    with pytest.raises(CircuitOpenError):
+        resilience.get(URL, policy=policy)
+    assert len(calls) == resilience.FAILURE_THRESHOLD
@@ -0,0 +1,47 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from sessdata_client import SessdataClient
+from sessdata_file import build_document
+
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, document):
+        self.content = json.dumps(document).encode('utf-8')
+        self.headers = {'ETag': '"1"', 'Cache-Control': 'private, max-age=600'}
+
+    def raise_for_status(self):
+        pass
+
+
+class SlowSession:
+    def __init__(self):
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def get(self, url, headers=None, timeout=None):
+        with self._lock:
+            self.calls += 1
+        time.sleep(0.05)
+        return FakeResponse(build_document('abc'))
+
+
+def test_cold_cache_fetches_once_for_concurrent_callers():
+    session = SlowSession()
+    client = SessdataClient('http://example.invalid/SESSDATA', session=session)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        values = list(executor.map(lambda _: client.get(), range(8)))
+    assert values == ['abc'] * 8
+    assert session.calls == 1
+
+
+def test_reads_do_not_go_through_refresh_metrics():
+    metrics.reset()
+    client = SessdataClient('http://example.invalid/SESSDATA', session=SlowSession())
+    client.get()
+    assert not metrics.recorder.requests
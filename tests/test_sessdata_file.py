@@ -0,0 +1,73 @@
+"""SESSDATA 文档的下次更新时间：值长期未变化（updated 超过一个刷新周期）时不应退化为最短缓存时间"""
+import time
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import sessdata_client
+import sessdata_server
+from sessdata_file import TIMEZONE, build_document, next_change, sessdata_expiry
+
+DAY = 24 * 3600
+
+
+def stale_document(days=3.25, expires_in=180 * DAY):
+    """updated 为 days 天前、SESSDATA 在 expires_in 秒后过期的文档"""
+    value = f"abc%2C{int(time.time() + expires_in)}%2Cdef"
+    return build_document(value, datetime.now(ZoneInfo(TIMEZONE)) - timedelta(days=days))
+
+
+class FakeResponse:
+    def __init__(self, headers=None):
+        self.headers = headers or {}
+
+
+def test_sessdata_expiry():
+    assert sessdata_expiry("abc%2C1767000000%2Cdef") == 1767000000
+    assert sessdata_expiry("abc,1767000000,def") == 1767000000
+    assert sessdata_expiry("plain") is None
+    assert sessdata_expiry(None) is None
+
+
+def test_next_change_rolls_forward_past_stale_updated():
+    now = time.time()
+    change = next_change(stale_document(), DAY, now)
+    # 下一次刷新在 now 之后一个周期内：3.25 天前更新 -> 0.75 天后
+    assert now < change <= now + DAY
+    assert abs(change - now - 0.75 * DAY) < 5
+
+
+def test_next_change_capped_by_sessdata_expiry():
+    now = time.time()
+    change = next_change(stale_document(expires_in=600), DAY, now)
+    assert abs(change - (now + 600)) < 2
+
+
+def test_next_change_without_updated():
+    assert next_change({'value': 'abc'}, DAY) is None
+
+
+def test_server_max_age_for_stale_document():
+    cache = sessdata_server.SessdataCache()
+    cache.set_document(stale_document())
+    _, _, max_age = cache.snapshot()
+    assert max_age > sessdata_server.FALLBACK_MAX_AGE
+    assert max_age <= DAY
+
+
+def test_client_ttl_for_stale_document():
+    client = sessdata_client.SessdataClient('http://example.invalid/SESSDATA')
+    ttl = client._ttl(stale_document(), FakeResponse())
+    assert ttl == client.max_ttl
+    # 离下一次刷新不到 max_ttl 时按实际剩余时间
+    ttl = client._ttl(stale_document(days=3.99), FakeResponse())
+    assert client.min_ttl < ttl < client.max_ttl
+
+
+def test_scheduler_uses_same_expiry_as_published_file():
+    import refresh_scheduler
+
+    account = {'sessdata': "abc%2C1767000000%2Cdef"}
+    assert refresh_scheduler.sessdata_expiry is sessdata_expiry
+    # 距过期很远时按最长间隔检查，不会因为解析失败退化
+    due = refresh_scheduler.next_check_time(account, now=1767000000 - 30 * 86400, jitter=0)
+    assert due == 1767000000 - 30 * 86400 + refresh_scheduler.MAX_INTERVAL
@@ -0,0 +1,31 @@
+import threading
+import urllib.request
+from urllib.error import HTTPError
+
+import pytest
+
+from sessdata_file import build_document
+from sessdata_server import SessdataCache, create_server
+
+
+@pytest.fixture
+def server_url():
+    cache = SessdataCache()
+    cache.set_document(build_document('abc%2C1767000000%2Cdef'))
+    server = create_server(cache, '127.0.0.1', 0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/SESSDATA"
+    server.shutdown()
+    server.server_close()
+
+
+def test_response_is_private_and_revalidates(server_url):
+    with urllib.request.urlopen(server_url) as response:
+        etag = response.headers['ETag']
+        assert response.headers['Cache-Control'].startswith('private, max-age=')
+
+    request = urllib.request.Request(server_url, headers={'If-None-Match': etag})
+    with pytest.raises(HTTPError) as excinfo:
+        urllib.request.urlopen(request)
+    assert excinfo.value.code == 304
+    assert excinfo.value.headers['Cache-Control'].startswith('private, ')
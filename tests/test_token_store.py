@@ -0,0 +1,57 @@
+import sqlite3
+
+from token_store import TokenStore
+
+
+def account(mid, token, last_refreshed=None):
+    return {'mid': mid, 'refresh_token': token, 'sessdata': f's-{token}', 'bili_jct': f'j-{token}',
+            'last_refreshed': last_refreshed}
+
+
+def test_update_tokens_rejects_stale_fence(tmp_path):
+    store = TokenStore(str(tmp_path / 'tokens.db'))
+    store.upsert(account(1, 'a0'))
+
+    assert store.update_tokens(1, 'a2', 's-a2', 'j-a2', fence=2) is True
+    # 租约过期后被接手的旧持有者（fence 1）不能覆盖新凭据
+    assert store.update_tokens(1, 'a1', 's-a1', 'j-a1', fence=1) is False
+    assert store.get(1)['refresh_token'] == 'a2'
+    # 同一个持有者可以重复写入，更大的 fence 覆盖
+    assert store.update_tokens(1, 'a2b', 's-a2b', 'j-a2b', fence=2) is True
+    assert store.update_tokens(1, 'a3', 's-a3', 'j-a3', fence=3) is True
+    assert store.get(1)['fence'] == 3
+
+
+def test_update_tokens_without_fence_keeps_recorded_fence(tmp_path):
+    store = TokenStore(str(tmp_path / 'tokens.db'))
+    store.upsert(account(1, 'a0'))
+    store.update_tokens(1, 'a1', 's-a1', 'j-a1', fence=5)
+
+    assert store.update_tokens(1, 'a2', 's-a2', 'j-a2') is True
+    assert store.get(1)['fence'] == 5
+    assert store.update_tokens(2, 'b1', 's-b1', 'j-b1') is False
+
+
+def test_due_orders_never_refreshed_first(tmp_path):
+    store = TokenStore(str(tmp_path / 'tokens.db'))
+    store.upsert(account(1, 'a', '2026-01-02T00:00:00'))
+    store.upsert(account(2, 'b'))
+    store.upsert(account(3, 'c', '2026-01-01T00:00:00'))
+    store.upsert(account(4, 'd', '2026-03-01T00:00:00'))
+
+    assert [a['mid'] for a in store.due('2026-02-01T00:00:00')] == [2, 3, 1]
+    assert [a['mid'] for a in store.due('2026-02-01T00:00:00', limit=2)] == [2, 3]
+
+
+def test_migrates_database_without_fence_column(tmp_path):
+    path = str(tmp_path / 'tokens.db')
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE accounts (mid INTEGER PRIMARY KEY, access_token TEXT, refresh_token TEXT, "
+                 "sessdata TEXT, bili_jct TEXT, expires_in INTEGER, obtained_at TEXT, last_refreshed TEXT)")
+    conn.execute("INSERT INTO accounts (mid, refresh_token) VALUES (1, 'a0')")
+    conn.commit()
+    conn.close()
+
+    store = TokenStore(path)
+    assert store.update_tokens(1, 'a1', 's-a1', 'j-a1', fence=1) is True
+    assert store.get(1)['fence'] == 1
@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+from bili_refresh import TokensFileSource, read_accounts
+
+
+def account(mid, token):
+    return {'mid': mid, 'refresh_token': token, 'sessdata': f's-{token}', 'bili_jct': f'j-{token}'}
+
+
+def write(path, data):
+    path.write_text(json.dumps(data), encoding='utf-8')
+
+
+def test_shared_save_keeps_accounts_written_by_other_process(tmp_path):
+    path = tmp_path / 'accounts.json'
+    write(path, [account(1, 'a0'), account(2, 'b0')])
+    first = TokensFileSource(str(path), shared=True)
+    second = TokensFileSource(str(path), shared=True)
+    first.load()
+    second.load()
+
+    first.save({'account': account(1, 'a1')})
+    # second 的内存副本中账号1仍是旧值，写回账号2时不能覆盖账号1
+    second.save({'account': account(2, 'b1')})
+
+    accounts, single = read_accounts(str(path))
+    assert not single
+    assert [a['refresh_token'] for a in accounts] == ['a1', 'b1']
+    assert first.flush() is False
+
+
+def test_shared_reload_reads_latest_account(tmp_path):
+    path = tmp_path / 'accounts.json'
+    write(path, [account(1, 'a0'), account(2, 'b0')])
+    source = TokensFileSource(str(path), shared=True)
+    stale = source.load()[0]
+    write(path, [account(1, 'a1'), account(2, 'b0')])
+    assert source.reload(stale)['refresh_token'] == 'a1'
+
+
+def test_shared_single_tokens_file_without_mid(tmp_path):
+    path = tmp_path / 'tokens.json'
+    write(path, {'refresh_token': 'a0', 'sessdata': 's', 'bili_jct': 'j'})
+    source = TokensFileSource(str(path), shared=True)
+    stale = source.load()[0]
+    source.save({'account': dict(stale, refresh_token='a1')})
+    assert source.reload(stale)['refresh_token'] == 'a1'
+    accounts, single = read_accounts(str(path))
+    assert single and accounts[0]['refresh_token'] == 'a1'
+
+
+def test_shared_requires_mid_for_multiple_accounts(tmp_path):
+    path = tmp_path / 'accounts.json'
+    write(path, [account(1, 'a0'), {'refresh_token': 'b0'}])
+    with pytest.raises(ValueError):
+        TokensFileSource(str(path), shared=True).load()
+
+
+def test_flush_writes_in_memory_accounts(tmp_path):
+    path = tmp_path / 'accounts.json'
+    write(path, [account(1, 'a0'), account(2, 'b0')])
+    source = TokensFileSource(str(path))
+    source.load()
+    assert source.flush() is False
+    source.save({'account': account(2, 'b1')})
+    assert source.flush() is True
+    assert [a['refresh_token'] for a in read_accounts(str(path))[0]] == ['a0', 'b1']
@@ -0,0 +1,171 @@
+"""
+Token存储（SQLite，WAL模式）
+以 mid 为主键保存多个账号的 tokens.json 内容，单个账号刷新只更新一行，
+last_refreshed 建有索引，用于调度查询。
+用法:
+    python token_store.py import tokens.json [accounts.json ...] [--db tokens.db]
+    python token_store.py list [--db tokens.db]
+"""
+import argparse
+import json
+import sqlite3
+import sys
+import threading
+from datetime import datetime
+
+DEFAULT_DB = 'tokens.db'
+# 连接等待写锁的时间（毫秒）
+BUSY_TIMEOUT = 5000
+
+COLUMNS = (
+    'mid', 'access_token', 'refresh_token', 'sessdata', 'bili_jct',
+    'expires_in', 'obtained_at', 'last_refreshed',
+)
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS accounts (
+    mid INTEGER PRIMARY KEY,
+    access_token TEXT,
+    refresh_token TEXT,
+    sessdata TEXT,
+    bili_jct TEXT,
+    expires_in INTEGER,
+    obtained_at TEXT,
+    last_refreshed TEXT,
+    fence INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_accounts_last_refreshed ON accounts(last_refreshed);
+'''
+
+
+class TokenStore:
+    """多账号Token存储，每个线程使用独立连接"""
+
+    def __init__(self, path=DEFAULT_DB):
+        self.path = path
+        self._local = threading.local()
+        self._conn.executescript(SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        """为旧版本创建的数据库补充 fence 列"""
+        columns = {row['name'] for row in self._conn.execute("PRAGMA table_info(accounts)")}
+        if 'fence' not in columns:
+            self._conn.execute("ALTER TABLE accounts ADD COLUMN fence INTEGER")
+
+    @property
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT / 1000, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def upsert(self, account):
+        """插入或更新整个账号（tokens.json 格式）"""
+        if account.get('mid') is None:
+            raise ValueError("账号缺少 mid")
+        values = [account.get(column) for column in COLUMNS]
+        updates = ', '.join(f"{c} = excluded.{c}" for c in COLUMNS[1:])
+        self._conn.execute(
+            f"INSERT INTO accounts ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))}) "
+            f"ON CONFLICT(mid) DO UPDATE SET {updates}",
+            values,
+        )
+
+    def update_tokens(self, mid, refresh_token, sessdata, bili_jct, last_refreshed=None, fence=None):
+        """刷新成功后原子地更新单个账号的凭据，返回是否写入
+
+        fence: 租约的 fencing token（见 lease.py）；已有更大的 fence 写入过时拒绝写入，
+        防止租约过期后被他人接手的旧持有者覆盖新凭据
+        """
+        sql = ("UPDATE accounts SET refresh_token = ?, sessdata = ?, bili_jct = ?, last_refreshed = ?, "
+               "fence = COALESCE(?, fence) WHERE mid = ?")
+        params = [refresh_token, sessdata, bili_jct, last_refreshed or datetime.now().isoformat(),
+                  fence, mid]
+        if fence is not None:
+            sql += " AND (fence IS NULL OR fence <= ?)"
+            params.append(fence)
+        cursor = self._conn.execute(sql, params)
+        return cursor.rowcount == 1
+
+    def get(self, mid):
+        row = self._conn.execute("SELECT * FROM accounts WHERE mid = ?", (mid,)).fetchone()
+        return dict(row) if row else None
+
+    def delete(self, mid):
+        self._conn.execute("DELETE FROM accounts WHERE mid = ?", (mid,))
+
+    def all(self):
+        """逐行返回所有账号"""
+        for row in self._conn.execute("SELECT * FROM accounts ORDER BY mid"):
+            yield dict(row)
+
+    def due(self, before=None, limit=None):
+        """返回 last_refreshed 早于 before（ISO时间）的账号，从未刷新的排在最前"""
+        sql = "SELECT * FROM accounts WHERE last_refreshed IS NULL"
+        params = []
+        if before is not None:
+            sql += " OR last_refreshed < ?"
+            params.append(before)
+        sql += " ORDER BY last_refreshed"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [dict(row) for row in self._conn.execute(sql, params)]
+
+    def count(self):
+        return self._conn.execute("SELECT COUNT(*) FROM accounts").fetchone()[0]
+
+    def import_tokens_json(self, path):
+        """导入 tokens.json（单个对象）或多账号文件（数组），返回导入的账号数"""
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        accounts = [data] if isinstance(data, dict) else data
+        conn = self._conn
+        conn.execute('BEGIN')
+        try:
+            for account in accounts:
+                self.upsert(account)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return len(accounts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Token存储管理")
+    parser.add_argument('--db', default=DEFAULT_DB, help=f"数据库文件（默认 {DEFAULT_DB}）")
+    sub = parser.add_subparsers(dest='command', required=True)
+    import_parser = sub.add_parser('import', help="导入 tokens.json / 多账号文件")
+    import_parser.add_argument('files', nargs='+')
+    sub.add_parser('list', help="列出已保存的账号")
+    args = parser.parse_args()
+
+    store = TokenStore(args.db)
+    if args.command == 'import':
+        for path in args.files:
+            try:
+                count = store.import_tokens_json(path)
+                print(f"✅ 已从 {path} 导入 {count} 个账号")
+            except Exception as e:
+                print(f"❌ 导入 {path} 失败: {e}")
+                sys.exit(1)
+        print(f"数据库中共有 {store.count()} 个账号")
+    elif args.command == 'list':
+        for account in store.all():
+            print(f"{account['mid']}\t最近刷新: {account['last_refreshed'] or '从未'}")
+
+
+if __name__ == "__main__":
+    main()